@@ -13,9 +13,11 @@
 import mysql.connector
 from mysql.connector import Error
 from faker import Faker
+import hashlib
 import random
 from datetime import datetime, timedelta
 from decimal import Decimal
+from schema import ensure_schema
 
 # Initialize Faker for generating realistic data
 fake = Faker()
@@ -33,6 +35,8 @@ CONFIG = {
     'NUM_INVENTORY_ITEMS': 200,
     'START_DATE': datetime(2022, 1, 1),
     'END_DATE': datetime(2026, 12, 31),  # Extended to end of 2026
+    'AS_OF': datetime(2026, 1, 1),  # Fixed "today": splits past/future appointments and stamps updated_at
+    'SEED': None,  # Same seed on an empty database = byte-identical tables; None picks one and prints it
 
     # Business rules
     'AVG_APPOINTMENTS_PER_PATIENT': 4,
@@ -125,218 +129,6 @@ def create_database_connection():
         return None
 
 
-def create_tables(connection):
-    """Create all necessary tables (copy from original script)"""
-    cursor = connection.cursor()
-
-    tables = {
-        'patients': """
-            CREATE TABLE IF NOT EXISTS patients (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                first_name VARCHAR(100),
-                father_name VARCHAR(100),
-                last_name VARCHAR(100),
-                mother_name VARCHAR(100),
-                id_nb VARCHAR(50),
-                date_of_birth DATE,
-                gender VARCHAR(20),
-                marital_status VARCHAR(20),
-                nationality VARCHAR(100),
-                phone VARCHAR(100),
-                phone_alt VARCHAR(100),
-                email VARCHAR(100),
-                address_line1 TEXT,
-                address_line2 TEXT,
-                city VARCHAR(50),
-                state VARCHAR(50),
-                zip_code VARCHAR(10),
-                country VARCHAR(100),
-                blood_group VARCHAR(5),
-                allergies TEXT,
-                medical_history TEXT,
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_source_id (source_id)
-            )
-        """,
-        'patient_relationships': """
-            CREATE TABLE IF NOT EXISTS patient_relationships (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                patient_id INT,
-                related_patient_id INT,
-                relationship_type VARCHAR(50),
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL
-            )
-        """,
-        'doctors': """
-            CREATE TABLE IF NOT EXISTS doctors (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                title VARCHAR(50),
-                first_name VARCHAR(50),
-                father_name VARCHAR(100),
-                last_name VARCHAR(50),
-                specialization VARCHAR(255),
-                qualification VARCHAR(200),
-                license_number VARCHAR(50),
-                phone VARCHAR(100),
-                phone_alt VARCHAR(100),
-                email VARCHAR(100),
-                department VARCHAR(100),
-                consultation_fee DECIMAL(10, 2),
-                available_days VARCHAR(100),
-                available_hours VARCHAR(100),
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_source_id (source_id)
-            )
-        """,
-        'appointments': """
-            CREATE TABLE IF NOT EXISTS appointments (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                patient_id VARCHAR(50),
-                doctor_id VARCHAR(50),
-                appointment_date DATE,
-                appointment_time TIME,
-                duration VARCHAR(50),
-                duration_minutes INT,
-                revision_number INT,
-                room VARCHAR(50),
-                status VARCHAR(50),
-                missed BOOLEAN DEFAULT FALSE,
-                reason_for_visit TEXT,
-                diagnosis TEXT,
-                prescription TEXT,
-                notes TEXT,
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_patient_id (patient_id),
-                INDEX idx_doctor_id (doctor_id),
-                INDEX idx_appointment_date (appointment_date)
-            )
-        """,
-        'invoices': """
-            CREATE TABLE IF NOT EXISTS invoices (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                invoice_number VARCHAR(50),
-                patient_id VARCHAR(50),
-                doctor_id VARCHAR(50),
-                appointment_id VARCHAR(50),
-                invoice_date DATE,
-                due_date DATE,
-                status VARCHAR(50),
-                currency VARCHAR(10) DEFAULT 'USD',
-                subtotal DECIMAL(10, 2) DEFAULT 0.00,
-                discount_type VARCHAR(20),
-                discount_value DECIMAL(10, 2) DEFAULT 0.00,
-                tax DECIMAL(10, 2) DEFAULT 0.00,
-                total_amount DECIMAL(10, 2),
-                amount_paid DECIMAL(10, 2) DEFAULT 0.00,
-                balance_due DECIMAL(10, 2),
-                notes TEXT,
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_source_id (source_id),
-                INDEX idx_patient_id (patient_id)
-            )
-        """,
-        'invoice_items': """
-            CREATE TABLE IF NOT EXISTS invoice_items (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50),
-                invoice_id INT,
-                invoice_source_id VARCHAR(50),
-                description TEXT,
-                unit_price DECIMAL(10, 2),
-                quantity INT DEFAULT 1,
-                total_amount DECIMAL(10, 2),
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_invoice_id (invoice_id)
-            )
-        """,
-        'payments': """
-            CREATE TABLE IF NOT EXISTS payments (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                invoice_id INT,
-                invoice_source_id VARCHAR(50),
-                patient_id VARCHAR(50),
-                payment_method VARCHAR(50),
-                amount DECIMAL(10, 2),
-                original_amount DECIMAL(10, 2),
-                currency VARCHAR(10),
-                reference_number VARCHAR(100),
-                payment_date DATE,
-                notes TEXT,
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                deleted_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_invoice_id (invoice_id),
-                INDEX idx_patient_id (patient_id)
-            )
-        """,
-        'treatments': """
-            CREATE TABLE IF NOT EXISTS treatments (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                patient_id VARCHAR(50),
-                doctor_id VARCHAR(50),
-                tooth_number VARCHAR(20),
-                procedure_code VARCHAR(50),
-                procedure_name VARCHAR(200),
-                procedure_group VARCHAR(100),
-                treatment_plan VARCHAR(100),
-                status VARCHAR(50),
-                price DECIMAL(10, 2),
-                planned_date DATE,
-                start_date DATE,
-                completion_date DATE,
-                notes TEXT,
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_patient_id (patient_id),
-                INDEX idx_doctor_id (doctor_id)
-            )
-        """,
-        'inventory': """
-            CREATE TABLE IF NOT EXISTS inventory (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                category VARCHAR(100),
-                name VARCHAR(200),
-                sku VARCHAR(50),
-                description TEXT,
-                unit_of_measure VARCHAR(50),
-                size DECIMAL(10, 2),
-                quantity_in_stock DECIMAL(10, 2),
-                unit_size DECIMAL(10, 2),
-                average_purchase_price DECIMAL(10, 2),
-                selling_price DECIMAL(10, 2),
-                minimum_quantity_warning INT,
-                minimum_quantity_critical INT,
-                currency VARCHAR(10),
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                deleted_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_source_id (source_id)
-            )
-        """
-    }
-
-    for table_name, create_statement in tables.items():
-        cursor.execute(create_statement)
-        print(f"🧱 Table '{table_name}' created")
-
-    connection.commit()
-    cursor.close()
-    print("✅ All tables created successfully!\n")
-
-
 def random_date_between(start, end):
     """Generate random date between two dates"""
     delta = end - start
@@ -371,7 +163,7 @@ def generate_doctors(connection, num_doctors):
             'available_days': 'Mon-Fri',
             'available_hours': '9:00-17:00',
             'created_at': CONFIG['START_DATE'],
-            'updated_at': datetime.now()
+            'updated_at': CONFIG['AS_OF']
         }
 
         doctors.append(doctor)
@@ -389,6 +181,7 @@ def generate_doctors(connection, num_doctors):
         """
 
         cursor.execute(query, doctor)
+        doctor['id'] = cursor.lastrowid
 
     connection.commit()
     cursor.close()
@@ -406,7 +199,7 @@ def generate_patients(connection, num_patients):
 
     for i in range(1, num_patients + 1):
         gender = random.choice(['Male', 'Female'])
-        dob = fake.date_of_birth(minimum_age=1, maximum_age=90)
+        dob = random_date_between(CONFIG['AS_OF'] - timedelta(days=90 * 365), CONFIG['AS_OF'] - timedelta(days=365)).date()
         created_date = random_date_between(CONFIG['START_DATE'], CONFIG['END_DATE'])
 
         patient = {
@@ -433,7 +226,7 @@ def generate_patients(connection, num_patients):
             'allergies': ', '.join(random.sample(COMMON_ALLERGIES, random.randint(0, 3))),
             'medical_history': fake.text(max_nb_chars=200) if random.random() > 0.6 else None,
             'created_at': created_date,
-            'updated_at': datetime.now()
+            'updated_at': CONFIG['AS_OF']
         }
 
         patients.append(patient)
@@ -453,6 +246,7 @@ def generate_patients(connection, num_patients):
         """
 
         cursor.execute(query, patient)
+        patient['id'] = cursor.lastrowid
 
         if i % 500 == 0:
             print(f"   Created {i} patients...")
@@ -488,7 +282,7 @@ def generate_appointments(connection, patients, doctors):
             appointment_time = f"{hour:02d}:{minute:02d}:00"
 
             # Status based on date
-            if appointment_date > datetime.now():
+            if appointment_date > CONFIG['AS_OF']:
                 status = 'Scheduled'
                 missed = False
             else:
@@ -503,8 +297,8 @@ def generate_appointments(connection, patients, doctors):
 
             appointment = {
                 'source_id': f'APT{appointment_id:08d}',
-                'patient_id': patient['source_id'],
-                'doctor_id': doctor['source_id'],
+                'patient_id': patient['id'],
+                'doctor_id': doctor['id'],
                 'appointment_date': appointment_date.date(),
                 'appointment_time': appointment_time,
                 'duration': random.choice(['30 min', '45 min', '60 min', '90 min']),
@@ -518,7 +312,7 @@ def generate_appointments(connection, patients, doctors):
                 'prescription': fake.text(max_nb_chars=100) if status == 'Completed' and random.random() > 0.7 else None,
                 'notes': fake.text(max_nb_chars=150) if random.random() > 0.7 else None,
                 'created_at': appointment_date,
-                'updated_at': datetime.now()
+                'updated_at': CONFIG['AS_OF']
             }
 
             appointments.append(appointment)
@@ -536,6 +330,7 @@ def generate_appointments(connection, patients, doctors):
             """
 
             cursor.execute(query, appointment)
+            appointment['id'] = cursor.lastrowid
             appointment_id += 1
 
         if appointment_id % 1000 == 0:
@@ -581,7 +376,7 @@ def generate_treatments(connection, appointments, patients, doctors):
                 'completion_date': appointment['appointment_date'] if random.random() < 0.8 else None,
                 'notes': fake.text(max_nb_chars=150) if random.random() > 0.7 else None,
                 'created_at': appointment['created_at'],
-                'updated_at': datetime.now()
+                'updated_at': CONFIG['AS_OF']
             }
 
             treatments.append(treatment)
@@ -678,7 +473,7 @@ def generate_invoices_and_payments(connection, appointments, treatments):
             'invoice_number': f'INV-{invoice_id:08d}',
             'patient_id': appointment['patient_id'],
             'doctor_id': appointment['doctor_id'],
-            'appointment_id': appointment['source_id'],
+            'appointment_id': appointment['id'],
             'invoice_date': appointment['appointment_date'],
             'due_date': appointment['appointment_date'] + timedelta(days=30),
             'status': status,
@@ -692,7 +487,7 @@ def generate_invoices_and_payments(connection, appointments, treatments):
             'balance_due': round(balance_due, 2),
             'notes': fake.text(max_nb_chars=100) if random.random() > 0.8 else None,
             'created_at': appointment['created_at'],
-            'updated_at': datetime.now()
+            'updated_at': CONFIG['AS_OF']
         }
 
         invoices.append(invoice)
@@ -723,7 +518,7 @@ def generate_invoices_and_payments(connection, appointments, treatments):
                 'quantity': 1,
                 'total_amount': treatment['price'],
                 'created_at': invoice['created_at'],
-                'updated_at': datetime.now()
+                'updated_at': CONFIG['AS_OF']
             }
 
             invoice_items.append(item)
@@ -770,7 +565,7 @@ def generate_invoices_and_payments(connection, appointments, treatments):
                         'payment_date': payment_date,
                         'notes': fake.text(max_nb_chars=100) if random.random() > 0.8 else None,
                         'created_at': payment_date,
-                        'updated_at': datetime.now(),
+                        'updated_at': CONFIG['AS_OF'],
                         'deleted_at': None
                     }
 
@@ -829,7 +624,7 @@ def generate_inventory(connection, num_items):
             'minimum_quantity_critical': random.randint(5, 20),
             'currency': 'USD',
             'created_at': random_date_between(CONFIG['START_DATE'], CONFIG['END_DATE']),
-            'updated_at': datetime.now(),
+            'updated_at': CONFIG['AS_OF'],
             'deleted_at': None
         }
 
@@ -869,10 +664,16 @@ def generate_statistics(connection):
     tables = ['patients', 'doctors', 'appointments', 'treatments',
               'invoices', 'invoice_items', 'payments', 'inventory']
 
+    # Row counts and checksums double as a fingerprint: equal fingerprints mean identical data
+    fingerprint = hashlib.sha256()
     for table in tables:
         cursor.execute(f"SELECT COUNT(*) FROM {table}")
         count = cursor.fetchone()[0]
-        print(f"   {table.capitalize():20}: {count:,} records")
+        cursor.execute(f"CHECKSUM TABLE {table}")
+        checksum = cursor.fetchone()[1]
+        fingerprint.update(f"{table}:{count}:{checksum};".encode())
+        print(f"   {table.capitalize():20}: {count:,} records (checksum {checksum})")
+    print(f"   {'Fingerprint':20}: {fingerprint.hexdigest()[:16]}")
 
     # Additional statistics
     cursor.execute("SELECT COUNT(*) FROM appointments WHERE status = 'Completed'")
@@ -881,7 +682,7 @@ def generate_statistics(connection):
     cursor.execute("SELECT COUNT(*) FROM appointments WHERE missed = TRUE")
     missed_appts = cursor.fetchone()[0]
 
-    cursor.execute("SELECT COUNT(*) FROM appointments WHERE appointment_date > CURDATE()")
+    cursor.execute("SELECT COUNT(*) FROM appointments WHERE appointment_date > %s", (CONFIG['AS_OF'],))
     future_appts = cursor.fetchone()[0]
 
     cursor.execute("SELECT SUM(total_amount) FROM invoices")
@@ -911,11 +712,16 @@ def generate_statistics(connection):
 
 def main():
     """Main function to generate all dummy data"""
+    seed = CONFIG['SEED'] if CONFIG['SEED'] is not None else random.randrange(2 ** 32)
+    random.seed(seed)
+    fake.seed_instance(seed)
+
     print("\n" + "=" * 60)
     print("🚀 TOOTHPICK EVE - DUMMY DATA GENERATOR")
     print("=" * 60)
     print(f"Target: {CONFIG['NUM_PATIENTS']:,} patients over multiple years")
     print(f"Period: {CONFIG['START_DATE'].strftime('%Y-%m-%d')} to {CONFIG['END_DATE'].strftime('%Y-%m-%d')}")
+    print(f"Seed: {seed}")
     print("=" * 60 + "\n")
 
     # Connect to database
@@ -926,8 +732,8 @@ def main():
         return
 
     try:
-        # Create tables
-        create_tables(connection)
+        # Create or upgrade tables
+        ensure_schema(connection)
 
         # Generate data in proper order
         doctors = generate_doctors(connection, CONFIG['NUM_DOCTORS'])
@@ -12,14 +12,29 @@
 
 import mysql.connector
 from mysql.connector import Error
-from faker import Faker
+from faker import Faker, VERSION as FAKER_VERSION
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
 import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from time import perf_counter
 from decimal import Decimal
+from schema import add_year_partitions, ensure_schema, prepare_shadow_tables, swap_shadow_tables
 
 # Initialize Faker for generating realistic data
 fake = Faker()
 
+# NumPy generator for the column-at-a-time attribute sampling (reseeded per shard)
+rng = np.random.default_rng()
+
+# Pre-generated Faker values by pool name, filled by load_faker_pools()
+faker_pools = {}
+
 # Configuration
 CONFIG = {
     'HOST': 'localhost',
@@ -33,6 +48,7 @@ CONFIG = {
     'NUM_INVENTORY_ITEMS': 200,
     'START_DATE': datetime(2020, 1, 1),
     'END_DATE': datetime(2026, 12, 31),
+    'AS_OF': datetime(2026, 1, 1),  # Fixed "today": splits past/future appointments and stamps updated_at
 
     # Business rules
     'AVG_APPOINTMENTS_PER_PATIENT': 4,
@@ -40,6 +56,23 @@ CONFIG = {
     'TREATMENT_COMPLETION_RATE': 0.75,  # 75% complete treatments
     'PAYMENT_FULL_RATE': 0.70,  # 70% pay in full immediately
     'PAYMENT_PARTIAL_RATE': 0.20,  # 20% pay partially
+    'NUM_ROOMS': None,  # None = one per doctor, the most that can be in use at once; a number makes rooms scarce
+    'SCHEDULE_SEARCH_DAYS': 14,  # Days an appointment may slip when its doctor or the rooms are fully booked
+    'PARTITION_BY_YEAR': False,  # RANGE-partition appointments/treatments by year, once (schema migration 4; drops their foreign keys)
+    'SHADOW_LOAD': False,  # Generate into <database>_staging and swap the tables in at the end (no empty tables meanwhile)
+
+    # Write settings
+    'INSERT_CHUNK_SIZE': 1000,  # Rows buffered per table before one multi-row insert
+    'PATIENT_BLOCK_SIZE': 1000,  # Patients whose appointments/treatments/invoices are sampled as one set of arrays
+
+    # Faker value pools (names, addresses and notes are sampled from these instead of calling Faker per row)
+    'NAME_POOL_SIZE': 5000,  # Values per name/address/email pool; raise it for higher-cardinality name columns
+    'TEXT_POOL_SIZE': 2000,  # Notes per free-text pool
+    'FAKER_POOL_CACHE': os.path.join(os.path.expanduser('~'), '.cache', 'toothpick-eve', 'faker_pools.json'),  # Reused while the seed and pool sizes match; None disables caching
+
+    # Parallel generation (overridable with --workers / --seed)
+    'WORKERS': 1,  # Processes sharing the patients, each with its own connection
+    'SEED': None,  # Same seed (and worker count) = byte-identical tables; None picks one and prints it
 }
 
 # Reference data
@@ -96,6 +129,22 @@ COMMON_ALLERGIES = [
     'Ibuprofen', 'Codeine', 'None Known'
 ]
 
+# Clinic calendar: 15-minute slots from 9:00 to 17:00
+SLOT_MINUTES = 15
+DAY_START_HOUR = 9
+SLOTS_PER_DAY = 32
+APPOINTMENT_DURATIONS = [30, 45, 60, 90]  # minutes
+
+# Most records one patient can produce, used to give every shard its own id range
+MAX_RECORDS_PER_PATIENT = {
+    'patients': 1,
+    'appointments': 6,  # 2-6 appointments
+    'treatments': 18,  # 1-3 per completed appointment
+    'invoices': 6,  # at most one per completed appointment
+    'invoice_items': 108,  # every invoice lists all treatments done that day
+    'payments': 18,  # up to 3 per paid invoice
+}
+
 
 # Phone number formats by country
 def generate_phone_number(country=None):
@@ -158,6 +207,10 @@ def create_database_connection():
             cursor.execute("SET SESSION sql_mode = 'NO_ENGINE_SUBSTITUTION'")
             print("✅ SQL mode configured")
 
+            # Tables are flushed in independent chunks (and shards write in parallel), so a child
+            # row can reach the server before its parent; the generated ids are consistent anyway
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+
             cursor.execute(f"CREATE DATABASE IF NOT EXISTS {CONFIG['DATABASE_NAME']}")
             print(f"📦 Database '{CONFIG['DATABASE_NAME']}' created or already exists")
             cursor.execute(f"USE {CONFIG['DATABASE_NAME']}")
@@ -169,218 +222,6 @@ def create_database_connection():
         return None
 
 
-def create_tables(connection):
-    """Create all necessary tables (copy from original script)"""
-    cursor = connection.cursor()
-
-    tables = {
-        'patients': """
-            CREATE TABLE IF NOT EXISTS patients (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                first_name VARCHAR(100),
-                father_name VARCHAR(100),
-                last_name VARCHAR(100),
-                mother_name VARCHAR(100),
-                id_nb VARCHAR(50),
-                date_of_birth DATE,
-                gender VARCHAR(20),
-                marital_status VARCHAR(20),
-                nationality VARCHAR(100),
-                phone VARCHAR(100),
-                phone_alt VARCHAR(100),
-                email VARCHAR(100),
-                address_line1 TEXT,
-                address_line2 TEXT,
-                city VARCHAR(50),
-                state VARCHAR(50),
-                zip_code VARCHAR(10),
-                country VARCHAR(100),
-                blood_group VARCHAR(5),
-                allergies TEXT,
-                medical_history TEXT,
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_source_id (source_id)
-            )
-        """,
-        'patient_relationships': """
-            CREATE TABLE IF NOT EXISTS patient_relationships (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                patient_id INT,
-                related_patient_id INT,
-                relationship_type VARCHAR(50),
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL
-            )
-        """,
-        'doctors': """
-            CREATE TABLE IF NOT EXISTS doctors (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                title VARCHAR(50),
-                first_name VARCHAR(50),
-                father_name VARCHAR(100),
-                last_name VARCHAR(50),
-                specialization VARCHAR(255),
-                qualification VARCHAR(200),
-                license_number VARCHAR(50),
-                phone VARCHAR(100),
-                phone_alt VARCHAR(100),
-                email VARCHAR(100),
-                department VARCHAR(100),
-                consultation_fee DECIMAL(10, 2),
-                available_days VARCHAR(100),
-                available_hours VARCHAR(100),
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_source_id (source_id)
-            )
-        """,
-        'appointments': """
-            CREATE TABLE IF NOT EXISTS appointments (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                patient_id VARCHAR(50),
-                doctor_id VARCHAR(50),
-                appointment_date DATE,
-                appointment_time TIME,
-                duration VARCHAR(50),
-                duration_minutes INT,
-                revision_number INT,
-                room VARCHAR(50),
-                status VARCHAR(50),
-                missed BOOLEAN DEFAULT FALSE,
-                reason_for_visit TEXT,
-                diagnosis TEXT,
-                prescription TEXT,
-                notes TEXT,
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_patient_id (patient_id),
-                INDEX idx_doctor_id (doctor_id),
-                INDEX idx_appointment_date (appointment_date)
-            )
-        """,
-        'invoices': """
-            CREATE TABLE IF NOT EXISTS invoices (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                invoice_number VARCHAR(50),
-                patient_id VARCHAR(50),
-                doctor_id VARCHAR(50),
-                appointment_id VARCHAR(50),
-                invoice_date DATE,
-                due_date DATE,
-                status VARCHAR(50),
-                currency VARCHAR(10) DEFAULT 'USD',
-                subtotal DECIMAL(10, 2) DEFAULT 0.00,
-                discount_type VARCHAR(20),
-                discount_value DECIMAL(10, 2) DEFAULT 0.00,
-                tax DECIMAL(10, 2) DEFAULT 0.00,
-                total_amount DECIMAL(10, 2),
-                amount_paid DECIMAL(10, 2) DEFAULT 0.00,
-                balance_due DECIMAL(10, 2),
-                notes TEXT,
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_source_id (source_id),
-                INDEX idx_patient_id (patient_id)
-            )
-        """,
-        'invoice_items': """
-            CREATE TABLE IF NOT EXISTS invoice_items (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50),
-                invoice_id INT,
-                invoice_source_id VARCHAR(50),
-                description TEXT,
-                unit_price DECIMAL(10, 2),
-                quantity INT DEFAULT 1,
-                total_amount DECIMAL(10, 2),
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_invoice_id (invoice_id)
-            )
-        """,
-        'payments': """
-            CREATE TABLE IF NOT EXISTS payments (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                invoice_id INT,
-                invoice_source_id VARCHAR(50),
-                patient_id VARCHAR(50),
-                payment_method VARCHAR(50),
-                amount DECIMAL(10, 2),
-                original_amount DECIMAL(10, 2),
-                currency VARCHAR(10),
-                reference_number VARCHAR(100),
-                payment_date DATE,
-                notes TEXT,
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                deleted_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_invoice_id (invoice_id),
-                INDEX idx_patient_id (patient_id)
-            )
-        """,
-        'treatments': """
-            CREATE TABLE IF NOT EXISTS treatments (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                patient_id VARCHAR(50),
-                doctor_id VARCHAR(50),
-                tooth_number VARCHAR(20),
-                procedure_code VARCHAR(50),
-                procedure_name VARCHAR(200),
-                procedure_group VARCHAR(100),
-                treatment_plan VARCHAR(100),
-                status VARCHAR(50),
-                price DECIMAL(10, 2),
-                planned_date DATE,
-                start_date DATE,
-                completion_date DATE,
-                notes TEXT,
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_patient_id (patient_id),
-                INDEX idx_doctor_id (doctor_id)
-            )
-        """,
-        'inventory': """
-            CREATE TABLE IF NOT EXISTS inventory (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                source_id VARCHAR(50) UNIQUE,
-                category VARCHAR(100),
-                name VARCHAR(200),
-                sku VARCHAR(50),
-                description TEXT,
-                unit_of_measure VARCHAR(50),
-                size DECIMAL(10, 2),
-                quantity_in_stock DECIMAL(10, 2),
-                unit_size DECIMAL(10, 2),
-                average_purchase_price DECIMAL(10, 2),
-                selling_price DECIMAL(10, 2),
-                minimum_quantity_warning INT,
-                minimum_quantity_critical INT,
-                currency VARCHAR(10),
-                created_at TIMESTAMP NULL DEFAULT NULL,
-                updated_at TIMESTAMP NULL DEFAULT NULL,
-                deleted_at TIMESTAMP NULL DEFAULT NULL,
-                INDEX idx_source_id (source_id)
-            )
-        """
-    }
-
-    for table_name, create_statement in tables.items():
-        cursor.execute(create_statement)
-        print(f"🧱 Table '{table_name}' created")
-
-    connection.commit()
-    cursor.close()
-    print("✅ All tables created successfully!\n")
-
-
 def truncate_tables(connection):
     """Truncate all tables to remove old data before generating new data"""
     cursor = connection.cursor()
@@ -401,15 +242,16 @@ def truncate_tables(connection):
     ]
 
     try:
-        # Disable foreign key checks temporarily (just in case)
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        # Disable foreign key checks for the truncation, keeping the session's setting to restore
+        cursor.execute("SET @previous_fk_checks = @@SESSION.foreign_key_checks")
+        cursor.execute("SET SESSION foreign_key_checks = 0")
 
         for table in tables:
             cursor.execute(f"TRUNCATE TABLE {table}")
             print(f"   ✓ Truncated '{table}'")
 
-        # Re-enable foreign key checks
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        # Restore, not force on: the connection generates with checks off (see create_database_connection)
+        cursor.execute("SET SESSION foreign_key_checks = @previous_fk_checks")
 
         connection.commit()
         cursor.close()
@@ -426,481 +268,723 @@ def random_date_between(start, end):
     return start + timedelta(days=random_days)
 
 
+# Faker pools: each pool is filled by calling Faker POOL_SIZE times, so common
+# values repeat in the pool as often as Faker would produce them
+FAKER_POOLS = {
+    'first_name': ('NAME_POOL_SIZE', lambda: fake.first_name()),
+    'first_name_male': ('NAME_POOL_SIZE', lambda: fake.first_name_male()),
+    'first_name_female': ('NAME_POOL_SIZE', lambda: fake.first_name_female()),
+    'last_name': ('NAME_POOL_SIZE', lambda: fake.last_name()),
+    'email': ('NAME_POOL_SIZE', lambda: fake.email()),
+    'street_address': ('NAME_POOL_SIZE', lambda: fake.street_address()),
+    'secondary_address': ('NAME_POOL_SIZE', lambda: fake.secondary_address()),
+    'city': ('NAME_POOL_SIZE', lambda: fake.city()),
+    'zipcode': ('NAME_POOL_SIZE', lambda: fake.zipcode()),
+    'text_100': ('TEXT_POOL_SIZE', lambda: fake.text(max_nb_chars=100)),
+    'text_150': ('TEXT_POOL_SIZE', lambda: fake.text(max_nb_chars=150)),
+    'text_200': ('TEXT_POOL_SIZE', lambda: fake.text(max_nb_chars=200)),
+}
+
+
+def load_faker_pools(seed):
+    """Fill the Faker pools for this seed, from the on-disk cache when it matches"""
+    global faker_pools
+    sizes = {name: CONFIG[size_key] for name, (size_key, _) in FAKER_POOLS.items()}
+    key = hashlib.sha256(json.dumps([str(seed), FAKER_VERSION, sizes], sort_keys=True).encode()).hexdigest()
+    cache_file = CONFIG['FAKER_POOL_CACHE']
+
+    if cache_file and os.path.exists(cache_file):
+        with open(cache_file, encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            faker_pools = cached['pools']
+            print(f"🧺 Faker pools loaded from '{cache_file}'")
+            return faker_pools
+
+    print("🧺 Building Faker pools...")
+    fake.seed_instance(f"{seed}-pools")
+    faker_pools = {name: [make() for _ in range(sizes[name])] for name, (_, make) in FAKER_POOLS.items()}
+
+    if cache_file:
+        os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'pools': faker_pools}, f)
+        print(f"   Cached in '{cache_file}'")
+
+    return faker_pools
+
+
+def pooled(name):
+    """Pick one value from a Faker pool"""
+    return random.choice(faker_pools[name])
+
+
+def pooled_column(name, mask):
+    """Pool values where the mask is set, None elsewhere"""
+    pool = faker_pools[name]
+    picks = rng.integers(0, len(pool), len(mask)).tolist()
+    return [pool[pick] if wanted else None for pick, wanted in zip(picks, mask.tolist())]
+
+
+class TableBuffer:
+    """Buffers rows for one INSERT and writes them in chunks with executemany (a multi-row insert)"""
+
+    def __init__(self, connection, query, chunk_size=None):
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.query = query
+        self.chunk_size = chunk_size or CONFIG['INSERT_CHUNK_SIZE']
+        self.rows = []
+        self.written = 0
+
+    def add(self, row):
+        """Queue a row, writing the buffer once it holds a full chunk"""
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write and commit everything buffered so far"""
+        if self.rows:
+            self.cursor.executemany(self.query, self.rows)
+            self.connection.commit()
+            self.written += len(self.rows)
+            self.rows = []
+
+    def close(self):
+        """Write the remaining rows and release the cursor"""
+        self.flush()
+        self.cursor.close()
+
+
 def generate_doctors(connection, num_doctors):
     """Generate dummy doctor records"""
-    cursor = connection.cursor()
     doctors = []
 
     print(f"👨‍⚕️ Generating {num_doctors} doctors...")
 
+    doctor_rows = TableBuffer(connection, """
+        INSERT INTO doctors (
+            id, source_id, title, first_name, father_name, last_name, specialization,
+            qualification, license_number, phone, phone_alt, email, department,
+            consultation_fee, available_days, available_hours, created_at, updated_at
+        ) VALUES (
+            %(id)s, %(source_id)s, %(title)s, %(first_name)s, %(father_name)s, %(last_name)s, %(specialization)s,
+            %(qualification)s, %(license_number)s, %(phone)s, %(phone_alt)s, %(email)s, %(department)s,
+            %(consultation_fee)s, %(available_days)s, %(available_hours)s, %(created_at)s, %(updated_at)s
+        )
+    """)
+
     for i in range(1, num_doctors + 1):
         specialization = random.choice(SPECIALIZATIONS)
 
         doctor = {
+            'id': i,
             'source_id': f'DOC{i:04d}',
             'title': random.choice(['Dr.', 'Prof.', 'Dr.']),
-            'first_name': fake.first_name(),
-            'father_name': fake.first_name(),
-            'last_name': fake.last_name(),
+            'first_name': pooled('first_name'),
+            'father_name': pooled('first_name'),
+            'last_name': pooled('last_name'),
             'specialization': specialization,
             'qualification': random.choice(['DDS', 'DMD', 'BDS, MDS', 'DDS, PhD']),
             'license_number': f'LIC{random.randint(10000, 99999)}',
             'phone': generate_phone_number('lebanon'),  # Doctors mostly have Lebanese numbers
             'phone_alt': generate_phone_number('lebanon') if random.random() > 0.5 else None,
-            'email': fake.email(),
+            'email': pooled('email'),
             'department': 'Dentistry',
             'consultation_fee': round(random.uniform(50, 150), 2),
             'available_days': 'Mon-Fri',
             'available_hours': '9:00-17:00',
             'created_at': CONFIG['START_DATE'],
-            'updated_at': datetime.now()
+            'updated_at': CONFIG['AS_OF']
         }
 
         doctors.append(doctor)
 
-        query = """
-            INSERT INTO doctors (
-                source_id, title, first_name, father_name, last_name, specialization,
-                qualification, license_number, phone, phone_alt, email, department,
-                consultation_fee, available_days, available_hours, created_at, updated_at
-            ) VALUES (
-                %(source_id)s, %(title)s, %(first_name)s, %(father_name)s, %(last_name)s, %(specialization)s,
-                %(qualification)s, %(license_number)s, %(phone)s, %(phone_alt)s, %(email)s, %(department)s,
-                %(consultation_fee)s, %(available_days)s, %(available_hours)s, %(created_at)s, %(updated_at)s
-            )
-        """
-
-        cursor.execute(query, doctor)
+        doctor_rows.add(doctor)
 
-    connection.commit()
-    cursor.close()
+    doctor_rows.close()
     print(f"✅ {num_doctors} doctors created\n")
 
     return doctors
 
 
-def generate_patients(connection, num_patients):
-    """Generate dummy patient records"""
-    cursor = connection.cursor()
-    patients = []
-
-    print(f"👥 Generating {num_patients} patients...")
-
-    for i in range(1, num_patients + 1):
-        gender = random.choice(['male', 'female', 'male', 'female', 'male', 'female'])  # 95% male/female, 5% other/unknown
-        if random.random() > 0.95:
-            gender = random.choice(['other', 'unknown'])
-
-        dob = fake.date_of_birth(minimum_age=1, maximum_age=90)
-        created_date = random_date_between(CONFIG['START_DATE'], CONFIG['END_DATE'])
-
-        patient = {
-            'source_id': f'PAT{i:06d}',
-            'first_name': fake.first_name_male() if gender == 'male' else fake.first_name_female() if gender == 'female' else fake.first_name(),
-            'father_name': fake.first_name_male(),
-            'last_name': fake.last_name(),
-            'mother_name': fake.first_name_female(),
-            'id_nb': f'ID{random.randint(100000000, 999999999)}',
-            'date_of_birth': dob,
-            'gender': gender,
-            'marital_status': random.choice(['single', 'married', 'divorced', 'widowed']),
-            'nationality': 'Lebanese',
-            'phone': generate_phone_number(),
-            'phone_alt': generate_phone_number() if random.random() > 0.7 else None,
-            'email': fake.email() if random.random() > 0.3 else None,
-            'address_line1': fake.street_address(),
-            'address_line2': fake.secondary_address() if random.random() > 0.8 else None,
-            'city': fake.city(),
-            'state': random.choice(['Beirut', 'Mount Lebanon', 'North', 'South', 'Bekaa']),
-            'zip_code': fake.zipcode(),
-            'country': 'Lebanon',
-            'blood_group': random.choice(BLOOD_GROUPS),
-            'allergies': ', '.join(random.sample(COMMON_ALLERGIES, random.randint(0, 3))),
-            'medical_history': fake.text(max_nb_chars=200) if random.random() > 0.6 else None,
-            'created_at': created_date,
-            'updated_at': datetime.now()
-        }
+def build_patient(patient_number):
+    """Build one dummy patient record"""
+    gender = random.choice(['male', 'female', 'male', 'female', 'male', 'female'])  # 95% male/female, 5% other/unknown
+    if random.random() > 0.95:
+        gender = random.choice(['other', 'unknown'])
+
+    dob = random_date_between(CONFIG['AS_OF'] - timedelta(days=90 * 365), CONFIG['AS_OF'] - timedelta(days=365)).date()
+    created_date = random_date_between(CONFIG['START_DATE'], CONFIG['END_DATE'])
+
+    return {
+        'id': patient_number,
+        'source_id': f'PAT{patient_number:06d}',
+        'first_name': pooled('first_name_male') if gender == 'male' else pooled('first_name_female') if gender == 'female' else pooled('first_name'),
+        'father_name': pooled('first_name_male'),
+        'last_name': pooled('last_name'),
+        'mother_name': pooled('first_name_female'),
+        'id_nb': f'ID{random.randint(100000000, 999999999)}',
+        'date_of_birth': dob,
+        'gender': gender,
+        'marital_status': random.choice(['single', 'married', 'divorced', 'widowed']),
+        'nationality': 'Lebanese',
+        'phone': generate_phone_number(),
+        'phone_alt': generate_phone_number() if random.random() > 0.7 else None,
+        'email': pooled('email') if random.random() > 0.3 else None,
+        'address_line1': pooled('street_address'),
+        'address_line2': pooled('secondary_address') if random.random() > 0.8 else None,
+        'city': pooled('city'),
+        'state': random.choice(['Beirut', 'Mount Lebanon', 'North', 'South', 'Bekaa']),
+        'zip_code': pooled('zipcode'),
+        'country': 'Lebanon',
+        'blood_group': random.choice(BLOOD_GROUPS),
+        'allergies': ', '.join(random.sample(COMMON_ALLERGIES, random.randint(0, 3))),
+        'medical_history': pooled('text_200') if random.random() > 0.6 else None,
+        'created_at': created_date,
+        'updated_at': CONFIG['AS_OF']
+    }
 
-        patients.append(patient)
 
-        query = """
-            INSERT INTO patients (
-                source_id, first_name, father_name, last_name, mother_name, id_nb,
-                date_of_birth, gender, marital_status, nationality, phone, phone_alt,
-                email, address_line1, address_line2, city, state, zip_code, country,
-                blood_group, allergies, medical_history, created_at, updated_at
-            ) VALUES (
-                %(source_id)s, %(first_name)s, %(father_name)s, %(last_name)s, %(mother_name)s, %(id_nb)s,
-                %(date_of_birth)s, %(gender)s, %(marital_status)s, %(nationality)s, %(phone)s, %(phone_alt)s,
-                %(email)s, %(address_line1)s, %(address_line2)s, %(city)s, %(state)s, %(zip_code)s, %(country)s,
-                %(blood_group)s, %(allergies)s, %(medical_history)s, %(created_at)s, %(updated_at)s
-            )
-        """
+def take(values, index):
+    """Pick values[i] for every i in a NumPy index array"""
+    return [values[i] for i in index.tolist()]
 
-        cursor.execute(query, patient)
 
-        if i % 500 == 0:
-            print(f"   Created {i} patients...")
+def day_dates(days):
+    """Turn day offsets from START_DATE into date objects"""
+    return (np.datetime64(CONFIG['START_DATE'], 'D') + days).tolist()
 
-    connection.commit()
-    cursor.close()
-    print(f"✅ {num_patients} patients created\n")
 
-    return patients
+def column_rows(columns):
+    """Assemble row dicts from a dict of equally long columns"""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
 
 
-def generate_appointments(connection, patients, doctors):
-    """Generate dummy appointment records"""
-    cursor = connection.cursor()
-    appointments = []
-    appointment_id = 1
+def lowest_bit(bitmap):
+    """Index of the lowest set bit"""
+    return (bitmap & -bitmap).bit_length() - 1
 
-    print(f"📅 Generating appointments...")
 
-    for patient in patients:
-        # Each patient gets 2-6 appointments
-        num_appointments = random.randint(2, 6)
+class Scheduler:
+    """Books appointments into per-doctor and per-room day calendars
 
-        patient_created = patient['created_at']
+    Each (doctor, day) and (room, day) calendar is an int bitmap with one bit per
+    15-minute slot, so finding a free stretch takes a few bit operations instead of
+    a scan over earlier bookings. Memory grows with the calendar, not the patients.
+    """
 
-        for _ in range(num_appointments):
-            # Random date between patient creation and END_DATE (now includes 2026)
-            appointment_date = random_date_between(patient_created, CONFIG['END_DATE'])
+    FULL_DAY = (1 << SLOTS_PER_DAY) - 1
 
-            # Random time during work hours
-            hour = random.randint(9, 16)
-            minute = random.choice([0, 15, 30, 45])
-            appointment_time = f"{hour:02d}:{minute:02d}:00"
+    def __init__(self, rooms, last_day):
+        self.rooms = rooms
+        self.last_day = last_day
+        self.doctor_busy = {}
+        self.room_busy = {}
+        self.unscheduled = 0
 
-            # Status based on date
-            if appointment_date > datetime.now():
-                status = random.choice(['scheduled', 'confirmed', 'pending'])
-                missed = False
-            else:
-                if random.random() < CONFIG['APPOINTMENT_SHOW_RATE']:
-                    status = random.choice(['completed', 'completed', 'completed', 'attended', 'checked_in'])
-                    missed = False
-                else:
-                    status = random.choice(['no_show', 'missed', 'cancelled'])
-                    missed = True
-
-            doctor = random.choice(doctors)
-
-            appointment = {
-                'source_id': f'APT{appointment_id:08d}',
-                'patient_id': patient['source_id'],
-                'doctor_id': doctor['source_id'],
-                'appointment_date': appointment_date.date(),
-                'appointment_time': appointment_time,
-                'duration': random.choice(['30 min', '45 min', '60 min', '90 min']),
-                'duration_minutes': random.choice([30, 45, 60, 90]),
-                'revision_number': 0,
-                'room': f'Room {random.randint(1, 10)}',
-                'status': status,
-                'missed': missed,
-                'reason_for_visit': random.choice(['Checkup', 'Cleaning', 'Filling', 'Crown', 'Extraction', 'Consultation']),
-                'diagnosis': fake.text(max_nb_chars=100) if status == 'completed' and random.random() > 0.5 else None,
-                'prescription': fake.text(max_nb_chars=100) if status == 'completed' and random.random() > 0.7 else None,
-                'notes': fake.text(max_nb_chars=150) if random.random() > 0.7 else None,
-                'created_at': appointment_date,
-                'updated_at': datetime.now()
-            }
-
-            appointments.append(appointment)
-
-            query = """
-                INSERT INTO appointments (
-                    source_id, patient_id, doctor_id, appointment_date, appointment_time,
-                    duration, duration_minutes, revision_number, room, status, missed,
-                    reason_for_visit, diagnosis, prescription, notes, created_at, updated_at
-                ) VALUES (
-                    %(source_id)s, %(patient_id)s, %(doctor_id)s, %(appointment_date)s, %(appointment_time)s,
-                    %(duration)s, %(duration_minutes)s, %(revision_number)s, %(room)s, %(status)s, %(missed)s,
-                    %(reason_for_visit)s, %(diagnosis)s, %(prescription)s, %(notes)s, %(created_at)s, %(updated_at)s
-                )
-            """
-
-            cursor.execute(query, appointment)
-            appointment_id += 1
-
-        if appointment_id % 1000 == 0:
-            print(f"   Created {appointment_id} appointments...")
-
-    connection.commit()
-    cursor.close()
-    print(f"✅ {len(appointments)} appointments created\n")
+    def free_starts(self, busy, length):
+        """Bitmap of start slots followed by `length` free slots (ending by closing time)"""
+        free = ~busy & self.FULL_DAY
+        starts = free
+        for offset in range(1, length):
+            starts &= free >> offset
+        return starts
 
-    return appointments
+    def book(self, doctor, day, length, preferred_slot, room_offset):
+        """Book `length` slots with the doctor on `day`, or the first later day with room for it
 
+        The slot closest after `preferred_slot` is taken (wrapping to the earliest one),
+        in the first room with space starting from `room_offset`. Returns (day, room, slot),
+        or None when nothing is free within SCHEDULE_SEARCH_DAYS.
+        """
+        for booking_day in range(day, min(day + CONFIG['SCHEDULE_SEARCH_DAYS'], self.last_day + 1)):
+            doctor_starts = self.free_starts(self.doctor_busy.get((doctor, booking_day), 0), length)
+            if not doctor_starts:
+                continue
+
+            for i in range(len(self.rooms)):
+                room = self.rooms[(room_offset + i) % len(self.rooms)]
+                starts = doctor_starts & self.free_starts(self.room_busy.get((room, booking_day), 0), length)
+                if not starts:
+                    continue
+
+                later = starts >> preferred_slot
+                slot = preferred_slot + lowest_bit(later) if later else lowest_bit(starts)
+                booked = ((1 << length) - 1) << slot
+                self.doctor_busy[(doctor, booking_day)] = self.doctor_busy.get((doctor, booking_day), 0) | booked
+                self.room_busy[(room, booking_day)] = self.room_busy.get((room, booking_day), 0) | booked
+                return booking_day, room, slot
+
+        self.unscheduled += 1
+        return None
 
-def generate_treatments(connection, appointments, patients, doctors):
-    """Generate dummy treatment records"""
-    cursor = connection.cursor()
-    treatments = []
-    treatment_id = 1
-
-    print(f"💉 Generating treatments...")
-
-    completed_appointments = [apt for apt in appointments if apt['status'] == 'completed']
-
-    for appointment in completed_appointments:
-        # Each completed appointment gets 1-3 treatments
-        num_treatments = random.randint(1, 3)
-
-        for _ in range(num_treatments):
-            procedure = random.choice(DENTAL_PROCEDURES)
-
-            treatment = {
-                'source_id': f'TRT{treatment_id:08d}',
-                'patient_id': appointment['patient_id'],
-                'doctor_id': appointment['doctor_id'],
-                'tooth_number': str(random.randint(1, 32)) if random.random() > 0.3 else None,
-                'procedure_code': procedure[0],
-                'procedure_name': procedure[1],
-                'procedure_group': procedure[2],
-                'treatment_plan': random.choice(['Standard', 'Comprehensive', 'Emergency', 'Cosmetic']),
-                'status': 'completed' if random.random() < CONFIG['TREATMENT_COMPLETION_RATE'] else 'in_progress',
-                'price': round(procedure[3] * random.uniform(0.9, 1.1), 2),
-                'planned_date': appointment['appointment_date'] - timedelta(days=random.randint(1, 30)),
-                'start_date': appointment['appointment_date'],
-                'completion_date': appointment['appointment_date'] if random.random() < 0.8 else None,
-                'notes': fake.text(max_nb_chars=150) if random.random() > 0.7 else None,
-                'created_at': appointment['created_at'],
-                'updated_at': datetime.now()
-            }
-
-            treatments.append(treatment)
-
-            query = """
-                INSERT INTO treatments (
-                    source_id, patient_id, doctor_id, tooth_number, procedure_code,
-                    procedure_name, procedure_group, treatment_plan, status, price,
-                    planned_date, start_date, completion_date, notes, created_at, updated_at
-                ) VALUES (
-                    %(source_id)s, %(patient_id)s, %(doctor_id)s, %(tooth_number)s, %(procedure_code)s,
-                    %(procedure_name)s, %(procedure_group)s, %(treatment_plan)s, %(status)s, %(price)s,
-                    %(planned_date)s, %(start_date)s, %(completion_date)s, %(notes)s, %(created_at)s, %(updated_at)s
-                )
-            """
-
-            cursor.execute(query, treatment)
-            treatment_id += 1
-
-        if treatment_id % 1000 == 0:
-            print(f"   Created {treatment_id} treatments...")
-
-    connection.commit()
-    cursor.close()
-    print(f"✅ {len(treatments)} treatments created\n")
 
-    return treatments
+def schedule_capacity(num_doctors, num_rooms):
+    """Most appointments the calendars can hold: every slot of every day booked"""
+    days = (CONFIG['END_DATE'] - CONFIG['START_DATE']).days + 1
+    mean_slots = np.mean(APPOINTMENT_DURATIONS) / SLOT_MINUTES
+    return int(min(num_doctors, num_rooms) * days * SLOTS_PER_DAY / mean_slots)
+
+
+def sample_appointments(patients, doctors, scheduler, counters):
+    """Draw every appointment attribute for a block of patients as whole columns
+
+    Dates, times, doctors and rooms come from the scheduler, so no doctor or room is
+    double-booked. Returns the columns plus the day offsets and completed mask that
+    treatments and invoices are derived from.
+    """
+    start_day = np.array([(patient['created_at'] - CONFIG['START_DATE']).days for patient in patients])
+    end_day = (CONFIG['END_DATE'] - CONFIG['START_DATE']).days
+    today = (CONFIG['AS_OF'] - CONFIG['START_DATE']).days
+
+    # Each patient asks for 2-6 appointments, between patient creation and END_DATE
+    patient_index = np.repeat(np.arange(len(patients)), rng.integers(2, 7, len(patients)))
+    n = len(patient_index)
+    wanted_days = start_day[patient_index] + rng.integers(0, end_day - start_day[patient_index] + 1)
+    durations = rng.choice(APPOINTMENT_DURATIONS, n)
+    doctor_index = rng.integers(0, len(doctors), n)
+
+    # Book each request with its doctor, moving it to a later day when that day is full
+    bookings = [
+        scheduler.book(doctor, day, minutes // SLOT_MINUTES, slot, room_offset)
+        for doctor, day, minutes, slot, room_offset in zip(
+            doctor_index.tolist(), wanted_days.tolist(), durations.tolist(),
+            rng.integers(0, SLOTS_PER_DAY, n).tolist(), rng.integers(0, len(scheduler.rooms), n).tolist())
+    ]
+    scheduled = np.array([booking is not None for booking in bookings], dtype=bool)
+    bookings = [booking for booking in bookings if booking is not None]
+    patient_index, durations, doctor_index = patient_index[scheduled], durations[scheduled], doctor_index[scheduled]
+    n = len(bookings)
+    days = np.array([day for day, _, _ in bookings], dtype=np.int64)
+
+    # Status based on date
+    future = days > today
+    showed = rng.random(n) < CONFIG['APPOINTMENT_SHOW_RATE']
+    status = np.where(future, rng.choice(['scheduled', 'confirmed', 'pending'], n),
+                      np.where(showed, rng.choice(['completed', 'completed', 'completed', 'attended', 'checked_in'], n),
+                               rng.choice(['no_show', 'missed', 'cancelled'], n)))
+    completed = status == 'completed'
+
+    ids = np.arange(counters['appointments'] + 1, counters['appointments'] + n + 1).tolist()
+    counters['appointments'] += n
+    dates = day_dates(days)
+    start_minutes = [DAY_START_HOUR * 60 + slot * SLOT_MINUTES for _, _, slot in bookings]
+
+    columns = {
+        'id': ids,
+        'source_id': [f'APT{i:08d}' for i in ids],
+        'patient_id': take([patient['id'] for patient in patients], patient_index),
+        'doctor_id': take([doctor['id'] for doctor in doctors], doctor_index),
+        'appointment_date': dates,
+        'appointment_time': [f"{start // 60:02d}:{start % 60:02d}:00" for start in start_minutes],
+        'duration': [f'{minutes} min' for minutes in durations.tolist()],
+        'duration_minutes': durations.tolist(),
+        'revision_number': [0] * n,
+        'room': [f'Room {room}' for _, room, _ in bookings],
+        'status': status.tolist(),
+        'missed': (~future & ~showed).tolist(),
+        'reason_for_visit': rng.choice(['Checkup', 'Cleaning', 'Filling', 'Crown', 'Extraction', 'Consultation'], n).tolist(),
+        'diagnosis': pooled_column('text_100', completed & (rng.random(n) > 0.5)),
+        'prescription': pooled_column('text_100', completed & (rng.random(n) > 0.7)),
+        'notes': pooled_column('text_150', rng.random(n) > 0.7),
+        'created_at': [datetime.combine(date, datetime.min.time()) for date in dates],
+        'updated_at': [CONFIG['AS_OF']] * n
+    }
 
+    return columns, patient_index, days, completed
+
+
+def sample_treatments(appointments, days, completed, counters):
+    """Draw 1-3 treatments per completed appointment as whole columns
+
+    Returns the columns plus, per treatment, the index of its appointment and its price.
+    """
+    appointment_index = np.flatnonzero(completed)
+    appointment_index = np.repeat(appointment_index, rng.integers(1, 4, len(appointment_index)))
+    n = len(appointment_index)
+
+    procedure = rng.integers(0, len(DENTAL_PROCEDURES), n)
+    price = np.round(np.array([p[3] for p in DENTAL_PROCEDURES])[procedure] * rng.uniform(0.9, 1.1, n), 2)
+    tooth = np.where(rng.random(n) > 0.3, rng.integers(1, 33, n), 0)
+    start_dates = take(appointments['appointment_date'], appointment_index)
+
+    ids = np.arange(counters['treatments'] + 1, counters['treatments'] + n + 1).tolist()
+    counters['treatments'] += n
+
+    columns = {
+        'id': ids,
+        'source_id': [f'TRT{i:08d}' for i in ids],
+        'patient_id': take(appointments['patient_id'], appointment_index),
+        'doctor_id': take(appointments['doctor_id'], appointment_index),
+        'tooth_number': [str(t) if t else None for t in tooth.tolist()],
+        'procedure_code': take([p[0] for p in DENTAL_PROCEDURES], procedure),
+        'procedure_name': take([p[1] for p in DENTAL_PROCEDURES], procedure),
+        'procedure_group': take([p[2] for p in DENTAL_PROCEDURES], procedure),
+        'treatment_plan': rng.choice(['Standard', 'Comprehensive', 'Emergency', 'Cosmetic'], n).tolist(),
+        'status': np.where(rng.random(n) < CONFIG['TREATMENT_COMPLETION_RATE'], 'completed', 'in_progress').tolist(),
+        'price': price.tolist(),
+        'planned_date': day_dates(days[appointment_index] - rng.integers(1, 31, n)),
+        'start_date': start_dates,
+        'completion_date': [date if done else None for date, done in zip(start_dates, (rng.random(n) < 0.8).tolist())],
+        'notes': pooled_column('text_150', rng.random(n) > 0.7),
+        'created_at': take(appointments['created_at'], appointment_index),
+        'updated_at': [CONFIG['AS_OF']] * n
+    }
 
-def generate_invoices_and_payments(connection, appointments, treatments):
-    """Generate dummy invoice, invoice item, and payment records"""
-    cursor = connection.cursor()
-    invoices = []
-    invoice_items = []
-    payments = []
-    invoice_id = 1
-    invoice_item_id = 1
-    payment_id = 1
-
-    print(f"💰 Generating invoices, items, and payments...")
-
-    # Since treatments don't have appointment_id anymore, we'll create invoices based on appointments
-    # and generate treatments within this function or link them by date and patient
-
-    # Group treatments by patient_id and date for easier lookup
-    treatments_by_patient_date = {}
-    for treatment in treatments:
-        key = (treatment['patient_id'], treatment['start_date'])
-        if key not in treatments_by_patient_date:
-            treatments_by_patient_date[key] = []
-        treatments_by_patient_date[key].append(treatment)
-
-    for appointment in appointments:
-        if appointment['status'] != 'completed':
-            continue
-
-        # Find treatments for this appointment by patient and date
-        key = (appointment['patient_id'], appointment['appointment_date'])
-        apt_treatments = treatments_by_patient_date.get(key, [])
-
-        if not apt_treatments:
-            continue
-
-        # Calculate total
-        total_amount = sum(t['price'] for t in apt_treatments)
-        subtotal = total_amount
-
-        # Random discount
-        discount_type = None
-        discount_value = 0
-        if random.random() > 0.8:  # 20% chance of discount
-            discount_type = random.choice(['Percentage', 'Fixed'])
-            if discount_type == 'Percentage':
-                discount_value = random.choice([5, 10, 15, 20])
-                total_amount = total_amount * (1 - discount_value / 100)
-            else:
-                discount_value = round(random.uniform(10, 50), 2)
-                total_amount = max(0, total_amount - discount_value)
-
-        # Tax (5% VAT for example)
-        tax = round(total_amount * 0.05, 2)
-        total_amount = round(total_amount + tax, 2)
-
-        # Determine payment status
-        rand = random.random()
-        if rand < CONFIG['PAYMENT_FULL_RATE']:
-            amount_paid = total_amount
-            status = 'paid'
-        elif rand < CONFIG['PAYMENT_FULL_RATE'] + CONFIG['PAYMENT_PARTIAL_RATE']:
-            amount_paid = total_amount * random.uniform(0.3, 0.7)
-            status = 'partially_paid'
-        else:
-            amount_paid = 0
-            status = 'unpaid'
-
-        balance_due = total_amount - amount_paid
-
-        invoice = {
-            'source_id': f'INV{invoice_id:08d}',
-            'invoice_number': f'INV-{invoice_id:08d}',
-            'patient_id': appointment['patient_id'],
-            'doctor_id': appointment['doctor_id'],
-            'appointment_id': appointment['source_id'],
-            'invoice_date': appointment['appointment_date'],
-            'due_date': appointment['appointment_date'] + timedelta(days=30),
-            'status': status,
-            'currency': 'USD',
-            'subtotal': round(subtotal, 2),
-            'discount_type': discount_type,
-            'discount_value': round(discount_value, 2) if discount_type else 0,
-            'tax': tax,
-            'total_amount': round(total_amount, 2),
-            'amount_paid': round(amount_paid, 2),
-            'balance_due': round(balance_due, 2),
-            'notes': fake.text(max_nb_chars=100) if random.random() > 0.8 else None,
-            'created_at': appointment['created_at'],
-            'updated_at': datetime.now()
-        }
+    return columns, appointment_index, price
+
+
+def sample_invoices(appointments, patient_index, days, completed, treatments, treatment_appointment, price, counters):
+    """Draw one invoice per completed appointment, with its items and payments
+
+    An invoice covers every treatment the patient had that day, so its amounts are
+    summed per (patient, day). Returns the invoice, item and payment columns.
+    """
+    # Group treatments by patient and day
+    day_span = int(days.max()) + 1 if len(days) else 1
+    treatment_key = patient_index[treatment_appointment] * day_span + days[treatment_appointment]
+    group_keys, treatment_group = np.unique(treatment_key, return_inverse=True)
+    group_subtotal = np.bincount(treatment_group, weights=price, minlength=len(group_keys))
+    grouped_treatments = np.split(np.argsort(treatment_group, kind='stable'),
+                                  np.cumsum(np.bincount(treatment_group, minlength=len(group_keys)))[:-1])
+
+    appointment_index = np.flatnonzero(completed)
+    invoice_group = np.searchsorted(group_keys, patient_index[appointment_index] * day_span + days[appointment_index])
+    m = len(appointment_index)
+    subtotal = group_subtotal[invoice_group] if m else np.zeros(0)
+
+    # Random discount (20% chance), half percentage and half fixed
+    discounted = rng.random(m) > 0.8
+    percentage = rng.random(m) < 0.5
+    percent_off = rng.choice([5, 10, 15, 20], m)
+    fixed_off = np.round(rng.uniform(10, 50, m), 2)
+    total = np.where(discounted & percentage, subtotal * (1 - percent_off / 100),
+                     np.where(discounted, np.maximum(0, subtotal - fixed_off), subtotal))
+
+    # Tax (5% VAT for example)
+    tax = np.round(total * 0.05, 2)
+    total = np.round(total + tax, 2)
+
+    # Determine payment status
+    rand = rng.random(m)
+    paid_full = rand < CONFIG['PAYMENT_FULL_RATE']
+    paid_partly = ~paid_full & (rand < CONFIG['PAYMENT_FULL_RATE'] + CONFIG['PAYMENT_PARTIAL_RATE'])
+    amount_paid = np.where(paid_full, total, np.where(paid_partly, total * rng.uniform(0.3, 0.7, m), 0))
+
+    ids = np.arange(counters['invoices'] + 1, counters['invoices'] + m + 1).tolist()
+    counters['invoices'] += m
+    source_ids = [f'INV{i:08d}' for i in ids]
+    invoice_dates = take(appointments['appointment_date'], appointment_index)
+    created = take(appointments['created_at'], appointment_index)
+    patient_ids = take(appointments['patient_id'], appointment_index)
+
+    invoices = {
+        'id': ids,
+        'source_id': source_ids,
+        'invoice_number': [f'INV-{i:08d}' for i in ids],
+        'patient_id': patient_ids,
+        'doctor_id': take(appointments['doctor_id'], appointment_index),
+        'appointment_id': take(appointments['id'], appointment_index),
+        'invoice_date': invoice_dates,
+        'due_date': [date + timedelta(days=30) for date in invoice_dates],
+        'status': np.where(paid_full, 'paid', np.where(paid_partly, 'partially_paid', 'unpaid')).tolist(),
+        'currency': ['USD'] * m,
+        'subtotal': np.round(subtotal, 2).tolist(),
+        'discount_type': np.where(discounted, np.where(percentage, 'Percentage', 'Fixed'), None).tolist(),
+        'discount_value': np.where(discounted, np.where(percentage, percent_off, fixed_off), 0).tolist(),
+        'tax': tax.tolist(),
+        'total_amount': total.tolist(),
+        'amount_paid': np.round(amount_paid, 2).tolist(),
+        'balance_due': np.round(total - amount_paid, 2).tolist(),
+        'notes': pooled_column('text_100', rng.random(m) > 0.8),
+        'created_at': created,
+        'updated_at': [CONFIG['AS_OF']] * m
+    }
 
-        invoices.append(invoice)
+    # Invoice items: one per treatment of the invoice's day
+    item_treatments = [grouped_treatments[group] for group in invoice_group.tolist()]
+    item_invoice = np.repeat(np.arange(m), [len(group) for group in item_treatments])
+    item_treatment = np.concatenate(item_treatments) if m else np.zeros(0, dtype=int)
+    k = len(item_treatment)
+    item_ids = np.arange(counters['invoice_items'] + 1, counters['invoice_items'] + k + 1).tolist()
+    counters['invoice_items'] += k
+
+    items = {
+        'id': item_ids,
+        'source_id': [f'INVITM{i:08d}' for i in item_ids],
+        'invoice_id': take(ids, item_invoice),
+        'invoice_source_id': take(source_ids, item_invoice),
+        'description': take(treatments['procedure_name'], item_treatment),
+        'unit_price': take(treatments['price'], item_treatment),
+        'quantity': [1] * k,
+        'total_amount': take(treatments['price'], item_treatment),
+        'created_at': take(created, item_invoice),
+        'updated_at': [CONFIG['AS_OF']] * k
+    }
 
-        query = """
+    # Payments: fully paid invoices are settled in 1 payment, or split into 2-3 (20%)
+    paid = np.flatnonzero(paid_full & (amount_paid > 0))
+    p = len(paid)
+    num_payments = np.where(rng.random(p) > 0.2, 1, rng.integers(2, 4, p)).tolist()
+    split = rng.uniform(0.3, 0.6, (p, 2)).tolist()
+    delay = rng.integers(0, 31, (p, 3)).tolist()
+    method = rng.integers(0, len(PAYMENT_METHODS), (p, 3)).tolist()
+    reference = rng.integers(100000, 1000000, (p, 3)).tolist()
+    with_notes = (rng.random((p, 3)) > 0.8).tolist()
+
+    payments = {name: [] for name in ('id', 'source_id', 'invoice_id', 'invoice_source_id', 'patient_id',
+                                      'payment_method', 'amount', 'original_amount', 'currency',
+                                      'reference_number', 'payment_date', 'notes', 'created_at',
+                                      'updated_at', 'deleted_at')}
+    for row, invoice in enumerate(paid.tolist()):
+        remaining = amount_paid[invoice]
+        for i in range(num_payments[row]):
+            if i == num_payments[row] - 1:
+                payment_amount = remaining
+            else:
+                payment_amount = remaining * split[row][i]
+                remaining -= payment_amount
+
+            counters['payments'] += 1
+            payment_date = invoice_dates[invoice] + timedelta(days=delay[row][i])
+            payments['id'].append(counters['payments'])
+            payments['source_id'].append(f"PAY{counters['payments']:08d}")
+            payments['invoice_id'].append(ids[invoice])
+            payments['invoice_source_id'].append(source_ids[invoice])
+            payments['patient_id'].append(patient_ids[invoice])
+            payments['payment_method'].append(PAYMENT_METHODS[method[row][i]])
+            payments['amount'].append(round(float(payment_amount), 2))
+            payments['original_amount'].append(round(float(payment_amount), 2))
+            payments['currency'].append('USD')
+            payments['reference_number'].append(f'REF{reference[row][i]}')
+            payments['payment_date'].append(payment_date)
+            payments['notes'].append(pooled('text_100') if with_notes[row][i] else None)
+            payments['created_at'].append(payment_date)
+            payments['updated_at'].append(CONFIG['AS_OF'])
+            payments['deleted_at'].append(None)
+
+    return invoices, items, payments
+
+
+def generate_patient_records(connection, doctors, rooms, patient_numbers):
+    """Generate patients together with their appointments, treatments, invoices and payments
+
+    Records are streamed one block of PATIENT_BLOCK_SIZE patients at a time: the
+    block's attributes are sampled as NumPy columns, assembled into rows, queued on
+    the table buffers and dropped before the next block, so memory stays flat no
+    matter how large NUM_PATIENTS is. Ids start right after the range
+    reserved for the patients before `patient_numbers`, so shards never collide.
+    Appointments are only booked with `doctors` in `rooms`. Returns the per-table counts.
+    """
+    offsets = {table: (patient_numbers.start - 1) * limit for table, limit in MAX_RECORDS_PER_PATIENT.items()}
+    counters = dict(offsets)
+    scheduler = Scheduler(rooms, (CONFIG['END_DATE'] - CONFIG['START_DATE']).days)
+
+    print(f"👥 Generating patients {patient_numbers.start}-{patient_numbers.stop - 1} with their appointments, treatments, invoices and payments...")
+
+    buffers = {
+        'patients': TableBuffer(connection, """
+            INSERT INTO patients (
+                id, source_id, first_name, father_name, last_name, mother_name, id_nb,
+                date_of_birth, gender, marital_status, nationality, phone, phone_alt,
+                email, address_line1, address_line2, city, state, zip_code, country,
+                blood_group, allergies, medical_history, created_at, updated_at
+            ) VALUES (
+                %(id)s, %(source_id)s, %(first_name)s, %(father_name)s, %(last_name)s, %(mother_name)s, %(id_nb)s,
+                %(date_of_birth)s, %(gender)s, %(marital_status)s, %(nationality)s, %(phone)s, %(phone_alt)s,
+                %(email)s, %(address_line1)s, %(address_line2)s, %(city)s, %(state)s, %(zip_code)s, %(country)s,
+                %(blood_group)s, %(allergies)s, %(medical_history)s, %(created_at)s, %(updated_at)s
+            )
+        """),
+        'appointments': TableBuffer(connection, """
+            INSERT INTO appointments (
+                id, source_id, patient_id, doctor_id, appointment_date, appointment_time,
+                duration, duration_minutes, revision_number, room, status, missed,
+                reason_for_visit, diagnosis, prescription, notes, created_at, updated_at
+            ) VALUES (
+                %(id)s, %(source_id)s, %(patient_id)s, %(doctor_id)s, %(appointment_date)s, %(appointment_time)s,
+                %(duration)s, %(duration_minutes)s, %(revision_number)s, %(room)s, %(status)s, %(missed)s,
+                %(reason_for_visit)s, %(diagnosis)s, %(prescription)s, %(notes)s, %(created_at)s, %(updated_at)s
+            )
+        """),
+        'treatments': TableBuffer(connection, """
+            INSERT INTO treatments (
+                id, source_id, patient_id, doctor_id, tooth_number, procedure_code,
+                procedure_name, procedure_group, treatment_plan, status, price,
+                planned_date, start_date, completion_date, notes, created_at, updated_at
+            ) VALUES (
+                %(id)s, %(source_id)s, %(patient_id)s, %(doctor_id)s, %(tooth_number)s, %(procedure_code)s,
+                %(procedure_name)s, %(procedure_group)s, %(treatment_plan)s, %(status)s, %(price)s,
+                %(planned_date)s, %(start_date)s, %(completion_date)s, %(notes)s, %(created_at)s, %(updated_at)s
+            )
+        """),
+        'invoices': TableBuffer(connection, """
             INSERT INTO invoices (
-                source_id, invoice_number, patient_id, doctor_id, appointment_id, invoice_date, due_date,
+                id, source_id, invoice_number, patient_id, doctor_id, appointment_id, invoice_date, due_date,
                 status, currency, subtotal, discount_type, discount_value, tax,
                 total_amount, amount_paid, balance_due, notes, created_at, updated_at
             ) VALUES (
-                %(source_id)s, %(invoice_number)s, %(patient_id)s, %(doctor_id)s, %(appointment_id)s, %(invoice_date)s, %(due_date)s,
+                %(id)s, %(source_id)s, %(invoice_number)s, %(patient_id)s, %(doctor_id)s, %(appointment_id)s, %(invoice_date)s, %(due_date)s,
                 %(status)s, %(currency)s, %(subtotal)s, %(discount_type)s, %(discount_value)s, %(tax)s,
                 %(total_amount)s, %(amount_paid)s, %(balance_due)s, %(notes)s, %(created_at)s, %(updated_at)s
             )
-        """
+        """),
+        'invoice_items': TableBuffer(connection, """
+            INSERT INTO invoice_items (
+                id, source_id, invoice_id, invoice_source_id, description,
+                unit_price, quantity, total_amount, created_at, updated_at
+            ) VALUES (
+                %(id)s, %(source_id)s, %(invoice_id)s, %(invoice_source_id)s, %(description)s,
+                %(unit_price)s, %(quantity)s, %(total_amount)s, %(created_at)s, %(updated_at)s
+            )
+        """),
+        'payments': TableBuffer(connection, """
+            INSERT INTO payments (
+                id, source_id, invoice_id, invoice_source_id, patient_id, payment_method,
+                amount, original_amount, currency, reference_number, payment_date,
+                notes, created_at, updated_at, deleted_at
+            ) VALUES (
+                %(id)s, %(source_id)s, %(invoice_id)s, %(invoice_source_id)s, %(patient_id)s, %(payment_method)s,
+                %(amount)s, %(original_amount)s, %(currency)s, %(reference_number)s, %(payment_date)s,
+                %(notes)s, %(created_at)s, %(updated_at)s, %(deleted_at)s
+            )
+        """)
+    }
+
+    block_size = CONFIG['PATIENT_BLOCK_SIZE']
+    for block_start in range(patient_numbers.start, patient_numbers.stop, block_size):
+        patients = []
+        for _ in range(block_start, min(block_start + block_size, patient_numbers.stop)):
+            counters['patients'] += 1
+            patients.append(build_patient(counters['patients']))
+
+        appointments, patient_index, days, completed = sample_appointments(patients, doctors, scheduler, counters)
+        treatments, treatment_appointment, price = sample_treatments(appointments, days, completed, counters)
+        invoices, items, payments = sample_invoices(appointments, patient_index, days, completed,
+                                                    treatments, treatment_appointment, price, counters)
+
+        # Rows are only assembled here, right before they are queued for writing
+        for row in patients:
+            buffers['patients'].add(row)
+        for table, columns in (('appointments', appointments), ('treatments', treatments),
+                               ('invoices', invoices), ('invoice_items', items), ('payments', payments)):
+            for row in column_rows(columns):
+                buffers[table].add(row)
+
+        print(f"   Created patients up to {block_start + len(patients) - 1}...")
+
+    for table_buffer in buffers.values():
+        table_buffer.close()
+
+    counts = {table: counters[table] - offsets[table] for table in counters}
+    counts['unscheduled'] = scheduler.unscheduled
+    print(f"✅ {counts['patients']} patients, {counts['appointments']} appointments, "
+          f"{counts['treatments']} treatments, {counts['invoices']} invoices, "
+          f"{counts['invoice_items']} items, {counts['payments']} payments created")
+    if scheduler.unscheduled:
+        print(f"⚠️  {scheduler.unscheduled} appointments dropped: no free doctor/room slot within "
+              f"{CONFIG['SCHEDULE_SEARCH_DAYS']} days (add rooms or doctors)")
+    print()
+
+    return counts
+
+
+def seed_generators(seed):
+    """Seed random, Faker and the NumPy generator so the same seed always yields the same records"""
+    global rng
+    random.seed(seed)
+    fake.seed_instance(seed)
+    rng = np.random.default_rng(int.from_bytes(hashlib.sha256(str(seed).encode()).digest()[:8], 'big'))
 
-        cursor.execute(query, invoice)
-        db_invoice_id = cursor.lastrowid
-
-        # Create invoice items
-        for treatment in apt_treatments:
-            item = {
-                'source_id': f'INVITM{invoice_item_id:08d}',
-                'invoice_id': db_invoice_id,
-                'invoice_source_id': invoice['source_id'],
-                'description': treatment['procedure_name'],
-                'unit_price': treatment['price'],
-                'quantity': 1,
-                'total_amount': treatment['price'],
-                'created_at': invoice['created_at'],
-                'updated_at': datetime.now()
-            }
-
-            invoice_items.append(item)
-
-            query = """
-                INSERT INTO invoice_items (
-                    source_id, invoice_id, invoice_source_id, description,
-                    unit_price, quantity, total_amount, created_at, updated_at
-                ) VALUES (
-                    %(source_id)s, %(invoice_id)s, %(invoice_source_id)s, %(description)s,
-                    %(unit_price)s, %(quantity)s, %(total_amount)s, %(created_at)s, %(updated_at)s
-                )
-            """
-
-            cursor.execute(query, item)
-            invoice_item_id += 1
-
-        # Create payments
-        if amount_paid > 0:
-            # Randomly split into 1-3 payments
-            if status == 'paid':
-                num_payments = 1 if random.random() > 0.2 else random.randint(2, 3)
-                remaining = amount_paid
-
-                for i in range(num_payments):
-                    if i == num_payments - 1:
-                        payment_amount = remaining
-                    else:
-                        payment_amount = remaining * random.uniform(0.3, 0.6)
-                        remaining -= payment_amount
-
-                    payment_date = invoice['invoice_date'] + timedelta(days=random.randint(0, 30))
-
-                    payment = {
-                        'source_id': f'PAY{payment_id:08d}',
-                        'invoice_id': db_invoice_id,
-                        'invoice_source_id': invoice['source_id'],
-                        'patient_id': appointment['patient_id'],
-                        'payment_method': random.choice(PAYMENT_METHODS),
-                        'amount': round(payment_amount, 2),
-                        'original_amount': round(payment_amount, 2),
-                        'currency': 'USD',
-                        'reference_number': f'REF{random.randint(100000, 999999)}',
-                        'payment_date': payment_date,
-                        'notes': fake.text(max_nb_chars=100) if random.random() > 0.8 else None,
-                        'created_at': payment_date,
-                        'updated_at': datetime.now(),
-                        'deleted_at': None
-                    }
-
-                    payments.append(payment)
-
-                    query = """
-                        INSERT INTO payments (
-                            source_id, invoice_id, invoice_source_id, patient_id, payment_method,
-                            amount, original_amount, currency, reference_number, payment_date,
-                            notes, created_at, updated_at, deleted_at
-                        ) VALUES (
-                            %(source_id)s, %(invoice_id)s, %(invoice_source_id)s, %(patient_id)s, %(payment_method)s,
-                            %(amount)s, %(original_amount)s, %(currency)s, %(reference_number)s, %(payment_date)s,
-                            %(notes)s, %(created_at)s, %(updated_at)s, %(deleted_at)s
-                        )
-                    """
-
-                    cursor.execute(query, payment)
-                    payment_id += 1
-
-        invoice_id += 1
-
-        if invoice_id % 500 == 0:
-            print(f"   Created {invoice_id} invoices...")
-
-    connection.commit()
-    cursor.close()
-    print(f"✅ {len(invoices)} invoices, {len(invoice_items)} items, {len(payments)} payments created\n")
 
-    return invoices, invoice_items, payments
+def split_patients(num_patients, num_shards):
+    """Split patient numbers 1..num_patients into contiguous, near-equal ranges"""
+    bounds = [1 + num_patients * shard // num_shards for shard in range(num_shards + 1)]
+    return [range(bounds[shard], bounds[shard + 1]) for shard in range(num_shards)]
+
+
+def generate_shard(shard, patient_numbers, doctors, rooms, seed, pools, database):
+    """Generate one shard of patients through its own connection (runs in a worker process)"""
+    global faker_pools
+    faker_pools = pools
+    seed_generators(f"{seed}-shard{shard}")
+
+    connection = create_database_connection()
+    if not connection:
+        raise RuntimeError(f"shard {shard} could not connect to MySQL")
+    connection.database = database  # the staging database during a shadow load
+
+    try:
+        return generate_patient_records(connection, doctors, rooms, patient_numbers)
+    finally:
+        connection.close()
+
+
+def generate_all_patient_records(connection, doctors, num_patients, num_rooms, workers, seed):
+    """Generate every patient's records, sharded over `workers` processes when asked
+
+    Each shard has a seed derived from `seed`, its own id range and its own doctors
+    and rooms (so calendars never overlap across processes). The data therefore only
+    depends on the seed and the worker count, not on how the processes interleave.
+    """
+    rooms = list(range(1, num_rooms + 1))
+
+    # sample_appointments asks for 2-6 appointments per patient, 4 on average
+    requested, capacity = num_patients * 4, schedule_capacity(len(doctors), len(rooms))
+    if requested > capacity * 0.7:
+        print(f"⚠️  ~{requested:,} appointments requested but the calendars hold at most {capacity:,} "
+              f"({len(doctors)} doctors, {len(rooms)} rooms): expect many to be dropped, raise --doctors/--rooms")
+    if workers > min(len(doctors), len(rooms)):
+        workers = min(len(doctors), len(rooms))
+        print(f"⚠️  Workers capped at {workers}: every shard needs its own doctors and rooms")
+    shards = split_patients(num_patients, workers)
+
+    if workers == 1:
+        seed_generators(f"{seed}-shard0")
+        shard_counts = [generate_patient_records(connection, doctors, rooms, shards[0])]
+    else:
+        print(f"🧵 Generating {num_patients} patients across {workers} worker processes...\n")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(generate_shard, shard, patient_numbers, doctors[shard::workers],
+                                   rooms[shard::workers], seed, faker_pools, connection.database)
+                       for shard, patient_numbers in enumerate(shards)]
+            shard_counts = [future.result() for future in futures]
+
+    totals = {table: sum(counts[table] for counts in shard_counts) for table in MAX_RECORDS_PER_PATIENT}
+    dropped = sum(counts['unscheduled'] for counts in shard_counts)
+    print(f"✅ Patient records complete: {totals['patients']:,} patients, {totals['appointments']:,} appointments, "
+          f"{totals['invoices']:,} invoices")
+    if dropped:
+        print(f"⚠️  {dropped:,} requested appointments ({dropped * 100 / (dropped + totals['appointments']):.1f}%) "
+              f"dropped for lack of a free doctor/room slot")
+    print()
+
+    return totals
 
 
 def generate_inventory(connection, num_items):
     """Generate dummy inventory records"""
-    cursor = connection.cursor()
     inventory = []
 
     print(f"📦 Generating {num_items} inventory items...")
 
+    inventory_rows = TableBuffer(connection, """
+        INSERT INTO inventory (
+            source_id, category, name, sku, description, unit_of_measure,
+            size, quantity_in_stock, unit_size, average_purchase_price,
+            selling_price, minimum_quantity_warning, minimum_quantity_critical,
+            currency, created_at, updated_at, deleted_at
+        ) VALUES (
+            %(source_id)s, %(category)s, %(name)s, %(sku)s, %(description)s, %(unit_of_measure)s,
+            %(size)s, %(quantity_in_stock)s, %(unit_size)s, %(average_purchase_price)s,
+            %(selling_price)s, %(minimum_quantity_warning)s, %(minimum_quantity_critical)s,
+            %(currency)s, %(created_at)s, %(updated_at)s, %(deleted_at)s
+        )
+    """)
+
     for i in range(1, num_items + 1):
         category = random.choice(INVENTORY_CATEGORIES)
 
@@ -909,7 +993,7 @@ def generate_inventory(connection, num_items):
             'category': category,
             'name': f"{category} Item {i}",
             'sku': f'SKU{random.randint(10000, 99999)}',
-            'description': fake.text(max_nb_chars=150),
+            'description': pooled('text_150'),
             'unit_of_measure': random.choice(['Unit', 'Box', 'Pack', 'Bottle', 'Vial']),
             'size': round(random.uniform(1, 100), 2),
             'quantity_in_stock': round(random.uniform(10, 500), 2),
@@ -920,30 +1004,15 @@ def generate_inventory(connection, num_items):
             'minimum_quantity_critical': random.randint(5, 20),
             'currency': 'USD',
             'created_at': random_date_between(CONFIG['START_DATE'], CONFIG['END_DATE']),
-            'updated_at': datetime.now(),
+            'updated_at': CONFIG['AS_OF'],
             'deleted_at': None
         }
 
         inventory.append(item)
 
-        query = """
-            INSERT INTO inventory (
-                source_id, category, name, sku, description, unit_of_measure,
-                size, quantity_in_stock, unit_size, average_purchase_price,
-                selling_price, minimum_quantity_warning, minimum_quantity_critical,
-                currency, created_at, updated_at, deleted_at
-            ) VALUES (
-                %(source_id)s, %(category)s, %(name)s, %(sku)s, %(description)s, %(unit_of_measure)s,
-                %(size)s, %(quantity_in_stock)s, %(unit_size)s, %(average_purchase_price)s,
-                %(selling_price)s, %(minimum_quantity_warning)s, %(minimum_quantity_critical)s,
-                %(currency)s, %(created_at)s, %(updated_at)s, %(deleted_at)s
-            )
-        """
-
-        cursor.execute(query, item)
+        inventory_rows.add(item)
 
-    connection.commit()
-    cursor.close()
+    inventory_rows.close()
     print(f"✅ {num_items} inventory items created\n")
 
     return inventory
@@ -960,10 +1029,16 @@ def generate_statistics(connection):
     tables = ['patients', 'doctors', 'appointments', 'treatments',
               'invoices', 'invoice_items', 'payments', 'inventory']
 
+    # Row counts and checksums double as a fingerprint: equal fingerprints mean identical data
+    fingerprint = hashlib.sha256()
     for table in tables:
         cursor.execute(f"SELECT COUNT(*) FROM {table}")
         count = cursor.fetchone()[0]
-        print(f"   {table.capitalize():20}: {count:,} records")
+        cursor.execute(f"CHECKSUM TABLE {table}")
+        checksum = cursor.fetchone()[1]
+        fingerprint.update(f"{table}:{count}:{checksum};".encode())
+        print(f"   {table.capitalize():20}: {count:,} records (checksum {checksum})")
+    print(f"   {'Fingerprint':20}: {fingerprint.hexdigest()[:16]}")
 
     # Additional statistics
     cursor.execute("SELECT COUNT(*) FROM appointments WHERE status = 'completed'")
@@ -972,7 +1047,7 @@ def generate_statistics(connection):
     cursor.execute("SELECT COUNT(*) FROM appointments WHERE missed = TRUE")
     missed_appts = cursor.fetchone()[0]
 
-    cursor.execute("SELECT COUNT(*) FROM appointments WHERE appointment_date > CURDATE()")
+    cursor.execute("SELECT COUNT(*) FROM appointments WHERE appointment_date > %s", (CONFIG['AS_OF'],))
     future_appts = cursor.fetchone()[0]
 
     cursor.execute("SELECT SUM(total_amount) FROM invoices")
@@ -1000,14 +1075,97 @@ def generate_statistics(connection):
     cursor.close()
 
 
+# Dashboard access patterns: (label, table, index meant to serve it, query, params)
+DASHBOARD_QUERIES = [
+    ('Doctor calendar (month)', 'appointments', 'idx_doctor_date',
+     "SELECT appointment_date, COUNT(*), SUM(duration_minutes) FROM appointments {hint} "
+     "WHERE doctor_id = %s AND appointment_date BETWEEN %s AND %s GROUP BY appointment_date",
+     (1, CONFIG['AS_OF'] - timedelta(days=30), CONFIG['AS_OF'])),
+    ('Day schedule by status', 'appointments', 'idx_date_status',
+     "SELECT status, COUNT(*) FROM appointments {hint} WHERE appointment_date = %s GROUP BY status",
+     (CONFIG['AS_OF'] - timedelta(days=1),)),
+    ('Patient treatment history', 'treatments', 'idx_patient_start',
+     "SELECT start_date, procedure_name, price FROM treatments {hint} WHERE patient_id = %s ORDER BY start_date DESC",
+     (1,)),
+    ('Procedure volume (year)', 'treatments', 'idx_procedure_start',
+     "SELECT COUNT(*), SUM(price) FROM treatments {hint} WHERE procedure_code = %s AND start_date BETWEEN %s AND %s",
+     ('D1110', CONFIG['AS_OF'] - timedelta(days=365), CONFIG['AS_OF'])),
+    ('Unpaid invoices (quarter)', 'invoices', 'idx_date_status',
+     "SELECT COUNT(*), SUM(balance_due) FROM invoices {hint} WHERE invoice_date BETWEEN %s AND %s AND status = 'unpaid'",
+     (CONFIG['AS_OF'] - timedelta(days=90), CONFIG['AS_OF'])),
+    ('Daily collections (month)', 'payments', 'idx_payment_date',
+     "SELECT payment_date, SUM(amount) FROM payments {hint} WHERE payment_date BETWEEN %s AND %s GROUP BY payment_date",
+     (CONFIG['AS_OF'] - timedelta(days=30), CONFIG['AS_OF'])),
+]
+
+
+def benchmark_queries(connection, repeats=5):
+    """Time each dashboard query on the current data without and with its index
+
+    "Without" forces the index away with IGNORE INDEX, so both timings run on the same
+    rows; the median of `repeats` runs is reported with the key MySQL actually chose.
+    """
+    cursor = connection.cursor()
+
+    print("\n" + "=" * 60)
+    print("⏱️  DASHBOARD QUERY BENCHMARK")
+    print("=" * 60)
+    print(f"   {'Query':28} {'without':>10} {'with':>10} {'speedup':>8}  key used")
+
+    for label, table, index, query, params in DASHBOARD_QUERIES:
+        timings = {}
+        for mode, hint in (('without', f"IGNORE INDEX ({index})"), ('with', '')):
+            runs = []
+            for _ in range(repeats):
+                start = perf_counter()
+                cursor.execute(query.format(hint=hint), params)
+                cursor.fetchall()
+                runs.append(perf_counter() - start)
+            timings[mode] = statistics.median(runs)
+
+        cursor.execute("EXPLAIN " + query.format(hint=''), params)
+        columns = [column[0] for column in cursor.description]
+        key_used = dict(zip(columns, cursor.fetchall()[0])).get('key')
+
+        speedup = timings['without'] / timings['with'] if timings['with'] else float('inf')
+        print(f"   {label:28} {timings['without'] * 1000:8.2f}ms {timings['with'] * 1000:8.2f}ms "
+              f"{speedup:7.1f}x  {key_used}")
+
+    print("=" * 60 + "\n")
+    cursor.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate dummy clinic data for Toothpick EVE.")
+    parser.add_argument("--patients", type=int, default=CONFIG['NUM_PATIENTS'], metavar="N",
+                        help="number of patients to generate")
+    parser.add_argument("--doctors", type=int, default=CONFIG['NUM_DOCTORS'], metavar="N",
+                        help="number of doctors; scale it with --patients, doctors cap how many appointments fit")
+    parser.add_argument("--rooms", type=int, default=CONFIG['NUM_ROOMS'], metavar="N",
+                        help="number of treatment rooms (default: one per doctor)")
+    parser.add_argument("--workers", type=int, default=CONFIG['WORKERS'], metavar="N",
+                        help="shard patients across N processes, each with its own connection")
+    parser.add_argument("--seed", type=int, default=CONFIG['SEED'],
+                        help="seed for a repeatable dataset (same seed and worker count, same data)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="only time the dashboard queries against the existing data, with and without their indexes")
+    return parser.parse_args()
+
+
 def main():
     """Main function to generate all dummy data"""
+    args = parse_args()
+    workers = max(1, args.workers)
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+
     print("\n" + "=" * 60)
     print("🚀 TOOTHPICK EVE - DUMMY DATA GENERATOR")
     print("=" * 60)
-    print(f"Target: {CONFIG['NUM_PATIENTS']:,} patients over 7 years")
-    print(f"Doctors: {CONFIG['NUM_DOCTORS']} doctors")
+    num_rooms = args.rooms or args.doctors
+    print(f"Target: {args.patients:,} patients over 7 years")
+    print(f"Doctors: {args.doctors} doctors, {num_rooms} rooms")
     print(f"Period: {CONFIG['START_DATE'].strftime('%Y-%m-%d')} to {CONFIG['END_DATE'].strftime('%Y-%m-%d')}")
+    print(f"Seed: {seed}, Workers: {workers}")
     print("=" * 60 + "\n")
 
     # Connect to database
@@ -1018,20 +1176,36 @@ def main():
         return
 
     try:
-        # Create tables
-        create_tables(connection)
+        if args.benchmark:
+            benchmark_queries(connection)
+            return
 
-        # Truncate existing data
-        truncate_tables(connection)
+        # Create or upgrade tables (partitioning is a one-time migration)
+        ensure_schema(connection, partition_by_year=CONFIG['PARTITION_BY_YEAR'])
+
+        # Start from empty tables: fresh shadow copies, or the live ones truncated
+        if CONFIG['SHADOW_LOAD']:
+            connection.database = prepare_shadow_tables(connection, CONFIG['DATABASE_NAME'])
+        else:
+            truncate_tables(connection)
+
+        # Year partitions up to the end of the generated range
+        if CONFIG['PARTITION_BY_YEAR']:
+            add_year_partitions(connection, CONFIG['END_DATE'].year)
+
+        load_faker_pools(seed)
 
         # Generate data in proper order
-        doctors = generate_doctors(connection, CONFIG['NUM_DOCTORS'])
-        patients = generate_patients(connection, CONFIG['NUM_PATIENTS'])
-        appointments = generate_appointments(connection, patients, doctors)
-        treatments = generate_treatments(connection, appointments, patients, doctors)
-        invoices, invoice_items, payments = generate_invoices_and_payments(connection, appointments, treatments)
+        seed_generators(f"{seed}-doctors")
+        doctors = generate_doctors(connection, args.doctors)
+        generate_all_patient_records(connection, doctors, args.patients, num_rooms, workers, seed)
+        seed_generators(f"{seed}-inventory")
         inventory = generate_inventory(connection, CONFIG['NUM_INVENTORY_ITEMS'])
 
+        if CONFIG['SHADOW_LOAD']:
+            connection.database = CONFIG['DATABASE_NAME']
+            swap_shadow_tables(connection, CONFIG['DATABASE_NAME'])
+
         # Print statistics
         generate_statistics(connection)
 
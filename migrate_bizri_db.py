@@ -3,9 +3,15 @@ import re
 import pyodbc
 import mysql.connector
 from mysql.connector import Error
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 import traceback
 import json
+import queue
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from time import perf_counter, sleep
+from schema import add_year_partitions, ensure_schema, purge_partitions_before
 
 
 # ================================================================
@@ -29,9 +35,24 @@ class Config:
 
     # Migration Settings
     BATCH_SIZE = 100
+    FETCH_SIZE = 2000  # Rows pulled from SQL Server per fetchmany() round trip
+    TRANSFORM_WORKERS = 2  # Threads cleaning rows between the reader and the writer
+    PIPELINE_DEPTH = 4  # Chunks allowed in flight before the reader waits for the writer
+    PARALLEL_STAGES = 2  # Independent stages run at the same time, each on its own connections
+    APPOINTMENT_PARTITIONS = 4  # id-range workers for the schedule table, each with its own connections
+    PARTITION_RETRIES = 3
+
+    # Error Logging Settings
+    ERROR_BUFFER_SIZE = 500  # Failed records buffered before a migration_log flush
+    ERROR_FLUSH_SECONDS = 5
+
+    # Incremental Sync Settings (--sync / --every)
+    SYNC_MODE = False
+    SYNC_LOOKBACK_DAYS = 30  # schedule has no change timestamp; re-pull appointments this close to the last sync
     DEBUG_MODE = True
     TEST_MODE = False
     MIGRATE_APPOINTMENTS_FROM = "1900-01-01"
+    PARTITION_BY_YEAR = False  # RANGE-partition appointments/treatments by year, once (schema migration 4; drops their foreign keys)
 
 
 # ================================================================
@@ -69,40 +90,36 @@ def create_mysql_connection(host, user, password, database):
         return None
 
 
+def with_connections(migrate_fn, *args):
+    """Wrap a stage so it runs on its own SQL Server and MySQL connections."""
+    def run():
+        mssql = create_mssql_connection(Config.MSSQL_SERVER, Config.MSSQL_DATABASE, Config.USE_WINDOWS_AUTH, Config.MSSQL_USERNAME, Config.MSSQL_PASSWORD)
+        mysql = create_mysql_connection(Config.MYSQL_HOST, Config.MYSQL_USER, Config.MYSQL_PASSWORD, Config.MYSQL_DATABASE)
+        try:
+            if not mssql or not mysql:
+                raise Exception("Could not establish database connections for stage")
+            migrate_fn(mssql, mysql, *args)
+        finally:
+            if mssql:
+                mssql.close()
+            if mysql and mysql.is_connected():
+                mysql.close()
+    return run
+
+
 # ================================================================
 # TABLE CREATION & VERIFICATION
 # ================================================================
 def setup_database_tables(mysql_conn):
-    """Verify required tables and create migration_log if missing."""
-    cursor = mysql_conn.cursor()
-    required_tables = ["patients", "doctors", "appointments"]
+    """Bring the schema (clinic and migration bookkeeping tables) up to the latest version."""
     try:
-        cursor.execute("SHOW TABLES")
-        existing_tables = {row[0] for row in cursor.fetchall()}
-
-        missing_required = [t for t in required_tables if t not in existing_tables]
-        if missing_required:
-            raise Exception(f"Missing required tables: {', '.join(missing_required)}. Please run create_db.py.")
-
-        if "migration_log" not in existing_tables:
-            print("⚠️ 'migration_log' table not found. Creating it automatically...")
-            cursor.execute("""
-                CREATE TABLE migration_log (
-                    id INT AUTO_INCREMENT PRIMARY KEY, table_name VARCHAR(50), source_id VARCHAR(50),
-                    operation VARCHAR(20), status VARCHAR(20), error_message TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, INDEX idx_status (status),
-                    INDEX idx_table_source (table_name, source_id)
-                ) ENGINE=InnoDB;
-            """)
-            mysql_conn.commit()
-            print("✅ 'migration_log' table created.")
-        else:
-            print("✅ All required tables exist.")
+        ensure_schema(mysql_conn, partition_by_year=Config.PARTITION_BY_YEAR)
+        if Config.PARTITION_BY_YEAR:
+            # Next year's partition ahead of time; only the catch-all partition is rewritten
+            add_year_partitions(mysql_conn, datetime.now().year + 1)
     except Exception as e:
         print(f"❌ Table verification error: {e}")
         raise
-    finally:
-        cursor.close()
 
 
 # ================================================================
@@ -114,15 +131,95 @@ def ensure_logs_folder():
     return "logs"
 
 
-def log_error(mysql_conn, table_name, source_id, operation, error_message):
+class ErrorSink:
+    """
+    Buffer failed records and write them to migration_log in multi-row inserts.
+
+    The sink has its own MySQL connection, so logging an error never commits
+    (or waits on) a stage's data transaction. Rows are flushed once
+    Config.ERROR_BUFFER_SIZE have piled up, every Config.ERROR_FLUSH_SECONDS
+    by a background flusher thread (so a quiet stretch or a crashed worker
+    never leaves errors unwritten), at every batch boundary and at shutdown.
+    Stages running in parallel share one sink, so every access goes through a lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = []
+        self.conn = None
+        self.flusher = None
+        self.stopped = threading.Event()
+
+    def add(self, table_name, source_id, operation, error_message):
+        with self.lock:
+            self.pending.append((table_name, str(source_id), operation, str(error_message)[:1000]))
+            due = len(self.pending) >= Config.ERROR_BUFFER_SIZE
+            if self.flusher is None:
+                # Started with the first error, so a clean run never spawns it
+                self.flusher = threading.Thread(target=self.flush_periodically, name="error-flusher", daemon=True)
+                self.flusher.start()
+        if due:
+            self.flush()
+
+    def flush_periodically(self):
+        while not self.stopped.wait(Config.ERROR_FLUSH_SECONDS):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows, self.pending = self.pending, []
+            if not rows:
+                return
+            try:
+                if self.conn is None or not self.conn.is_connected():
+                    self.conn = create_mysql_connection(Config.MYSQL_HOST, Config.MYSQL_USER, Config.MYSQL_PASSWORD, Config.MYSQL_DATABASE)
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "INSERT INTO migration_log (table_name, source_id, operation, status, error_message) VALUES "
+                    + ", ".join(["(%s, %s, %s, 'ERROR', %s)"] * len(rows)),
+                    tuple(value for row in rows for value in row)
+                )
+                self.conn.commit()
+                cursor.close()
+            except Exception as e:
+                print(f"⚠️ Could not write {len(rows)} error(s) to migration_log: {e}")
+
+    def close(self):
+        self.stopped.set()
+        if self.flusher:
+            self.flusher.join()
+        self.flush()
+        if self.conn and self.conn.is_connected():
+            self.conn.close()
+
+
+error_sink = ErrorSink()
+
+
+def log_error(table_name, source_id, operation, error_message):
+    error_sink.add(table_name, source_id, operation, error_message)
+
+
+def count_source_rows(mssql_conn, from_clause, limit=None, params=()):
+    """Count source rows up front so progress can be reported while streaming."""
+    cursor = mssql_conn.cursor()
     try:
-        cursor = mysql_conn.cursor()
-        query = "INSERT INTO migration_log (table_name, source_id, operation, status, error_message) VALUES (%s, %s, %s, 'ERROR', %s)"
-        cursor.execute(query, (table_name, str(source_id), operation, str(error_message)[:1000]))
-        mysql_conn.commit()
+        cursor.execute(f"SELECT COUNT(*) {from_clause}", *params)
+        total = cursor.fetchone()[0] or 0
+    finally:
         cursor.close()
-    except Exception:
-        pass
+    return min(total, limit) if limit else total
+
+
+def stream_chunks(cursor, chunk_size=None):
+    """Yield fetchmany() chunks from an executed cursor to keep memory bounded."""
+    chunk_size = chunk_size or Config.FETCH_SIZE
+    cursor.arraysize = chunk_size
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        yield chunk
 
 
 def load_nationality_mapping(mssql_conn):
@@ -322,9 +419,337 @@ def parse_doctor_name(company):
     return None, None
 
 
+# ================================================================
+# CHECKPOINTS
+# ================================================================
+def load_checkpoints(mysql_conn, stage):
+    """Return {stage_name: (last_key, status)} for a stage and its partitions ("stage:...")."""
+    cursor = mysql_conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT stage, last_key, status FROM migration_checkpoint WHERE stage = %s OR stage LIKE %s",
+            (stage, f"{stage}:%")
+        )
+        return {name: (last_key, status) for name, last_key, status in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def get_resume_key(mysql_conn, stage):
+    """Last committed source key of an unfinished stage, or None to start from the beginning."""
+    last_key, _ = load_checkpoints(mysql_conn, stage).get(stage, (None, None))
+    return last_key
+
+
+def save_checkpoint(cursor, stage, last_key, status='running'):
+    """Record a stage's high-water mark on the caller's cursor so it commits with the batch."""
+    cursor.execute("""
+        INSERT INTO migration_checkpoint (stage, last_key, status) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_key = COALESCE(VALUES(last_key), last_key), status = VALUES(status)
+    """, (stage, None if last_key is None else str(last_key), status))
+
+
+def clear_checkpoints(mysql_conn, stage=None):
+    """Forget checkpoints for a finished stage (and its partitions), or for every stage."""
+    cursor = mysql_conn.cursor()
+    if stage:
+        cursor.execute("DELETE FROM migration_checkpoint WHERE stage = %s OR stage LIKE %s", (stage, f"{stage}:%"))
+    else:
+        cursor.execute("DELETE FROM migration_checkpoint")
+    mysql_conn.commit()
+    cursor.close()
+
+
+def resume_filter(from_clause, key_column, resume_key):
+    """Append the "key > last checkpoint" condition to a source query, returning (clause, params)."""
+    if resume_key is None:
+        return from_clause, ()
+    print(f"⏩ Resuming after {key_column} {resume_key}")
+    return f"{from_clause} AND {key_column} > ?", (resume_key,)
+
+
+# ================================================================
+# INCREMENTAL SYNC
+# ================================================================
+def source_now(mssql_conn):
+    """SQL Server's current time; used as the next watermark so the two servers' clocks never need to agree."""
+    cursor = mssql_conn.cursor()
+    try:
+        cursor.execute("SELECT GETDATE()")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def load_sync_state(mysql_conn, table_name):
+    """Return (watermark, last_key) of the last successful sync of a table, or (None, None)."""
+    cursor = mysql_conn.cursor()
+    try:
+        cursor.execute("SELECT watermark, last_key FROM migration_sync_state WHERE table_name = %s", (table_name,))
+        return cursor.fetchone() or (None, None)
+    finally:
+        cursor.close()
+
+
+def save_sync_state(mysql_conn, table_name, watermark, last_key=None):
+    """Advance a table's watermark once its sync has completed."""
+    cursor = mysql_conn.cursor()
+    cursor.execute("""
+        INSERT INTO migration_sync_state (table_name, watermark, last_key) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE watermark = VALUES(watermark), last_key = VALUES(last_key)
+    """, (table_name, watermark, None if last_key is None else str(last_key)))
+    mysql_conn.commit()
+    cursor.close()
+
+
+# ================================================================
+# BATCHED WRITES
+# ================================================================
+def get_max_allowed_packet(mysql_conn):
+    """Read the server's max_allowed_packet so batches never exceed it."""
+    try:
+        cursor = mysql_conn.cursor()
+        cursor.execute("SELECT @@max_allowed_packet")
+        value = int(cursor.fetchone()[0])
+        cursor.close()
+        return value
+    except Exception:
+        return 4 * 1024 * 1024
+
+
+class BatchUpserter:
+    """
+    Buffer rows and write them as one multi-row INSERT ... ON DUPLICATE KEY UPDATE.
+
+    A batch is flushed (and committed) once it holds Config.BATCH_SIZE rows or
+    its estimated size approaches max_allowed_packet. If a batch fails, only
+    that batch is retried row by row so each bad row is reported on its own.
+    With checkpoint_stage set, the last source id of every batch is saved to
+    migration_checkpoint in the same transaction as the batch itself.
+
+    It counts the rows written without error (inserted, updated or already
+    current) as one total, not inserts and updates apart: MySQL's affected-row
+    count for a batch is 1 per insert, 2 per update and 0 per unchanged row
+    (1 with CLIENT_FOUND_ROWS, the same as an insert), so a batch mixing them
+    can't be split exactly.
+    """
+
+    def __init__(self, mysql_conn, table_name, columns, update_clause, row_template=None, on_error=None, checkpoint_stage=None):
+        self.mysql_conn = mysql_conn
+        self.table_name = table_name
+        self.checkpoint_stage = checkpoint_stage
+        self.row_template = row_template or "(" + ", ".join(["%s"] * len(columns)) + ")"
+        self.query_prefix = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES "
+        self.query_suffix = f" ON DUPLICATE KEY UPDATE {update_clause}"
+        self.on_error = on_error
+        self.max_bytes = int(get_max_allowed_packet(mysql_conn) * 0.8)
+        self.cursor = mysql_conn.cursor()
+
+        self.pending = []
+        self.pending_bytes = 0
+        self.written, self.errors = 0, 0
+
+    def build_query(self, row_count):
+        return self.query_prefix + ", ".join([self.row_template] * row_count) + self.query_suffix
+
+    def add(self, source_id, data):
+        """Queue one row. Returns True when the call flushed a batch."""
+        row_bytes = len(self.row_template) + sum(len(str(value)) + 3 for value in data)
+        flushed = False
+
+        if self.pending and self.pending_bytes + row_bytes > self.max_bytes:
+            self.flush()
+            flushed = True
+
+        self.pending.append((source_id, data))
+        self.pending_bytes += row_bytes
+
+        if len(self.pending) >= Config.BATCH_SIZE:
+            self.flush()
+            flushed = True
+        return flushed
+
+    def flush(self):
+        """Write all pending rows in a single statement and commit them. Returns the rows written."""
+        if not self.pending:
+            return 0
+
+        batch = self.pending
+        self.pending, self.pending_bytes = [], 0
+        params = tuple(value for _, data in batch for value in data)
+
+        try:
+            self.cursor.execute(self.build_query(len(batch)), params)
+            written = len(batch)
+            self.save_checkpoint(batch)
+            self.mysql_conn.commit()
+        except Exception as e:
+            self.mysql_conn.rollback()
+            if Config.DEBUG_MODE:
+                print(f"  ⚠️ Batch of {len(batch)} {self.table_name} rows failed ({e}), retrying row by row")
+            written = self.write_rows(batch)
+
+        self.written += written
+        error_sink.flush()
+        return written
+
+    def write_rows(self, batch):
+        """Fallback path: write a failed batch one row at a time. Returns the rows written."""
+        query = self.build_query(1)
+        written = 0
+
+        for source_id, data in batch:
+            try:
+                self.cursor.execute(query, data)
+                written += 1
+            except Exception as e:
+                self.errors += 1
+                if self.on_error:
+                    self.on_error(source_id, e)
+
+        self.save_checkpoint(batch)
+        self.mysql_conn.commit()
+        return written
+
+    def save_checkpoint(self, batch):
+        if self.checkpoint_stage:
+            save_checkpoint(self.cursor, self.checkpoint_stage, batch[-1][0])
+
+    def close(self):
+        self.flush()
+        self.cursor.close()
+
+
+# ================================================================
+# PIPELINED EXECUTION
+# ================================================================
+class SkipRecord(Exception):
+    """Raised by a transform to skip a source row without counting it as an error."""
+
+
+_END_OF_STREAM = object()
+
+
+def run_pipeline(mssql_cursor, transform, writer, source_key, on_error, on_skip=None, on_progress=None):
+    """
+    Overlap SQL Server reads, row transforms and MySQL writes for one stage.
+
+    A reader thread pulls fetchmany() chunks from the executed cursor and hands
+    each chunk to a pool of Config.TRANSFORM_WORKERS threads. A writer thread
+    consumes the transformed chunks in source order and feeds the
+    BatchUpserter. The queue between them holds at most Config.PIPELINE_DEPTH
+    chunks, so a slow writer throttles the reader. Each connection is only
+    ever touched by its own thread; the first failure stops both threads and
+    is re-raised here.
+    """
+    stop = threading.Event()
+    chunks = queue.Queue(maxsize=Config.PIPELINE_DEPTH)
+    failures = []
+    processed = 0
+
+    def transform_chunk(rows):
+        results = []
+        for row in rows:
+            try:
+                source_id, data = transform(row)
+                results.append(('row', source_id, data))
+            except SkipRecord as e:
+                results.append(('skip', source_key(row), str(e)))
+            except Exception as e:
+                results.append(('error', source_key(row), e))
+        return results
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read():
+        try:
+            with ThreadPoolExecutor(max_workers=Config.TRANSFORM_WORKERS) as pool:
+                for rows in stream_chunks(mssql_cursor):
+                    if not put(pool.submit(transform_chunk, rows)):
+                        break
+        except Exception as e:
+            failures.append(e)
+            stop.set()
+        finally:
+            put(_END_OF_STREAM)
+
+    def write():
+        nonlocal processed
+        try:
+            while not stop.is_set():
+                try:
+                    item = chunks.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item is _END_OF_STREAM:
+                    writer.flush()
+                    break
+
+                for kind, source_id, payload in item.result():
+                    processed += 1
+                    if kind == 'row':
+                        if writer.add(source_id, payload) and on_progress:
+                            on_progress(processed)
+                    elif kind == 'skip':
+                        if on_skip:
+                            on_skip(source_id, payload)
+                    else:
+                        on_error(source_id, payload)
+        except Exception as e:
+            failures.append(e)
+            stop.set()
+
+    threads = [
+        threading.Thread(target=read, name="mssql-reader", daemon=True),
+        threading.Thread(target=write, name="mysql-writer", daemon=True),
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    except BaseException:
+        stop.set()
+        raise
+
+    if failures:
+        raise failures[0]
+    return processed
+
+
 # ================================================================
 # PATIENT MIGRATION
 # ================================================================
+def transform_patient(row, nationality_map):
+    """Map a CUST row to the patients upsert tuple."""
+    first, last, father = parse_full_name(row.COMPANY, row.FIRST_NM, row.LAST_NM, row.FATHER_NM)
+
+    nationality = None
+    if row.NATIONALITY:
+        if isinstance(row.NATIONALITY, (int, float)):
+            nationality = nationality_map.get(int(row.NATIONALITY))
+        else:
+            nationality = safe_string(row.NATIONALITY, 100)
+
+    return row.ID, (
+        safe_string(row.ID, 50), safe_string(first, 50), safe_string(last, 50),
+        safe_string(father, 100), safe_string(row.MOTHER, 100), safe_string(row.ID_NO, 50),
+        safe_date(row.BDATE), normalize_gender(row.GENDER), safe_string(row.MARITALSTATUS, 20),
+        nationality, clean_phone(row.PHONE), clean_phone(row.MOBILE),
+        safe_string(row.EMAIL, 100), safe_string(row.ADDR1), safe_string(row.ADDR2),
+        safe_string(row.CITY, 50), safe_string(row.STATE, 50), safe_string(row.ZIP, 10),
+        safe_string(row.Bloodgroup, 5), safe_string(row.allergies),
+        safe_datetime(row.DATEADDED), safe_datetime(row.Lastupdate)
+    )
+
+
 def migrate_patients(mssql_conn, mysql_conn, nationality_map):
     """Migrate patients with improved error handling and batching."""
     print("\n" + "=" * 60)
@@ -332,109 +757,88 @@ def migrate_patients(mssql_conn, mysql_conn, nationality_map):
     print("=" * 60)
 
     try:
-        mssql_cursor = mssql_conn.cursor()
-        query = """
-            SELECT ID, COMPANY, FIRST_NM, LAST_NM, FATHER_NM, MOTHER, ID_NO, 
-                   BDATE, GENDER, MARITALSTATUS, NATIONALITY, PHONE, MOBILE, 
+        from_clause, params = "FROM CUST WHERE ACTIVE = 1", ()
+        if Config.SYNC_MODE:
+            watermark, _ = load_sync_state(mysql_conn, 'patients')
+            sync_started = source_now(mssql_conn)
+            if watermark:
+                print(f"🔁 Syncing patients added or updated since {watermark}")
+                from_clause += " AND (Lastupdate > ? OR DATEADDED > ?)"
+                params = (watermark, watermark)
+
+        from_clause, resume_params = resume_filter(from_clause, "ID", get_resume_key(mysql_conn, 'patients'))
+        params += resume_params
+        limit = 100 if Config.TEST_MODE else None
+        query = f"""
+            SELECT {f"TOP {limit} " if limit else ""}ID, COMPANY, FIRST_NM, LAST_NM, FATHER_NM, MOTHER, ID_NO,
+                   BDATE, GENDER, MARITALSTATUS, NATIONALITY, PHONE, MOBILE,
                    EMAIL, ADDR1, ADDR2, CITY, STATE, ZIP, Bloodgroup, allergies,
                    DATEADDED, Lastupdate
-            FROM CUST 
-            WHERE ACTIVE = 1
+            {from_clause}
+            ORDER BY ID
         """
 
-        if Config.TEST_MODE:
-            query = """
-                SELECT TOP 100 ID, COMPANY, FIRST_NM, LAST_NM, FATHER_NM, MOTHER, ID_NO, 
-                       BDATE, GENDER, MARITALSTATUS, NATIONALITY, PHONE, MOBILE, 
-                       EMAIL, ADDR1, ADDR2, CITY, STATE, ZIP, Bloodgroup, allergies,
-                       DATEADDED, Lastupdate
-                FROM CUST 
-                WHERE ACTIVE = 1
-            """
-
-        mssql_cursor.execute(query)
-        rows = mssql_cursor.fetchall()
-        total_records = len(rows)
+        total_records = count_source_rows(mssql_conn, from_clause, limit, params)
         print(f"📊 Found {total_records} active patients to migrate")
 
         if total_records == 0:
             print("⚠️ No records found to migrate")
+            clear_checkpoints(mysql_conn, 'patients')
+            if Config.SYNC_MODE:
+                save_sync_state(mysql_conn, 'patients', sync_started)
             return
 
-        mysql_cursor = mysql_conn.cursor()
-
-        insert_query = """
-        INSERT INTO patients (
-            source_id, first_name, last_name, father_name, mother_name, 
-            id_nb, date_of_birth, gender, marital_status, nationality, 
-            phone, phone_alt, email, address_line1, address_line2, 
-            city, state, zip_code, blood_group, allergies, created_at, updated_at
-        ) VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+        mssql_cursor = mssql_conn.cursor()
+        mssql_cursor.execute(query, *params)
+
+        errors = []
+
+        def on_error(source_id, e):
+            errors.append(f"Patient ID {source_id}: {str(e)}")
+            log_error('patients', source_id, 'INSERT/UPDATE', str(e))
+            if Config.DEBUG_MODE and len(errors) <= 3:
+                print(f"  ❌ {errors[-1]}")
+
+        writer = BatchUpserter(
+            mysql_conn, 'patients',
+            columns=[
+                'source_id', 'first_name', 'last_name', 'father_name', 'mother_name',
+                'id_nb', 'date_of_birth', 'gender', 'marital_status', 'nationality',
+                'phone', 'phone_alt', 'email', 'address_line1', 'address_line2',
+                'city', 'state', 'zip_code', 'blood_group', 'allergies', 'created_at', 'updated_at'
+            ],
+            update_clause="""
+                first_name = VALUES(first_name), last_name = VALUES(last_name),
+                father_name = VALUES(father_name), mother_name = VALUES(mother_name),
+                id_nb = VALUES(id_nb), date_of_birth = VALUES(date_of_birth),
+                gender = VALUES(gender), marital_status = VALUES(marital_status),
+                nationality = VALUES(nationality), phone = VALUES(phone),
+                phone_alt = VALUES(phone_alt), email = VALUES(email),
+                address_line1 = VALUES(address_line1), address_line2 = VALUES(address_line2),
+                city = VALUES(city), state = VALUES(state), zip_code = VALUES(zip_code),
+                blood_group = VALUES(blood_group), allergies = VALUES(allergies),
+                updated_at = VALUES(updated_at)
+            """,
+            on_error=on_error,
+            checkpoint_stage='patients'
         )
-        ON DUPLICATE KEY UPDATE
-            first_name = VALUES(first_name), last_name = VALUES(last_name),
-            father_name = VALUES(father_name), mother_name = VALUES(mother_name),
-            id_nb = VALUES(id_nb), date_of_birth = VALUES(date_of_birth),
-            gender = VALUES(gender), marital_status = VALUES(marital_status),
-            nationality = VALUES(nationality), phone = VALUES(phone),
-            phone_alt = VALUES(phone_alt), email = VALUES(email),
-            address_line1 = VALUES(address_line1), address_line2 = VALUES(address_line2),
-            city = VALUES(city), state = VALUES(state), zip_code = VALUES(zip_code),
-            blood_group = VALUES(blood_group), allergies = VALUES(allergies),
-            updated_at = VALUES(updated_at)
-        """
 
-        inserted, updated, errors = 0, 0, []
+        def on_progress(processed):
+            print(f"  Progress: {processed}/{total_records} ({processed * 100 // total_records}%) - Written: {writer.written}")
 
-        for i, row in enumerate(rows, 1):
-            try:
-                first, last, father = parse_full_name(row.COMPANY, row.FIRST_NM, row.LAST_NM, row.FATHER_NM)
-
-                nationality = None
-                if row.NATIONALITY:
-                    if isinstance(row.NATIONALITY, (int, float)):
-                        nationality = nationality_map.get(int(row.NATIONALITY))
-                    else:
-                        nationality = safe_string(row.NATIONALITY, 100)
-
-                data = (
-                    safe_string(row.ID, 50), safe_string(first, 50), safe_string(last, 50),
-                    safe_string(father, 100), safe_string(row.MOTHER, 100), safe_string(row.ID_NO, 50),
-                    safe_date(row.BDATE), normalize_gender(row.GENDER), safe_string(row.MARITALSTATUS, 20),
-                    nationality, clean_phone(row.PHONE), clean_phone(row.MOBILE),
-                    safe_string(row.EMAIL, 100), safe_string(row.ADDR1), safe_string(row.ADDR2),
-                    safe_string(row.CITY, 50), safe_string(row.STATE, 50), safe_string(row.ZIP, 10),
-                    safe_string(row.Bloodgroup, 5), safe_string(row.allergies),
-                    safe_datetime(row.DATEADDED), safe_datetime(row.Lastupdate)
-                )
-
-                mysql_cursor.execute(insert_query, data)
-
-                if mysql_cursor.rowcount == 1:
-                    inserted += 1
-                elif mysql_cursor.rowcount == 2:
-                    updated += 1
-
-                if i % Config.BATCH_SIZE == 0:
-                    mysql_conn.commit()
-                    print(f"  Progress: {i}/{total_records} ({i * 100 // total_records}%) - Inserted: {inserted}, Updated: {updated}")
-
-            except Exception as e:
-                error_msg = f"Patient ID {row.ID}: {str(e)}"
-                errors.append(error_msg)
-                log_error(mysql_conn, 'patients', row.ID, 'INSERT/UPDATE', str(e))
-                if Config.DEBUG_MODE and len(errors) <= 3:
-                    print(f"  ❌ {error_msg}")
-
-        mysql_conn.commit()
+        run_pipeline(
+            mssql_cursor, lambda row: transform_patient(row, nationality_map), writer,
+            source_key=lambda row: row.ID, on_error=on_error, on_progress=on_progress
+        )
+        writer.close()
+        clear_checkpoints(mysql_conn, 'patients')
+        if Config.SYNC_MODE:
+            save_sync_state(mysql_conn, 'patients', sync_started)
 
         print("\n" + "-" * 60)
         print(f"✅ PATIENT MIGRATION COMPLETED")
         print(f"   Total Records: {total_records}")
-        print(f"   Inserted: {inserted}")
-        print(f"   Updated: {updated}")
+        print(f"   Written (inserted or updated): {writer.written}")
         print(f"   Errors: {len(errors)}")
         print("-" * 60)
 
@@ -448,17 +852,39 @@ def migrate_patients(mssql_conn, mysql_conn, nationality_map):
             print(f"   Error details saved to: {log_path}")
 
         mssql_cursor.close()
-        mysql_cursor.close()
 
     except Exception as e:
         print(f"❌ Critical error in patient migration: {e}")
         traceback.print_exc()
         mysql_conn.rollback()
+        raise  # fail the stage so run_stages skips its dependents
 
 
 # ================================================================
 # DOCTOR MIGRATION
 # ================================================================
+def transform_doctor(row):
+    """Map a Vend row to the doctors upsert tuple, skipping labs and suppliers."""
+    sid = safe_string(row.VENDSRH, 50)
+    company = safe_string(row.COMPANY)
+
+    if not is_likely_doctor(company):
+        raise SkipRecord(f"{company} (filtered)")
+
+    first, last = parse_doctor_name(company)
+    if not first:
+        raise SkipRecord(f"{company} (no name parsed)")
+
+    return sid, (
+        sid,
+        'Dr',  # Default title for all doctors
+        safe_string(first, 50),
+        safe_string(last, 50),
+        clean_phone(row.PHONE),
+        clean_phone(row.CONTACT)
+    )
+
+
 def migrate_doctors(mssql_conn, mysql_conn):
     """Migrate doctors with improved filtering and error handling."""
     print("\n" + "=" * 60)
@@ -466,85 +892,62 @@ def migrate_doctors(mssql_conn, mysql_conn):
     print("=" * 60)
 
     try:
-        mssql_cursor = mssql_conn.cursor()
-        query = "SELECT VENDSRH, COMPANY, PHONE, CONTACT FROM Vend WHERE TYPE = 2"
-
-        if Config.TEST_MODE:
-            query = "SELECT TOP 50 VENDSRH, COMPANY, PHONE, CONTACT FROM Vend WHERE TYPE = 2"
+        # Vend has no change timestamp and only a few rows, so a sync always copies it in full
+        from_clause, params = resume_filter("FROM Vend WHERE TYPE = 2", "VENDSRH", get_resume_key(mysql_conn, 'doctors'))
+        limit = 50 if Config.TEST_MODE else None
+        query = f"SELECT {f'TOP {limit} ' if limit else ''}VENDSRH, COMPANY, PHONE, CONTACT {from_clause} ORDER BY VENDSRH"
 
-        mssql_cursor.execute(query)
-        rows = mssql_cursor.fetchall()
-        total_records = len(rows)
+        total_records = count_source_rows(mssql_conn, from_clause, limit, params)
         print(f"📊 Found {total_records} doctors (TYPE=2) to migrate")
 
         if total_records == 0:
             print("⚠️ No records found to migrate")
+            clear_checkpoints(mysql_conn, 'doctors')
             return
 
-        mysql_cursor = mysql_conn.cursor()
-
-        insert_query = """
-        INSERT INTO doctors (source_id, title, first_name, last_name, phone, phone_alt) 
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-            title = VALUES(title),
-            first_name = VALUES(first_name), 
-            last_name = VALUES(last_name),
-            phone = VALUES(phone), 
-            phone_alt = VALUES(phone_alt)
-        """
-
-        inserted, updated, skipped, errors = 0, 0, [], []
-
-        for i, row in enumerate(rows, 1):
-            sid = safe_string(row.VENDSRH, 50)
-            company = safe_string(row.COMPANY)
-
-            try:
-                if not is_likely_doctor(company):
-                    skipped.append(f"{sid}: {company} (filtered)")
-                    continue
-
-                first, last = parse_doctor_name(company)
-
-                if not first:
-                    skipped.append(f"{sid}: {company} (no name parsed)")
-                    continue
-
-                data = (
-                    sid,
-                    'Dr',  # Default title for all doctors
-                    safe_string(first, 50),
-                    safe_string(last, 50),
-                    clean_phone(row.PHONE),
-                    clean_phone(row.CONTACT)
-                )
-                mysql_cursor.execute(insert_query, data)
-
-                if mysql_cursor.rowcount == 1:
-                    inserted += 1
-                elif mysql_cursor.rowcount == 2:
-                    updated += 1
-
-                if i % Config.BATCH_SIZE == 0:
-                    mysql_conn.commit()
-                    processed = inserted + updated + len(skipped)
-                    print(f"  Progress: {processed}/{total_records} - Inserted: {inserted}, Updated: {updated}, Skipped: {len(skipped)}")
+        mssql_cursor = mssql_conn.cursor()
+        mssql_cursor.execute(query, *params)
+
+        skipped, errors = [], []
+
+        def on_error(source_id, e):
+            errors.append(f"Doctor ID {source_id}: {str(e)}")
+            log_error('doctors', source_id, 'INSERT/UPDATE', str(e))
+            if Config.DEBUG_MODE and len(errors) <= 3:
+                print(f"  ❌ {errors[-1]}")
+
+        def on_skip(source_id, reason):
+            skipped.append(f"{source_id}: {reason}")
+
+        writer = BatchUpserter(
+            mysql_conn, 'doctors',
+            columns=['source_id', 'title', 'first_name', 'last_name', 'phone', 'phone_alt'],
+            update_clause="""
+                title = VALUES(title),
+                first_name = VALUES(first_name),
+                last_name = VALUES(last_name),
+                phone = VALUES(phone),
+                phone_alt = VALUES(phone_alt)
+            """,
+            on_error=on_error,
+            checkpoint_stage='doctors'
+        )
 
-            except Exception as e:
-                error_msg = f"Doctor ID {sid}: {str(e)}"
-                errors.append(error_msg)
-                log_error(mysql_conn, 'doctors', sid, 'INSERT/UPDATE', str(e))
-                if Config.DEBUG_MODE and len(errors) <= 3:
-                    print(f"  ❌ {error_msg}")
+        def on_progress(processed):
+            print(f"  Progress: {processed}/{total_records} - Written: {writer.written}, Skipped: {len(skipped)}")
 
-        mysql_conn.commit()
+        run_pipeline(
+            mssql_cursor, transform_doctor, writer,
+            source_key=lambda row: safe_string(row.VENDSRH, 50),
+            on_error=on_error, on_skip=on_skip, on_progress=on_progress
+        )
+        writer.close()
+        clear_checkpoints(mysql_conn, 'doctors')
 
         print("\n" + "-" * 60)
         print(f"✅ DOCTOR MIGRATION COMPLETED")
         print(f"   Total Records: {total_records}")
-        print(f"   Inserted: {inserted}")
-        print(f"   Updated: {updated}")
+        print(f"   Written (inserted or updated): {writer.written}")
         print(f"   Skipped: {len(skipped)}")
         print(f"   Errors: {len(errors)}")
         print("-" * 60)
@@ -564,101 +967,375 @@ def migrate_doctors(mssql_conn, mysql_conn):
             print(f"   Error details log saved.")
 
         mssql_cursor.close()
-        mysql_cursor.close()
 
     except Exception as e:
         print(f"❌ Critical error in doctor migration: {e}")
         traceback.print_exc()
         mysql_conn.rollback()
+        raise
 
 
 # ================================================================
 # APPOINTMENT MIGRATION
 # ================================================================
-def migrate_appointments(mssql_conn, mysql_conn):
-    """Migrate appointments, mapping status codes to enum values."""
-    print("\n" + "=" * 60 + "\nAPPOINTMENT MIGRATION STARTED\n" + "=" * 60)
+def transform_appointment(row):
+    """Map a schedule row to the appointments upsert tuple."""
+    duration_str = f"{(row.period or 15)} minutes"
+    reason = safe_string(row.comment) or safe_string(row.pat_name)
+
+    # Map the status code to the enum value
+    mapped_status = map_appointment_status(row.status)
+
+    # Source ids as text so the lookups below hit the VARCHAR source_id indexes
+    return row.id, (
+        row.id,
+        str(row.pat_id) if row.pat_id else None,
+        str(row.doc_id) if row.doc_id else None,
+        safe_date(row.date), safe_time(row.time),
+        duration_str, safe_string(row.room, 50),
+        mapped_status,
+        bool(row.missed), reason,
+    )
+
+
+def copy_appointments(mssql_conn, mysql_conn, from_clause, checkpoint_stage, limit=None, label="", params=()):
+    """
+    Stream the schedule rows matching from_clause into appointments.
 
-    try:
-        mssql_cursor = mssql_conn.cursor()
-        query = f"""
-            SELECT id, pat_id, doc_id, [date], [time], period, room, status, missed, comment, pat_name
-            FROM schedule
-            WHERE pat_id > 0 AND [date] >= '{Config.MIGRATE_APPOINTMENTS_FROM}'
-        """
-        if Config.TEST_MODE:
-            query = f"""
-                SELECT TOP 200 id, pat_id, doc_id, [date], [time], period, room, status, missed, comment, pat_name
-                FROM schedule
-                WHERE pat_id > 0 AND [date] >= '{Config.MIGRATE_APPOINTMENTS_FROM}'
-            """
-
-        mssql_cursor.execute(query)
-        rows = mssql_cursor.fetchall()
-        total_records = len(rows)
-        print(f"📊 Found {total_records} appointments to migrate from {Config.MIGRATE_APPOINTMENTS_FROM}")
-        if total_records == 0:
-            return
+    Rows are read in id order and checkpointed under checkpoint_stage, so a
+    rerun (or a retry) continues after the last committed id. Returns
+    (total, written, errors). Critical errors are raised so the
+    caller can decide whether to retry.
+    """
+    from_clause, resume_params = resume_filter(from_clause, "id", get_resume_key(mysql_conn, checkpoint_stage))
+    params = tuple(params) + resume_params
+    query = f"""
+        SELECT {f"TOP {limit} " if limit else ""}id, pat_id, doc_id, [date], [time], period, room, status, missed, comment, pat_name
+        {from_clause}
+        ORDER BY id
+    """
 
-        mysql_cursor = mysql_conn.cursor()
-        insert_query = """
-        INSERT INTO appointments (
-            source_id, patient_id, doctor_id, appointment_date, appointment_time,
-            duration, room, status, missed, reason_for_visit, created_at, updated_at
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-        ON DUPLICATE KEY UPDATE
+    total_records = count_source_rows(mssql_conn, from_clause, limit, params)
+    if total_records == 0:
+        return 0, 0, 0
+
+    mssql_cursor = mssql_conn.cursor()
+    errors = 0
+
+    def on_error(source_id, e):
+        nonlocal errors
+        errors += 1
+        log_error('appointments', source_id, 'INSERT/UPDATE', str(e))
+        if Config.DEBUG_MODE:
+            print(f"  ❌ {label}Error for appointment ID {source_id}: {e}")
+
+    writer = BatchUpserter(
+        mysql_conn, 'appointments',
+        columns=[
+            'source_id', 'patient_id', 'doctor_id', 'appointment_date', 'appointment_time',
+            'duration', 'room', 'status', 'missed', 'reason_for_visit', 'created_at', 'updated_at'
+        ],
+        # patient_id/doctor_id are integer keys: resolve the source ids to patients.id/doctors.id
+        row_template="(%s, (SELECT id FROM patients WHERE source_id = %s), (SELECT id FROM doctors WHERE source_id = %s), "
+                     "%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())",
+        update_clause="""
             patient_id = VALUES(patient_id), doctor_id = VALUES(doctor_id),
             appointment_date = VALUES(appointment_date), appointment_time = VALUES(appointment_time),
             duration = VALUES(duration), room = VALUES(room), status = VALUES(status),
             missed = VALUES(missed), reason_for_visit = VALUES(reason_for_visit),
             updated_at = NOW()
-        """
-        inserted, updated, errors = 0, 0, 0
+        """,
+        on_error=on_error,
+        checkpoint_stage=checkpoint_stage
+    )
 
-        for i, row in enumerate(rows, 1):
-            try:
-                duration_str = f"{(row.period or 15)} minutes"
-                reason = safe_string(row.comment) or safe_string(row.pat_name)
-
-                # Map the status code to the enum value
-                mapped_status = map_appointment_status(row.status)
-
-                data = (
-                    row.id, row.pat_id, row.doc_id,
-                    safe_date(row.date), safe_time(row.time),
-                    duration_str, safe_string(row.room, 50),
-                    mapped_status,
-                    bool(row.missed), reason,
-                )
-                mysql_cursor.execute(insert_query, data)
+    def on_progress(processed):
+        print(f"  {label}Progress: {processed}/{total_records} ({processed * 100 // total_records}%) - Written: {writer.written}")
+
+    try:
+        mssql_cursor.execute(query, *params)
+        run_pipeline(
+            mssql_cursor, transform_appointment, writer,
+            source_key=lambda row: row.id, on_error=on_error, on_progress=on_progress
+        )
+        writer.close()
+    finally:
+        mssql_cursor.close()
 
-                if mysql_cursor.rowcount == 1:
-                    inserted += 1
-                elif mysql_cursor.rowcount == 2:
-                    updated += 1
+    return total_records, writer.written, errors
 
-                if i % Config.BATCH_SIZE == 0:
-                    mysql_conn.commit()
-                    print(f"  Progress: {i}/{total_records} ({i * 100 // total_records}%) - Inserted: {inserted}, Updated: {updated}")
 
-            except Exception as e:
-                errors += 1
-                log_error(mysql_conn, 'appointments', row.id, 'INSERT/UPDATE', str(e))
-                if Config.DEBUG_MODE:
-                    print(f"  ❌ Error for appointment ID {row.id}: {e}")
+def partition_key_ranges(mssql_conn, from_clause, partitions, checkpoints=None):
+    """
+    Split the id span of the matching schedule rows into contiguous, inclusive ranges.
 
+    When an interrupted run left partition checkpoints behind, their ranges
+    are reused so each checkpoint still lines up with its partition. Ids
+    outside the old plan (below it, above it, or in a gap a lost checkpoint
+    left) become extra ranges.
+    """
+    cursor = mssql_conn.cursor()
+    try:
+        cursor.execute(f"SELECT MIN(id), MAX(id) {from_clause}")
+        low, high = cursor.fetchone()
+    finally:
+        cursor.close()
+
+    planned = sorted(
+        tuple(int(bound) for bound in name.split(":", 1)[1].split("-"))
+        for name in (checkpoints or {}) if ":" in name
+    )
+    if planned:
+        gaps = [(end + 1, start - 1) for (_, end), (start, _) in zip(planned, planned[1:]) if start > end + 1]
+        if low is not None and low < planned[0][0]:
+            gaps.append((low, planned[0][0] - 1))
+        if high is not None and high > planned[-1][1]:
+            gaps.append((planned[-1][1] + 1, high))
+        return sorted(planned + gaps)
+
+    if low is None:
+        return []
+
+    step = (high - low) // partitions + 1
+    return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+
+def save_partition_plan(mysql_conn, stage, ranges, checkpoints):
+    """Record every planned range as a 'pending' checkpoint before any worker starts.
+
+    A partition that fails before its first batch commits would otherwise
+    leave no checkpoint, and a resumed run could not tell its range was planned.
+    """
+    cursor = mysql_conn.cursor()
+    try:
+        for low, high in ranges:
+            name = f"{stage}:{low}-{high}"
+            if name not in checkpoints:
+                save_checkpoint(cursor, name, None, status='pending')
         mysql_conn.commit()
-        print("\n" + "-" * 60 + f"\n✅ APPOINTMENT MIGRATION COMPLETED\n   Total: {total_records}, Inserted: {inserted}, Updated: {updated}, Errors: {errors}\n" + "-" * 60)
+    finally:
+        cursor.close()
+
+
+def migrate_appointment_partition(from_clause, key_range, index, count):
+    """Copy one id range on dedicated connections, retrying it with fresh connections."""
+    low, high = key_range
+    label = f"[{index}/{count}] "
+    stage = f"appointments:{low}-{high}"
+    partition_clause = f"{from_clause} AND id BETWEEN {low} AND {high}"
+
+    for attempt in range(1, Config.PARTITION_RETRIES + 1):
+        mssql = create_mssql_connection(Config.MSSQL_SERVER, Config.MSSQL_DATABASE, Config.USE_WINDOWS_AUTH, Config.MSSQL_USERNAME, Config.MSSQL_PASSWORD)
+        mysql = create_mysql_connection(Config.MYSQL_HOST, Config.MYSQL_USER, Config.MYSQL_PASSWORD, Config.MYSQL_DATABASE)
+        try:
+            if not mssql or not mysql:
+                raise Exception("Could not establish database connections for partition")
+            result = copy_appointments(mssql, mysql, partition_clause, stage, label=label)
+            cursor = mysql.cursor()
+            save_checkpoint(cursor, stage, None, status='done')
+            mysql.commit()
+            cursor.close()
+            print(f"  ✅ {label}ids {low}-{high} done - Total: {result[0]}, Written: {result[1]}, Errors: {result[2]}")
+            return result
+        except Exception as e:
+            print(f"  ⚠️ {label}ids {low}-{high} failed on attempt {attempt}/{Config.PARTITION_RETRIES}: {e}")
+            if attempt == Config.PARTITION_RETRIES:
+                raise
+            sleep(2 ** attempt)
+        finally:
+            if mssql:
+                mssql.close()
+            if mysql and mysql.is_connected():
+                mysql.close()
+
+
+def max_appointment_id(mysql_conn):
+    cursor = mysql_conn.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM appointments")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def remove_rescheduled_duplicates(mysql_conn, since_id):
+    """Keep only the newest row per source_id in partitioned appointments.
+
+    Partitioned, source_id is only unique per appointment_date, so upserting a
+    rescheduled appointment inserts a new row instead of updating the old one.
+    Only rows inserted after since_id can supersede anything, so the self-join
+    is limited to them instead of scanning the whole table on every sync.
+    """
+    cursor = mysql_conn.cursor()
+    try:
+        cursor.execute("""
+            DELETE old FROM appointments old
+            JOIN appointments newer ON newer.source_id = old.source_id AND newer.id > old.id
+            WHERE newer.id > %s
+        """, (since_id,))
+        if cursor.rowcount:
+            print(f"🔁 Removed {cursor.rowcount} superseded rows of rescheduled appointments")
+        mysql_conn.commit()
+    finally:
+        cursor.close()
+
+
+def migrate_appointments(mssql_conn, mysql_conn):
+    """Migrate appointments, mapping status codes to enum values."""
+    print("\n" + "=" * 60 + "\nAPPOINTMENT MIGRATION STARTED\n" + "=" * 60)
+
+    try:
+        from_clause = f"FROM schedule WHERE pat_id > 0 AND [date] >= '{Config.MIGRATE_APPOINTMENTS_FROM}'"
+        if Config.PARTITION_BY_YEAR:
+            id_before = max_appointment_id(mysql_conn)
+
+        if Config.SYNC_MODE:
+            # schedule has no change timestamp: take every new id plus anything
+            # dated close enough to the last sync to still change status
+            watermark, last_id = load_sync_state(mysql_conn, 'appointments')
+            sync_started = source_now(mssql_conn)
+            cursor = mssql_conn.cursor()
+            cursor.execute(f"SELECT MAX(id) {from_clause}")
+            max_id = cursor.fetchone()[0]
+            cursor.close()
+
+            params = ()
+            if watermark:
+                since = watermark - timedelta(days=Config.SYNC_LOOKBACK_DAYS)
+                print(f"🔁 Syncing appointments with id > {last_id} or dated from {since.date()}")
+                from_clause += " AND (id > ? OR [date] >= ?)"
+                params = (int(last_id or 0), since)
+
+            total, written, errors = copy_appointments(mssql_conn, mysql_conn, from_clause, 'appointments', params=params)
+            failed_partitions = 0
+            save_sync_state(mysql_conn, 'appointments', sync_started, max_id)
+        elif Config.TEST_MODE or Config.APPOINTMENT_PARTITIONS <= 1:
+            print(f"📊 Migrating appointments from {Config.MIGRATE_APPOINTMENTS_FROM}")
+            total, written, errors = copy_appointments(
+                mssql_conn, mysql_conn, from_clause, 'appointments', limit=200 if Config.TEST_MODE else None
+            )
+            failed_partitions = 0
+        else:
+            checkpoints = load_checkpoints(mysql_conn, 'appointments')
+            ranges = partition_key_ranges(mssql_conn, from_clause, Config.APPOINTMENT_PARTITIONS, checkpoints)
+            save_partition_plan(mysql_conn, 'appointments', ranges, checkpoints)
+            pending = [
+                (i, key_range) for i, key_range in enumerate(ranges, 1)
+                if checkpoints.get(f"appointments:{key_range[0]}-{key_range[1]}", (None, None))[1] != 'done'
+            ]
+            print(f"📊 Migrating appointments from {Config.MIGRATE_APPOINTMENTS_FROM} in {len(ranges)} id partitions"
+                  + (f" ({len(ranges) - len(pending)} already done)" if len(pending) < len(ranges) else ""))
+
+            results, failed_partitions = [], 0
+            with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+                futures = [
+                    pool.submit(migrate_appointment_partition, from_clause, key_range, i, len(ranges))
+                    for i, key_range in pending
+                ]
+                for future in futures:
+                    try:
+                        results.append(future.result())
+                    except Exception:
+                        failed_partitions += 1
+
+            total, written, errors = (sum(column) for column in zip((0, 0, 0), *results))
+
+        if not failed_partitions:
+            clear_checkpoints(mysql_conn, 'appointments')
+        if Config.PARTITION_BY_YEAR:
+            remove_rescheduled_duplicates(mysql_conn, id_before)
+
+        print("\n" + "-" * 60 + f"\n✅ APPOINTMENT MIGRATION COMPLETED\n   Total: {total}, Written: {written}, Errors: {errors}" + (f", Failed Partitions: {failed_partitions}" if failed_partitions else "") + "\n" + "-" * 60)
+        if failed_partitions:
+            raise Exception(f"{failed_partitions} appointment partitions failed; rerun to resume them")
 
     except Exception as e:
         print(f"❌ Critical error in appointment migration: {e}")
         traceback.print_exc()
         mysql_conn.rollback()
-    finally:
-        if 'mssql_cursor' in locals():
-            mssql_cursor.close()
-        if 'mysql_cursor' in locals():
-            mysql_cursor.close()
+        raise
+
+
+# ================================================================
+# STAGE SCHEDULER
+# ================================================================
+class Stage:
+    """A migration stage and the names of the stages it has to wait for."""
+
+    def __init__(self, name, run, depends_on=()):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+
+
+def run_stages(stages, max_workers=None):
+    """
+    Run each stage as soon as its dependencies have finished.
+
+    Independent stages run at the same time on a thread pool. A stage whose
+    dependency raised is skipped. Returns the per-stage timeline as
+    (name, start_offset, end_offset, status) tuples, in seconds from the
+    scheduler start.
+    """
+    started_at = perf_counter()
+    pending = {stage.name: stage for stage in stages}
+    running, done, failed, timeline = {}, set(), set(), []
+
+    def timed(stage):
+        start = perf_counter() - started_at
+        try:
+            stage.run()
+            return start, perf_counter() - started_at, None
+        except Exception as e:
+            traceback.print_exc()
+            return start, perf_counter() - started_at, e
+
+    with ThreadPoolExecutor(max_workers=max_workers or Config.PARALLEL_STAGES) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if any(dep in failed for dep in stage.depends_on):
+                    del pending[name]
+                    failed.add(name)
+                    timeline.append((name, None, None, 'skipped'))
+                    print(f"⏭️ Skipping stage '{name}': a dependency failed")
+                elif all(dep in done for dep in stage.depends_on):
+                    del pending[name]
+                    running[pool.submit(timed, stage)] = name
+
+            if not running:
+                if pending:
+                    raise Exception(f"Unresolvable stage dependencies: {', '.join(pending)}")
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                start, end, error = future.result()
+                if error:
+                    failed.add(name)
+                    print(f"❌ Stage '{name}' failed: {error}")
+                else:
+                    done.add(name)
+                timeline.append((name, start, end, 'failed' if error else 'ok'))
+
+    return timeline
+
+
+def print_stage_timeline(timeline):
+    """Print a wall-clock bar per stage so overlap between stages is visible."""
+    total = max((end for _, _, end, _ in timeline if end is not None), default=0) or 1
+    width = 40
+
+    print("\n" + "=" * 60 + "\n⏱️ STAGE TIMELINE\n" + "=" * 60)
+    for name, start, end, status in sorted(timeline, key=lambda t: (t[1] is None, t[1] or 0)):
+        if start is None:
+            print(f"   {name.ljust(14)} {'':{width}}  skipped")
+            continue
+        offset = int(start / total * width)
+        length = max(1, int((end - start) / total * width))
+        bar = (" " * offset + "█" * length).ljust(width)
+        print(f"   {name.ljust(14)} {bar}  {start:7.1f}s → {end:7.1f}s ({end - start:.1f}s){'' if status == 'ok' else ' ' + status.upper()}")
+    print(f"   Total wall-clock: {total:.1f}s")
 
 
 # ================================================================
@@ -688,10 +1365,29 @@ def verify_migration(mysql_conn):
 # ================================================================
 # MAIN
 # ================================================================
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrate Bizri SQL Server data into Toothpick EVE.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--resume", dest="restart", action="store_false",
+                      help="continue unfinished stages from their last checkpoint (default)")
+    mode.add_argument("--restart", dest="restart", action="store_true",
+                      help="discard checkpoints and migrate every stage from the beginning")
+    parser.add_argument("--sync", action="store_true",
+                        help="only copy rows added or changed since the last successful sync")
+    parser.add_argument("--every", type=int, metavar="MINUTES",
+                        help="keep running an incremental sync every MINUTES minutes (implies --sync)")
+    parser.add_argument("--purge-before", type=int, metavar="YEAR",
+                        help="empty the year partitions before YEAR (PARTITION_BY_YEAR only) and exit")
+    parser.set_defaults(restart=False)
+    return parser.parse_args()
+
+
 def main():
     """Main migration process."""
+    args = parse_args()
+    Config.SYNC_MODE = args.sync or bool(args.every)
     print("\n" + "=" * 60 + "\n🚀 TOOTHPICK EVE DATA MIGRATION TOOL\n" + "=" * 60)
-    print(f"Mode: {'TEST' if Config.TEST_MODE else 'PRODUCTION'}, Debug: {'ON' if Config.DEBUG_MODE else 'OFF'}, Batch Size: {Config.BATCH_SIZE}")
+    print(f"Mode: {'TEST' if Config.TEST_MODE else 'PRODUCTION'}, Debug: {'ON' if Config.DEBUG_MODE else 'OFF'}, Batch Size: {Config.BATCH_SIZE}, {'Restart' if args.restart else 'Resume'}{', Incremental Sync' if Config.SYNC_MODE else ''}")
     print("=" * 60)
 
     mssql = create_mssql_connection(Config.MSSQL_SERVER, Config.MSSQL_DATABASE, Config.USE_WINDOWS_AUTH, Config.MSSQL_USERNAME, Config.MSSQL_PASSWORD)
@@ -704,16 +1400,55 @@ def main():
     try:
         setup_database_tables(mysql)
 
-        nationality_map = load_nationality_mapping(mssql)
-        migrate_patients(mssql, mysql, nationality_map)
-        migrate_doctors(mssql, mysql)
-        migrate_appointments(mssql, mysql)
-
-        verify_migration(mysql)
+        if args.purge_before:
+            if not Config.PARTITION_BY_YEAR:
+                print("\n❌ --purge-before needs PARTITION_BY_YEAR")
+                return 1
+            purge_partitions_before(mysql, args.purge_before)
+            return 0
+
+        if args.restart:
+            clear_checkpoints(mysql)
+            print("🔄 Checkpoints cleared, migrating from the beginning")
+
+        while True:
+            nationality_map = load_nationality_mapping(mssql)
+
+            # Appointments reference patients and doctors; those two are independent
+            timeline = run_stages([
+                Stage('patients', with_connections(migrate_patients, nationality_map)),
+                Stage('doctors', with_connections(migrate_doctors)),
+                Stage('appointments', with_connections(migrate_appointments), depends_on=['patients', 'doctors']),
+            ])
+            print_stage_timeline(timeline)
+
+            error_sink.flush()
+            verify_migration(mysql)
+
+            failed = [name for name, _, _, status in timeline if status != 'ok']
+            if failed:
+                print(f"\n❌ Stages did not complete: {', '.join(failed)}")
+                if not args.every:
+                    return 1
+
+            if not args.every:
+                break
+            mysql.commit()  # end the read snapshot so the next pass sees fresh counts
+            print(f"\n💤 Next sync in {args.every} minutes (Ctrl+C to stop)...")
+            try:
+                sleep(args.every * 60)
+            except KeyboardInterrupt:
+                # Stopping between passes is the normal way to end --every
+                print("\n⏹️ Periodic sync stopped.")
+                return 0
 
         print("\n" + "=" * 60 + "\n✅ MIGRATION COMPLETED SUCCESSFULLY\n" + "=" * 60)
         return 0
 
+    except KeyboardInterrupt:
+        print("\n⏹️ Migration interrupted before it completed.")
+        return 130
+
     except Exception as e:
         print(f"\n❌ MIGRATION FAILED WITH A CRITICAL ERROR: {e}")
         traceback.print_exc()
@@ -721,6 +1456,7 @@ def main():
 
     finally:
         print("\n🔒 Closing Database Connections...")
+        error_sink.close()
         if mssql:
             mssql.close()
             print("   SQL Server connection closed.")
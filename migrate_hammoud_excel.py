@@ -14,9 +14,15 @@ import pandas as pd
 import mysql.connector
 from mysql.connector import Error
 import re
-from datetime import datetime, time as time_type
+from datetime import datetime, date, time as time_type
 import os
 import traceback
+import tempfile
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from time import perf_counter
+from schema import add_year_partitions, ensure_schema, prepare_shadow_tables, swap_shadow_tables
 
 
 # ================================================================
@@ -38,6 +44,15 @@ class Config:
     BATCH_SIZE = 50
     DEBUG_MODE = True
     TEST_MODE = False  # Set to True to limit records for testing
+    PARALLEL_STAGES = 3  # Independent stages run at the same time, each on its own connection
+    SHEET_CACHE_DIR = None  # e.g. "cache" to keep parsed sheets as Parquet between runs
+    BULK_LOAD = True  # LOAD DATA LOCAL INFILE into empty tables (needs local_infile=ON on the server)
+    FUZZY_MATCHING = True  # Second-tier spelling/transliteration matching for unresolved patient names
+    FUZZY_MIN_CONFIDENCE = 0.8  # 1 - edit_distance / name_length needed to accept a fuzzy match
+    REFERENCE_CHUNK_SIZE = 10000  # Primary-key range per UPDATE ... JOIN when filling integer keys
+    PARTITION_BY_YEAR = False  # RANGE-partition appointments/treatments by year, once (schema migration 4; drops their foreign keys)
+    SHADOW_LOAD = False  # Load into <database>_staging and swap the tables in at the end (dashboards never see empty tables)
+    LOAD_DATABASE = None  # Database the stages write to; set at startup (the staging one in SHADOW_LOAD mode)
 
 
 # ================================================================
@@ -54,7 +69,8 @@ def create_mysql_connection(host, user, password, database):
             database=database,
             autocommit=False,
             use_unicode=True,
-            charset='utf8mb4'
+            charset='utf8mb4',
+            allow_local_infile=Config.BULK_LOAD
         )
         if conn.is_connected():
             print("✅ Connected to MySQL")
@@ -64,6 +80,25 @@ def create_mysql_connection(host, user, password, database):
         return None
 
 
+def with_connection(migrate_fn, *args):
+    """Wrap a stage so it runs on its own MySQL connection"""
+    def run():
+        conn = create_mysql_connection(
+            Config.MYSQL_HOST,
+            Config.MYSQL_USER,
+            Config.MYSQL_PASSWORD,
+            Config.LOAD_DATABASE or Config.MYSQL_DATABASE
+        )
+        if not conn:
+            raise Exception("Could not establish database connection for stage")
+        try:
+            migrate_fn(conn, *args)
+        finally:
+            if conn.is_connected():
+                conn.close()
+    return run
+
+
 # ================================================================
 # UTILITY FUNCTIONS
 # ================================================================
@@ -215,19 +250,19 @@ def normalize_name_key(name):
 
 
 def create_patient_lookup_map(mysql_conn):
-    """Create a mapping of patient names to source_ids"""
+    """Create a mapping of patient names to patients.id"""
     cursor = mysql_conn.cursor()
-    query = "SELECT source_id, first_name, last_name FROM patients"
+    query = "SELECT id, first_name, last_name FROM patients"
     cursor.execute(query)
 
     patient_map = {}
     for row in cursor.fetchall():
-        source_id, first_name, last_name = row
+        patient_id, first_name, last_name = row
         if first_name and last_name:
             # Create normalized lookup key
             key = normalize_name_key(f"{first_name} {last_name}")
             if key:
-                patient_map[key] = source_id
+                patient_map[key] = patient_id
 
     cursor.close()
     print(f"📋 Created patient lookup map with {len(patient_map)} entries")
@@ -235,19 +270,19 @@ def create_patient_lookup_map(mysql_conn):
 
 
 def create_doctor_lookup_map(mysql_conn):
-    """Create a mapping of doctor names to source_ids"""
+    """Create a mapping of doctor names to doctors.id"""
     cursor = mysql_conn.cursor()
-    query = "SELECT source_id, first_name, last_name FROM doctors"
+    query = "SELECT id, first_name, last_name FROM doctors"
     cursor.execute(query)
 
     doctor_map = {}
     for row in cursor.fetchall():
-        source_id, first_name, last_name = row
+        doctor_id, first_name, last_name = row
         if first_name and last_name:
             # Create normalized lookup key
             key = normalize_name_key(f"{first_name} {last_name}")
             if key:
-                doctor_map[key] = source_id
+                doctor_map[key] = doctor_id
 
     cursor.close()
     print(f"👨‍⚕️ Created doctor lookup map with {len(doctor_map)} entries")
@@ -255,7 +290,7 @@ def create_doctor_lookup_map(mysql_conn):
 
 
 def lookup_patient_id(patient_name, patient_map):
-    """Find patient source_id by name with normalized matching"""
+    """Find patients.id by name with normalized matching"""
     if not patient_name or pd.isna(patient_name):
         return None
 
@@ -267,7 +302,7 @@ def lookup_patient_id(patient_name, patient_map):
 
 
 def lookup_doctor_id(doctor_name, doctor_map):
-    """Find doctor source_id by name with normalized matching"""
+    """Find doctors.id by name with normalized matching"""
     if not doctor_name or pd.isna(doctor_name):
         return None
 
@@ -278,11 +313,972 @@ def lookup_doctor_id(doctor_name, doctor_map):
     return doctor_map.get(key)
 
 
+class LookupIndex:
+    """
+    Shared name -> id maps for patients and doctors.
+
+    appointments, invoices, payments and treatments store integer keys, and
+    the ids only exist once the rows are written. So each map is built with a
+    single SELECT after its stage has finished, then shared by every stage.
+    """
+
+    BUILDERS = {'patients': create_patient_lookup_map, 'doctors': create_doctor_lookup_map}
+
+    def __init__(self):
+        self.maps = {table: {} for table in self.BUILDERS}
+        self.matchers = {}
+        self.ready = set()
+        self.lock = threading.Lock()
+
+    def get(self, table, mysql_conn):
+        """Return the map for a table, building it on first use"""
+        with self.lock:
+            if table not in self.ready:
+                self.maps[table] = self.BUILDERS[table](mysql_conn)
+                self.ready.add(table)
+            return self.maps[table]
+
+    def matcher(self, table, mysql_conn):
+        """Fuzzy matcher over the table's map, built once; None when fuzzy matching is off"""
+        if not Config.FUZZY_MATCHING:
+            return None
+        lookup_map = self.get(table, mysql_conn)
+        with self.lock:
+            if table not in self.matchers:
+                self.matchers[table] = FuzzyNameMatcher(lookup_map, Config.FUZZY_MIN_CONFIDENCE)
+            return self.matchers[table]
+
+
+def build_lookup_index(mysql_conn, lookup_index):
+    """Finish the shared lookup index once patients and doctors are written"""
+    patient_map = lookup_index.get('patients', mysql_conn)
+    doctor_map = lookup_index.get('doctors', mysql_conn)
+    print(f"📋 Lookup index ready: {len(patient_map)} patients, {len(doctor_map)} doctors")
+
+
+# ================================================================
+# FUZZY NAME MATCHING
+# ================================================================
+# Second tier for names the exact lookup can't resolve, mostly
+# transliteration variants (Mohamad/Mohammed, El/Al). Known names are
+# bucketed by a phonetic key, so each unresolved name is only scored
+# against the few names in its bucket, with an edit distance that stops
+# as soon as it exceeds what the confidence threshold allows.
+
+NAME_PARTICLES = {'al', 'el', 'ul'}
+
+# Spellings that stand for the same sound in transliterated Arabic names
+PHONETIC_DIGRAPHS = [('kh', 'k'), ('gh', 'j'), ('sh', 's'), ('ch', 's'), ('ph', 'f'), ('th', 't'), ('dh', 'd')]
+PHONETIC_LETTERS = str.maketrans({'q': 'k', 'c': 'k', 'g': 'j', 'v': 'f', 'z': 's'})
+
+
+def fuzzy_name_tokens(name, known_tokens=frozenset()):
+    """Lowercase name tokens without punctuation, digits or al-/el- particles
+
+    A separate particle (Al Khoury, El-Khoury, Al'Amin) is always dropped. A glued
+    one is only stripped when the rest is itself a known token (Elkhoury -> khoury
+    if some name has Khoury), so Albert, Elissa or Alexander stay whole.
+    """
+    tokens = []
+    for token in re.split(r"[\s\-']+", str(name).lower()):
+        token = re.sub(r'[\W\d_]', '', token)
+        if token in NAME_PARTICLES:
+            continue
+        if token[:2] in NAME_PARTICLES and len(token) >= 6 and token[2:] in known_tokens:
+            token = token[2:]
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def phonetic_key(token):
+    """Consonant skeleton shared by spelling variants (Mohamad, Mohammed, Muhammad -> md)"""
+    for digraph, sound in PHONETIC_DIGRAPHS:
+        token = token.replace(digraph, sound)
+    token = token.translate(PHONETIC_LETTERS)
+
+    # Keep the first letter (any vowel counts as the same one), drop the rest of the vowels
+    key = ['a' if token[0] in 'aeiouy' else token[0]]
+    for letter in token[1:]:
+        if letter not in 'aeiouywh' and letter != key[-1]:
+            key.append(letter)
+    return ''.join(key)
+
+
+def bounded_edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 as soon as it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyNameMatcher:
+    """
+    Matches a name to the closest known name with a confidence score.
+
+    Known names are blocked by the phonetic keys of their first and last
+    token. Names whose bucket has no close candidate fall back to buckets
+    of (first letter, trigram), keeping only candidates that share enough
+    trigrams to possibly be within the allowed edit distance. A match must
+    score at least min_confidence (1 - edit distance / length) and be the
+    only best candidate. Results are cached per name, since the same
+    unresolved name tends to repeat across many rows.
+    """
+
+    def __init__(self, lookup_map, min_confidence):
+        self.min_confidence = min_confidence
+        self.entries = []
+        self.blocks = {}
+        self.trigrams = {}
+        self.cache = {}
+        self.known_tokens = {token for key in lookup_map for token in fuzzy_name_tokens(key)}
+        for key, record_id in lookup_map.items():
+            tokens = fuzzy_name_tokens(key, self.known_tokens)
+            if not tokens:
+                continue
+            index = len(self.entries)
+            name = ' '.join(tokens)
+            self.entries.append((name, key, record_id))
+            self.blocks.setdefault(self.block_key(tokens), []).append(index)
+            for trigram in self.trigram_keys(name):
+                self.trigrams.setdefault(trigram, []).append(index)
+
+    @staticmethod
+    def block_key(tokens):
+        """Phonetic keys of the first and last token"""
+        return phonetic_key(tokens[0]), phonetic_key(tokens[-1]) if len(tokens) > 1 else ''
+
+    @staticmethod
+    def trigram_keys(name):
+        """(first letter, trigram) keys of a normalized name"""
+        return {(name[0], name[i:i + 3]) for i in range(max(1, len(name) - 2))}
+
+    def limit_for(self, length):
+        """Largest edit distance that still reaches min_confidence"""
+        return int(length * (1 - self.min_confidence))
+
+    def trigram_candidates(self, target):
+        """Entries sharing enough trigrams with target to be within the distance limit"""
+        keys = self.trigram_keys(target)
+        shared = {}
+        for trigram in keys:
+            for index in self.trigrams.get(trigram, ()):
+                shared[index] = shared.get(index, 0) + 1
+        # Each edit removes at most 3 trigrams (q-gram lemma), with the same
+        # distance limit best_match applies to this candidate
+        candidates = []
+        for index, count in shared.items():
+            length = max(len(target), len(self.entries[index][0]))
+            if count >= max(1, len(keys) - 3 * self.limit_for(length)):
+                candidates.append(index)
+        return candidates
+
+    def best_match(self, target, candidates):
+        """Closest unambiguous candidate as (id, confidence, key), or None"""
+        best, best_ids = None, set()
+        for index in candidates:
+            candidate, key, record_id = self.entries[index]
+            length = max(len(target), len(candidate))
+            limit = self.limit_for(length)
+            distance = bounded_edit_distance(target, candidate, limit)
+            if distance > limit:
+                continue
+            confidence = 1 - distance / length
+            if best is None or confidence > best[1]:
+                best, best_ids = (record_id, confidence, key), {record_id}
+            elif confidence == best[1]:
+                best_ids.add(record_id)
+
+        # Two different people equally close is not a match
+        if best and len(best_ids) == 1 and best[1] >= self.min_confidence:
+            return best
+        return None
+
+    def match(self, name):
+        """Return (id, confidence, matched_name), or (None, 0.0, None) when nothing is close enough"""
+        if name in self.cache:
+            return self.cache[name]
+
+        result = (None, 0.0, None)
+        tokens = fuzzy_name_tokens(name, self.known_tokens)
+        if tokens:
+            target = ' '.join(tokens)
+            best = self.best_match(target, self.blocks.get(self.block_key(tokens), []))
+            if best is None:
+                best = self.best_match(target, self.trigram_candidates(target))
+            if best:
+                result = (best[0], round(best[1], 3), best[2])
+
+        self.cache[name] = result
+        return result
+
+
+def resolve_fuzzy(names, ids, matcher, log_name):
+    """Fill ids the exact lookup missed with confident fuzzy matches and log each one"""
+    unresolved = ids.isna() & names.notna()
+    if matcher is None or not unresolved.any():
+        return ids
+
+    matches = {name: matcher.match(name) for name in names[unresolved].unique()}
+    found = {name: match for name, match in matches.items() if match[0] is not None}
+    if not found:
+        return ids
+
+    ids = ids.copy()
+    ids[unresolved] = names[unresolved].map(lambda name: matches[name][0])
+
+    lowest = min(confidence for _, confidence, _ in found.values())
+    print(f"  🔎 Fuzzy-matched {len(found)} of {len(matches)} unresolved names (lowest confidence {lowest:.2f})")
+
+    log_path = os.path.join(ensure_logs_folder(), f"{log_name}_fuzzy_matches.log")
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write(f"Fuzzy Name Matches - {datetime.now()}\n\n")
+        for name, (record_id, confidence, matched_name) in sorted(found.items(), key=lambda item: item[1][1]):
+            f.write(f"{name} -> {matched_name} (id {record_id}, confidence {confidence:.3f})\n")
+    return ids
+
+
+# ================================================================
+# WORKBOOK LOADER
+# ================================================================
+
+# Columns the stages read from each sheet; nothing else is parsed
+SHEET_COLUMNS = {
+    'Patients': [
+        'id', 'first_name', 'last_name', 'middle_name', 'maiden_name', 'gender',
+        'email', 'phone_number', 'alt_number', 'dob', 'address', 'created_at'
+    ],
+    'Appointments': [
+        'id', 'patient', 'doctor', 'start_date', 'end_date', 'room', 'status',
+        'created_by', 'created_at'
+    ],
+    'Invoices': [
+        'id', 'patient', 'doctor', 'is_expense', 'invoice_date', 'due_date', 'status',
+        'currency', 'discount_type', 'discount_value', 'total_amount', 'total_payments',
+        'notes', 'created_at'
+    ],
+    'invoice_items': [
+        'id', 'invoice_id', 'description', 'unit_price', 'quantity', 'total_amount'
+    ],
+    'Payments': [
+        'id', 'invoice_id', 'patient', 'method', 'amount', 'original_amount', 'currency',
+        'reference_number', 'payment_date', 'created_at', 'deleted_at'
+    ],
+    'Operations': [
+        'id', 'patient', 'created_by', 'tooth_nb', 'code', 'name', 'group', 'treatment_plan',
+        'status', 'price', 'planned_date', 'start_date', 'done_date', 'note'
+    ],
+    'stock': [
+        'id', 'category', 'name', 'sku', 'description', 'unit_of_measure', 'size',
+        'remaining_quantity', 'remaining_unit_size', 'average_purchase_price',
+        'default_selling_price', 'minimum_quantity_warning',
+        'minimum_quantity_critical_warning', 'default_currency', 'created_at', 'deleted_at'
+    ],
+}
+
+
+def workbook_fingerprint(excel_file, sheet_columns):
+    """Cache key for a workbook: its mtime plus a hash of its content and the parsed columns"""
+    digest = hashlib.sha256(repr(sorted(sheet_columns.items())).encode('utf-8'))
+    with open(excel_file, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return f"{int(os.path.getmtime(excel_file))}-{digest.hexdigest()[:16]}"
+
+
+class WorkbookStore:
+    """
+    Opens the Excel workbook once and hands parsed sheets to every stage.
+
+    Each sheet is parsed on first use, limited to its SHEET_COLUMNS, and kept
+    for the rest of the run. With a cache_dir, parsed sheets are also saved as
+    Parquet under a key built from the workbook's mtime and hash, so a rerun
+    against an unchanged file skips xlsx parsing. Stages share the returned
+    DataFrames and must not modify them in place.
+    """
+
+    def __init__(self, excel_file, sheet_columns, cache_dir=None):
+        self.excel_file = excel_file
+        self.sheet_columns = sheet_columns
+        self.cache_dir = cache_dir
+        self.sheets = {}
+        self.workbook = None
+        self.cache_key = None
+        # Stages run in parallel; parse each sheet once and keep the workbook single-threaded
+        self.lock = threading.Lock()
+
+    def sheet(self, name):
+        """Return the parsed sheet, loading it on first use"""
+        with self.lock:
+            if name not in self.sheets:
+                self.sheets[name] = self.load(name)
+            return self.sheets[name]
+
+    def load(self, name):
+        """Read a sheet from the Parquet cache, or parse it from the workbook"""
+        cache_path = self.cache_path(name)
+        if cache_path and os.path.exists(cache_path):
+            try:
+                df = pd.read_parquet(cache_path)
+                print(f"⚡ Loaded sheet '{name}' from cache ({len(df)} rows)")
+                return df
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable cache for sheet '{name}': {e}")
+
+        started = perf_counter()
+        if self.workbook is None:
+            self.workbook = pd.ExcelFile(self.excel_file)
+
+        wanted = self.sheet_columns.get(name)
+        df = self.workbook.parse(name, usecols=(lambda column: column in wanted) if wanted else None)
+        print(f"📖 Parsed sheet '{name}' ({len(df)} rows) in {perf_counter() - started:.1f}s")
+
+        if cache_path:
+            self.save(name, df, cache_path)
+        return df
+
+    def cache_path(self, name):
+        """Where the Parquet copy of a sheet lives, or None when caching is off"""
+        if not self.cache_dir:
+            return None
+        if self.cache_key is None:
+            self.cache_key = workbook_fingerprint(self.excel_file, self.sheet_columns)
+        return os.path.join(self.cache_dir, self.cache_key, f"{name}.parquet")
+
+    def save(self, name, df, cache_path):
+        """Persist a parsed sheet; a sheet that can't be stored is just parsed again next run"""
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            df.to_parquet(cache_path, index=False)
+        except Exception as e:
+            # No Parquet engine installed, or a column mixes types Parquet can't store
+            print(f"⚠️ Could not cache sheet '{name}': {e}")
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+
+    def close(self):
+        """Release the workbook file handle"""
+        if self.workbook is not None:
+            self.workbook.close()
+            self.workbook = None
+
+
+# ================================================================
+# VECTORIZED TRANSFORMS
+# ================================================================
+# Column-wise versions of the scalar helpers above. Each one returns the
+# same values the scalar helper would return for every cell, but works on
+# a whole sheet column at once instead of row by row.
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d']
+
+GENDER_VALUES = {
+    'male': 'male', 'm': 'male', '1': 'male', 'man': 'male',
+    'female': 'female', 'f': 'female', '2': 'female', 'woman': 'female'
+}
+
+
+def sheet_column(df, name):
+    """Return a sheet column, or an all-empty column if the sheet doesn't have it"""
+    if name in df.columns:
+        return df[name]
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def text_column(series):
+    """str() of every non-empty cell as an object column; empty cells stay NaN"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # astype(str) drops a midnight time part, str(Timestamp) keeps it
+        text = series.map(str, na_action='ignore')
+    else:
+        text = series.astype(str)
+    return text.astype(object).where(series.notna())
+
+
+def source_id_column(series):
+    """Vectorized clean_string(str(value), 50) used for source ids"""
+    return clean_string_column(series.astype(object).map(str), 50)
+
+
+def clean_string_column(series, max_length=None):
+    """Vectorized clean_string"""
+    text = text_column(series).str.replace(r'\s+', ' ', regex=True).str.strip()
+    if max_length:
+        text = text.str.slice(0, max_length)
+    return text.where(text.str.len() > 0)
+
+
+def mask_falsy(series):
+    """Blank out the 0/False cells the scalar helpers treat as empty
+
+    Integer columns go through the nullable Int64 dtype first: masking a plain
+    int64 column would turn it into float64 and every number into '123.0'.
+    """
+    if pd.api.types.is_integer_dtype(series):
+        series = series.astype('Int64')
+    return series.mask(series.isin([0, False]))
+
+
+def clean_phone_column(series):
+    """Vectorized clean_phone"""
+    phone = text_column(mask_falsy(series))
+    phone = phone.str.strip().str.replace(' ', '', regex=False)
+    phone = phone.where(phone.str.len() > 0)
+    return phone.where(phone.str.startswith('+', na=True), '+' + phone)
+
+
+def normalize_gender_column(series):
+    """Vectorized normalize_gender"""
+    return text_column(series).str.strip().str.lower().map(GENDER_VALUES)
+
+
+def parse_date_column(series):
+    """Vectorized parse_date: datetime columns directly, strings with explicit formats"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.date.astype(object).where(series.notna())
+
+    result = pd.Series(None, index=series.index, dtype=object)
+    leftover = series.notna()
+
+    if series.dtype == object or pd.api.types.is_string_dtype(series):
+        # Only the text cells: .str on a column holding no strings at all raises
+        is_text = series.map(lambda value: isinstance(value, str)).astype(bool)
+        stripped = series[is_text].astype(str).str.strip()
+        todo = stripped.str.len().gt(0)
+        for fmt in DATE_FORMATS:
+            if not todo.any():
+                break
+            parsed = pd.to_datetime(stripped[todo], format=fmt, errors='coerce')
+            matched = parsed.index[parsed.notna()]
+            result[matched] = parsed[matched].dt.date
+            todo[matched] = False
+            leftover[matched] = False
+
+    # Whatever didn't match a format (or isn't a string) goes through the scalar parser
+    if leftover.any():
+        result[leftover] = series[leftover].map(parse_date)
+    return result
+
+
+def lookup_id_column(series, lookup_map):
+    """Vectorized lookup_patient_id / lookup_doctor_id
+
+    Nullable Int64 keeps the ids integers: a plain map with misses gives
+    float64 and would write every id as '123.0'.
+    """
+    keys = text_column(mask_falsy(series))
+    keys = keys.str.lower().str.replace(r'\s+', ' ', regex=True).str.strip()
+    return keys.map(lookup_map).astype('Int64')
+
+
+def numeric_column(series, default=0.0, as_int=False):
+    """
+    Vectorized float()/int() with a default for empty cells.
+    Returns (values, invalid) where invalid marks cells that aren't numbers.
+    """
+    numbers = pd.to_numeric(series, errors='coerce')
+    invalid = series.notna() & numbers.isna()
+    values = numbers.fillna(0)
+    if as_int:
+        values = values.astype('int64')
+    return values.astype(object).where(numbers.notna(), default), invalid
+
+
+def reject_invalid(df, label, checks):
+    """Build the keep-mask for a sheet and an error message for every rejected row"""
+    keep = pd.Series(True, index=df.index)
+    errors = []
+    for column, invalid, reason in checks:
+        bad = invalid & keep
+        for source_id, value in zip(sheet_column(df, 'id')[bad], sheet_column(df, column)[bad]):
+            errors.append(f"{label} ID {source_id}: {reason} {value!r}")
+        keep &= ~invalid
+    return keep, errors
+
+
+def to_param_rows(columns, keep):
+    """Zip prepared columns (or constants) into database parameter tuples"""
+    count = int(keep.sum())
+    values = []
+    for column in columns:
+        if isinstance(column, pd.Series):
+            column = column[keep].astype(object)
+            values.append(column.where(column.notna(), None).tolist())
+        else:
+            values.append([column] * count)
+    return list(zip(*values))
+
+
+def count_missing(names, ids, label, named_only=True):
+    """Count lookups that didn't resolve to an id (only cells that name someone, unless named_only=False)"""
+    missing = ids.isna() & names.notna() if named_only else ids.isna()
+    if Config.DEBUG_MODE:
+        for name in names[missing].head(3):
+            print(f"  ⚠️ {label} not found: {name}")
+    return int(missing.sum())
+
+
+# ================================================================
+# SHEET TRANSFORMS
+# ================================================================
+# Each builder turns a whole sheet into (rows, errors, missing): rows is a
+# list of parameter tuples in the order of the matching INSERT, errors are
+# messages for rows that couldn't be transformed, and missing counts the
+# unresolved name lookups.
+
+def build_patient_rows(df):
+    """Transform the Patients sheet into patients parameter tuples"""
+    dob = parse_date_column(sheet_column(df, 'dob'))
+
+    # Validate DOB (shouldn't be in the future or too recent)
+    today = datetime.now().date()
+    dob = dob.where(dob.isna() | (dob.where(dob.notna(), today) <= today))
+
+    keep = pd.Series(True, index=df.index)
+    rows = to_param_rows([
+        source_id_column(sheet_column(df, 'id')),
+        clean_string_column(sheet_column(df, 'first_name'), 100),
+        clean_string_column(sheet_column(df, 'last_name'), 100),
+        clean_string_column(sheet_column(df, 'middle_name'), 100),  # Using middle_name as father_name
+        clean_string_column(sheet_column(df, 'maiden_name'), 100),  # Using maiden_name as mother_name
+        normalize_gender_column(sheet_column(df, 'gender')),
+        clean_string_column(sheet_column(df, 'email'), 100),
+        clean_phone_column(sheet_column(df, 'phone_number')),
+        clean_phone_column(sheet_column(df, 'alt_number')),
+        dob,
+        clean_string_column(sheet_column(df, 'address')),
+        parse_date_column(sheet_column(df, 'created_at')),
+        datetime.now()
+    ], keep)
+    return rows, [], {}
+
+
+def build_appointment_rows(df, patient_map, doctor_map, patient_matcher=None):
+    """Transform the Appointments sheet into appointments parameter tuples"""
+    patient_ids = lookup_id_column(sheet_column(df, 'patient'), patient_map)
+    patient_ids = resolve_fuzzy(sheet_column(df, 'patient'), patient_ids, patient_matcher, 'appointment')
+    doctor_ids = lookup_id_column(sheet_column(df, 'doctor'), doctor_map)
+    missing = {
+        'patients': count_missing(sheet_column(df, 'patient'), patient_ids, 'Patient', named_only=False),
+        'doctors': count_missing(sheet_column(df, 'doctor'), doctor_ids, 'Doctor'),
+    }
+
+    # Parse dates and times
+    start_dt = pd.to_datetime(sheet_column(df, 'start_date'), errors='coerce', format='mixed')
+    end_dt = pd.to_datetime(sheet_column(df, 'end_date'), errors='coerce', format='mixed')
+
+    duration = (end_dt - start_dt).dt.total_seconds() / 60
+    duration_minutes = duration.fillna(0).astype('int64').astype(object).where(duration > 0)
+
+    keep, errors = reject_invalid(df, 'Appointment', [
+        ('start_date', start_dt.isna(), 'invalid start_date'),
+    ])
+
+    rows = to_param_rows([
+        source_id_column(sheet_column(df, 'id')),
+        patient_ids,
+        doctor_ids,
+        start_dt.dt.date,
+        start_dt.dt.time,
+        duration_minutes,
+        clean_string_column(sheet_column(df, 'room'), 50),
+        clean_string_column(sheet_column(df, 'status'), 50).fillna('scheduled'),
+        clean_string_column(sheet_column(df, 'created_by')),  # Store creator in notes
+        parse_date_column(sheet_column(df, 'created_at')),
+        datetime.now()
+    ], keep)
+    return rows, errors, missing
+
+
+def build_invoice_rows(df, patient_map, doctor_map, patient_matcher=None):
+    """Transform the (expense-filtered) Invoices sheet into invoices parameter tuples"""
+    patient_ids = lookup_id_column(sheet_column(df, 'patient'), patient_map)
+    patient_ids = resolve_fuzzy(sheet_column(df, 'patient'), patient_ids, patient_matcher, 'invoice')
+    doctor_ids = lookup_id_column(sheet_column(df, 'doctor'), doctor_map)
+    missing = {'patients': count_missing(sheet_column(df, 'patient'), patient_ids, 'Patient')}
+
+    # Parse amounts
+    total_amount, bad_total = numeric_column(sheet_column(df, 'total_amount'))
+    amount_paid, bad_paid = numeric_column(sheet_column(df, 'total_payments'))
+    discount_value, bad_discount = numeric_column(sheet_column(df, 'discount_value'))
+
+    keep, errors = reject_invalid(df, 'Invoice', [
+        ('total_amount', bad_total, 'invalid total_amount'),
+        ('total_payments', bad_paid, 'invalid total_payments'),
+        ('discount_value', bad_discount, 'invalid discount_value'),
+    ])
+    balance_due = total_amount.where(keep, 0.0) - amount_paid.where(keep, 0.0)
+
+    # Map status: "payed" -> "paid"
+    status = clean_string_column(sheet_column(df, 'status'), 50)
+    status = status.mask(status.str.lower().eq('payed'), 'paid')
+
+    rows = to_param_rows([
+        source_id_column(sheet_column(df, 'id')),
+        patient_ids,
+        doctor_ids,
+        parse_date_column(sheet_column(df, 'invoice_date')),
+        parse_date_column(sheet_column(df, 'due_date')),
+        status,
+        clean_string_column(sheet_column(df, 'currency'), 10).fillna('USD'),
+        clean_string_column(sheet_column(df, 'discount_type'), 20),
+        discount_value,
+        total_amount,
+        amount_paid,
+        balance_due,
+        clean_string_column(sheet_column(df, 'notes')),
+        parse_date_column(sheet_column(df, 'created_at')),
+        datetime.now()
+    ], keep)
+    return rows, errors, missing
+
+
+def build_invoice_item_rows(df):
+    """Transform the invoice_items sheet into invoice_items parameter tuples"""
+    unit_price, bad_price = numeric_column(sheet_column(df, 'unit_price'))
+    quantity, bad_quantity = numeric_column(sheet_column(df, 'quantity'), default=1, as_int=True)
+    total_amount, bad_total = numeric_column(sheet_column(df, 'total_amount'))
+
+    keep, errors = reject_invalid(df, 'Item', [
+        ('unit_price', bad_price, 'invalid unit_price'),
+        ('quantity', bad_quantity, 'invalid quantity'),
+        ('total_amount', bad_total, 'invalid total_amount'),
+    ])
+
+    now = datetime.now()
+    rows = to_param_rows([
+        source_id_column(sheet_column(df, 'id')),
+        source_id_column(sheet_column(df, 'invoice_id')),  # invoice_source_id
+        clean_string_column(sheet_column(df, 'description')),
+        unit_price,
+        quantity,
+        total_amount,
+        now,
+        now
+    ], keep)
+    return rows, errors, {}
+
+
+def build_payment_rows(df, patient_map, patient_matcher=None):
+    """Transform the Payments sheet into payments parameter tuples"""
+    amount, bad_amount = numeric_column(sheet_column(df, 'amount'))
+    original_amount, bad_original = numeric_column(sheet_column(df, 'original_amount'), default=None)
+    original_amount = original_amount.fillna(amount)
+
+    patient_ids = lookup_id_column(sheet_column(df, 'patient'), patient_map)
+    patient_ids = resolve_fuzzy(sheet_column(df, 'patient'), patient_ids, patient_matcher, 'payment')
+
+    keep, errors = reject_invalid(df, 'Payment', [
+        ('amount', bad_amount, 'invalid amount'),
+        ('original_amount', bad_original, 'invalid original_amount'),
+    ])
+
+    rows = to_param_rows([
+        source_id_column(sheet_column(df, 'id')),
+        source_id_column(sheet_column(df, 'invoice_id')),  # invoice_source_id
+        patient_ids,
+        clean_string_column(sheet_column(df, 'method'), 50),
+        amount,
+        original_amount,
+        clean_string_column(sheet_column(df, 'currency'), 10).fillna('USD'),
+        clean_string_column(sheet_column(df, 'reference_number'), 100),
+        parse_date_column(sheet_column(df, 'payment_date')),
+        parse_date_column(sheet_column(df, 'created_at')),
+        datetime.now(),
+        parse_date_column(sheet_column(df, 'deleted_at'))
+    ], keep)
+    return rows, errors, {}
+
+
+def build_treatment_rows(df, patient_map, doctor_map, patient_matcher=None):
+    """Transform the Operations sheet into treatments parameter tuples"""
+    patient_ids = lookup_id_column(sheet_column(df, 'patient'), patient_map)
+    patient_ids = resolve_fuzzy(sheet_column(df, 'patient'), patient_ids, patient_matcher, 'treatment')
+    # Doctor comes from the created_by field
+    doctor_ids = lookup_id_column(sheet_column(df, 'created_by'), doctor_map)
+    missing = {
+        'patients': int(patient_ids.isna().sum()),
+        'doctors': int(doctor_ids.isna().sum()),
+    }
+
+    price, bad_price = numeric_column(sheet_column(df, 'price'))
+    start_dates = parse_date_column(sheet_column(df, 'start_date'))
+    keep, errors = reject_invalid(df, 'Treatment', [
+        ('price', bad_price, 'invalid price'),
+        # start_date is part of the primary key once treatments are partitioned
+        ('start_date', start_dates.isna() & Config.PARTITION_BY_YEAR, 'missing start_date (partitioned table)'),
+    ])
+
+    now = datetime.now()
+    rows = to_param_rows([
+        source_id_column(sheet_column(df, 'id')),
+        patient_ids,
+        doctor_ids,
+        clean_string_column(sheet_column(df, 'tooth_nb'), 20),
+        clean_string_column(sheet_column(df, 'code'), 50),
+        clean_string_column(sheet_column(df, 'name'), 200),
+        clean_string_column(sheet_column(df, 'group'), 100),
+        clean_string_column(sheet_column(df, 'treatment_plan'), 100),
+        clean_string_column(sheet_column(df, 'status'), 50),
+        price,
+        parse_date_column(sheet_column(df, 'planned_date')),
+        start_dates,
+        parse_date_column(sheet_column(df, 'done_date')),
+        clean_string_column(sheet_column(df, 'note')),
+        now,
+        now
+    ], keep)
+    return rows, errors, missing
+
+
+def build_inventory_rows(df):
+    """Transform the stock sheet into inventory parameter tuples"""
+    avg_price, bad_avg = numeric_column(sheet_column(df, 'average_purchase_price'))
+    selling_price, bad_selling = numeric_column(sheet_column(df, 'default_selling_price'), default=None)
+    quantity, bad_quantity = numeric_column(sheet_column(df, 'remaining_quantity'))
+    size, bad_size = numeric_column(sheet_column(df, 'size'), default=None)
+    unit_size, bad_unit_size = numeric_column(sheet_column(df, 'remaining_unit_size'), default=None)
+    warning, bad_warning = numeric_column(sheet_column(df, 'minimum_quantity_warning'), default=None, as_int=True)
+    critical, bad_critical = numeric_column(sheet_column(df, 'minimum_quantity_critical_warning'), default=None, as_int=True)
+
+    keep, errors = reject_invalid(df, 'Inventory', [
+        ('average_purchase_price', bad_avg, 'invalid average_purchase_price'),
+        ('default_selling_price', bad_selling, 'invalid default_selling_price'),
+        ('remaining_quantity', bad_quantity, 'invalid remaining_quantity'),
+        ('size', bad_size, 'invalid size'),
+        ('remaining_unit_size', bad_unit_size, 'invalid remaining_unit_size'),
+        ('minimum_quantity_warning', bad_warning, 'invalid minimum_quantity_warning'),
+        ('minimum_quantity_critical_warning', bad_critical, 'invalid minimum_quantity_critical_warning'),
+    ])
+
+    rows = to_param_rows([
+        source_id_column(sheet_column(df, 'id')),
+        clean_string_column(sheet_column(df, 'category'), 100),
+        clean_string_column(sheet_column(df, 'name'), 200),
+        clean_string_column(sheet_column(df, 'sku'), 100),
+        clean_string_column(sheet_column(df, 'description')),
+        clean_string_column(sheet_column(df, 'unit_of_measure'), 50),
+        size,
+        quantity,
+        unit_size,
+        avg_price,
+        selling_price,
+        warning,
+        critical,
+        clean_string_column(sheet_column(df, 'default_currency'), 10).fillna('USD'),
+        parse_date_column(sheet_column(df, 'created_at')),
+        datetime.now(),
+        parse_date_column(sheet_column(df, 'deleted_at'))
+    ], keep)
+    return rows, errors, {}
+
+
+def upsert_rows(mysql_conn, insert_query, rows, label, errors):
+    """Write prepared parameter tuples, committing every BATCH_SIZE rows. Returns (inserted, updated)"""
+    cursor = mysql_conn.cursor()
+    inserted, updated = 0, 0
+    total_rows = len(rows)
+
+    for position, data in enumerate(rows, 1):
+        try:
+            cursor.execute(insert_query, data)
+
+            if cursor.rowcount == 1:
+                inserted += 1
+            elif cursor.rowcount == 2:
+                updated += 1
+
+        except Exception as e:
+            error_msg = f"{label} ID {data[0]}: {str(e)}"
+            errors.append(error_msg)
+            if Config.DEBUG_MODE and len(errors) <= 5:
+                print(f"  ❌ {error_msg}")
+
+        if position % Config.BATCH_SIZE == 0:
+            mysql_conn.commit()
+            progress = position * 100 // total_rows
+            print(f"  Progress: {position}/{total_rows} ({progress}%)")
+
+    mysql_conn.commit()
+    cursor.close()
+    return inserted, updated
+
+
+# ================================================================
+# BULK LOAD
+# ================================================================
+# On a fresh migration every target table is empty, so ON DUPLICATE KEY
+# UPDATE has nothing to update. Those tables are loaded in one
+# LOAD DATA LOCAL INFILE from a temporary TSV file instead, with their
+# secondary indexes dropped during the load and rebuilt in one pass after.
+
+def write_rows(mysql_conn, insert_query, rows, label, errors):
+    """Bulk-load rows into an empty table, otherwise upsert them. Returns (inserted, updated)"""
+    table, columns = parse_insert_target(insert_query)
+
+    if Config.BULK_LOAD and rows and table_is_empty(mysql_conn, table):
+        # Repeated source ids need upsert semantics (later rows update earlier ones)
+        if len({data[0] for data in rows}) == len(rows):
+            try:
+                inserted = bulk_load_rows(mysql_conn, table, columns, rows, label, errors)
+                if inserted < len(rows):
+                    # LOAD DATA LOCAL implies IGNORE: rejected rows only leave a warning
+                    loaded_ids = table_source_ids(mysql_conn, table)
+                    rejected = [data for data in rows if str(data[0]) not in loaded_ids]
+                    for data in rejected:
+                        errors.append(f"{label} ID {data[0]}: rejected by the bulk load")
+                    print(f"  ⚠️ {len(rejected)} {table} rows were rejected by the bulk load")
+                return inserted, 0
+            except Error as e:
+                mysql_conn.rollback()
+                print(f"  ⚠️ Bulk load into {table} failed ({e}), falling back to row upserts")
+        else:
+            print(f"  ⚠️ Duplicate source ids in {table} data, using row upserts")
+
+    return upsert_rows(mysql_conn, insert_query, rows, label, errors)
+
+
+def parse_insert_target(insert_query):
+    """Table name and column list of an INSERT INTO table (columns) VALUES ... query"""
+    match = re.search(r'INSERT\s+INTO\s+(\w+)\s*\(([^)]*)\)', insert_query, re.IGNORECASE)
+    return match.group(1), [column.strip() for column in match.group(2).split(',')]
+
+
+def table_source_ids(mysql_conn, table):
+    """Every source_id in a table, as strings"""
+    cursor = mysql_conn.cursor()
+    cursor.execute(f"SELECT source_id FROM {table}")
+    source_ids = {str(source_id) for (source_id,) in cursor.fetchall()}
+    cursor.close()
+    return source_ids
+
+
+def table_is_empty(mysql_conn, table):
+    """True if the table has no rows"""
+    cursor = mysql_conn.cursor()
+    cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+    empty = cursor.fetchone() is None
+    cursor.close()
+    return empty
+
+
+def tsv_value(value):
+    """Format a parameter for a LOAD DATA tab-separated file"""
+    if value is None:
+        return r'\N'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+    if isinstance(value, (date, time_type)):
+        return value.isoformat()
+    if isinstance(value, float):
+        return repr(value)
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def secondary_indexes(mysql_conn, table):
+    """Non-unique B-tree indexes of a table that no foreign key relies on, as {name: [column sql]}"""
+    cursor = mysql_conn.cursor()
+    cursor.execute("""
+        SELECT INDEX_NAME, COLUMN_NAME, SUB_PART
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+          AND NON_UNIQUE = 1 AND INDEX_TYPE = 'BTREE'
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+    """, (table,))
+    indexes = {}
+    for name, column, sub_part in cursor.fetchall():
+        indexes.setdefault(name, []).append(f"`{column}`({sub_part})" if sub_part else f"`{column}`")
+
+    # MySQL refuses to drop the index a foreign key uses
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+          AND REFERENCED_TABLE_NAME IS NOT NULL
+    """, (table,))
+    fk_columns = {f"`{column}`" for (column,) in cursor.fetchall()}
+    cursor.close()
+
+    return {name: columns for name, columns in indexes.items() if columns[0] not in fk_columns}
+
+
+def bulk_load_rows(mysql_conn, table, columns, rows, label, errors):
+    """LOAD DATA LOCAL INFILE rows into an empty table; returns the number of rows loaded"""
+    started = perf_counter()
+    cursor = mysql_conn.cursor()
+    indexes = secondary_indexes(mysql_conn, table)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".tsv", delete=False, encoding="utf-8", newline="") as f:
+        tsv_path = f.name
+        for data in rows:
+            f.write('\t'.join(tsv_value(value) for value in data) + '\n')
+
+    try:
+        if indexes:
+            cursor.execute(f"ALTER TABLE {table} " + ", ".join(f"DROP INDEX `{name}`" for name in indexes))
+
+        try:
+            cursor.execute(f"""
+                LOAD DATA LOCAL INFILE %s INTO TABLE {table}
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+                LINES TERMINATED BY '\\n'
+                ({', '.join(columns)})
+            """, (tsv_path.replace('\\', '/'),))
+            loaded = cursor.rowcount
+
+            # Conversion problems only show up as warnings, so keep all of them
+            cursor.execute("SHOW COUNT(*) WARNINGS")
+            warning_count = cursor.fetchone()[0]
+            cursor.execute("SHOW WARNINGS")
+            warnings = cursor.fetchall()
+            for level, code, message in warnings:
+                errors.append(f"{label} bulk load {level} {code}: {message}")
+            if warning_count > len(warnings):
+                errors.append(f"{label} bulk load: {warning_count - len(warnings)} more warnings "
+                              f"not kept by the server (raise max_error_count to see them)")
+            mysql_conn.commit()
+        finally:
+            # Rebuild every dropped index in a single pass, even if the load failed
+            if indexes:
+                cursor.execute(f"ALTER TABLE {table} " + ", ".join(
+                    f"ADD INDEX `{name}` ({', '.join(index_columns)})" for name, index_columns in indexes.items()
+                ))
+    finally:
+        cursor.close()
+        os.remove(tsv_path)
+
+    print(f"  ⚡ Bulk-loaded {loaded}/{len(rows)} rows into {table} in {perf_counter() - started:.1f}s"
+          f"{f' (rebuilt {len(indexes)} indexes)' if indexes else ''}")
+    return loaded
+
+
+def report_transform_errors(errors):
+    """Print the first few transform errors in debug mode"""
+    if Config.DEBUG_MODE:
+        for error_msg in errors[:5]:
+            print(f"  ❌ {error_msg}")
+
+
 # ================================================================
 # MIGRATION FUNCTIONS
 # ================================================================
 
-def migrate_patients(mysql_conn, excel_file):
+def migrate_patients(mysql_conn, workbook, lookup_index):
     """Migrate patients from Excel to MySQL"""
     print("\n" + "=" * 60)
     print("PATIENT MIGRATION STARTED")
@@ -290,7 +1286,7 @@ def migrate_patients(mysql_conn, excel_file):
 
     try:
         # Read Excel sheet
-        df = pd.read_excel(excel_file, sheet_name='Patients')
+        df = workbook.sheet('Patients')
 
         if Config.TEST_MODE:
             df = df.head(20)
@@ -298,8 +1294,6 @@ def migrate_patients(mysql_conn, excel_file):
         total_records = len(df)
         print(f"📊 Found {total_records} patients in Excel")
 
-        cursor = mysql_conn.cursor()
-
         insert_query = """
         INSERT INTO patients (
             source_id, first_name, last_name, father_name, mother_name,
@@ -322,53 +1316,11 @@ def migrate_patients(mysql_conn, excel_file):
             updated_at = VALUES(updated_at)
         """
 
-        inserted, updated, errors = 0, 0, []
-
-        for idx, row in df.iterrows():
-            try:
-                # Parse dates
-                created_at = parse_date(row.get('created_at'))
-                dob = parse_date(row.get('dob'))
+        # Transform the whole sheet column-wise, then write the prepared rows
+        rows, errors, _ = build_patient_rows(df)
+        report_transform_errors(errors)
 
-                # Validate DOB (shouldn't be in the future or too recent)
-                if dob and dob > datetime.now().date():
-                    dob = None
-
-                data = (
-                    clean_string(str(row.get('id')), 50),  # source_id
-                    clean_string(row.get('first_name'), 100),
-                    clean_string(row.get('last_name'), 100),
-                    clean_string(row.get('middle_name'), 100),  # Using middle_name as father_name
-                    clean_string(row.get('maiden_name'), 100),  # Using maiden_name as mother_name
-                    normalize_gender(row.get('gender')),
-                    clean_string(row.get('email'), 100),
-                    clean_phone(row.get('phone_number')),
-                    clean_phone(row.get('alt_number')),
-                    dob,
-                    clean_string(row.get('address')),
-                    created_at,
-                    datetime.now()
-                )
-
-                cursor.execute(insert_query, data)
-
-                if cursor.rowcount == 1:
-                    inserted += 1
-                elif cursor.rowcount == 2:
-                    updated += 1
-
-                if (idx + 1) % Config.BATCH_SIZE == 0:
-                    mysql_conn.commit()
-                    progress = (idx + 1) * 100 // total_records
-                    print(f"  Progress: {idx + 1}/{total_records} ({progress}%)")
-
-            except Exception as e:
-                error_msg = f"Patient ID {row.get('id')}: {str(e)}"
-                errors.append(error_msg)
-                if Config.DEBUG_MODE and len(errors) <= 5:
-                    print(f"  ❌ {error_msg}")
-
-        mysql_conn.commit()
+        inserted, updated = write_rows(mysql_conn, insert_query, rows, 'Patient', errors)
 
         print("\n" + "-" * 60)
         print(f"✅ PATIENT MIGRATION COMPLETED")
@@ -385,15 +1337,14 @@ def migrate_patients(mysql_conn, excel_file):
                     f.write(f"{error}\n")
             print(f"   Error log: {log_path}")
 
-        cursor.close()
-
     except Exception as e:
         print(f"❌ Critical error in patient migration: {e}")
         traceback.print_exc()
         mysql_conn.rollback()
+        raise
 
 
-def migrate_doctors(mysql_conn, excel_file):
+def migrate_doctors(mysql_conn, workbook, lookup_index):
     """Extract and migrate doctors from Appointments and Invoices sheets"""
     print("\n" + "=" * 60)
     print("DOCTOR MIGRATION STARTED")
@@ -401,8 +1352,8 @@ def migrate_doctors(mysql_conn, excel_file):
 
     try:
         # Extract unique doctors from multiple sheets
-        df_appointments = pd.read_excel(excel_file, sheet_name='Appointments')
-        df_invoices = pd.read_excel(excel_file, sheet_name='Invoices')
+        df_appointments = workbook.sheet('Appointments')
+        df_invoices = workbook.sheet('Invoices')
 
         # Get unique doctor names
         doctors_from_appts = df_appointments['doctor'].dropna().unique()
@@ -475,21 +1426,23 @@ def migrate_doctors(mysql_conn, excel_file):
         print(f"❌ Critical error in doctor migration: {e}")
         traceback.print_exc()
         mysql_conn.rollback()
+        raise
 
 
-def migrate_appointments(mysql_conn, excel_file):
+def migrate_appointments(mysql_conn, workbook, lookup_index):
     """Migrate appointments from Excel to MySQL"""
     print("\n" + "=" * 60)
     print("APPOINTMENT MIGRATION STARTED")
     print("=" * 60)
 
     try:
-        # Create lookup maps
-        patient_map = create_patient_lookup_map(mysql_conn)
-        doctor_map = create_doctor_lookup_map(mysql_conn)
+        # Shared lookup maps, built once for all stages
+        patient_map = lookup_index.get('patients', mysql_conn)
+        doctor_map = lookup_index.get('doctors', mysql_conn)
+        patient_matcher = lookup_index.matcher('patients', mysql_conn)
 
         # Read Excel sheet
-        df = pd.read_excel(excel_file, sheet_name='Appointments')
+        df = workbook.sheet('Appointments')
 
         if Config.TEST_MODE:
             df = df.head(20)
@@ -497,8 +1450,6 @@ def migrate_appointments(mysql_conn, excel_file):
         total_records = len(df)
         print(f"📊 Found {total_records} appointments in Excel")
 
-        cursor = mysql_conn.cursor()
-
         insert_query = """
         INSERT INTO appointments (
             source_id, patient_id, doctor_id, appointment_date, appointment_time,
@@ -518,79 +1469,19 @@ def migrate_appointments(mysql_conn, excel_file):
             updated_at = VALUES(updated_at)
         """
 
-        inserted, updated, errors = 0, 0, []
-        missing_patients, missing_doctors = 0, 0
-
-        for idx, row in df.iterrows():
-            try:
-                # Lookup patient and doctor IDs
-                patient_id = lookup_patient_id(row.get('patient'), patient_map)
-                doctor_id = lookup_doctor_id(row.get('doctor'), doctor_map)
+        # Transform the whole sheet column-wise, then write the prepared rows
+        rows, errors, missing = build_appointment_rows(df, patient_map, doctor_map, patient_matcher)
+        report_transform_errors(errors)
 
-                if not patient_id:
-                    missing_patients += 1
-                    if Config.DEBUG_MODE and missing_patients <= 3:
-                        print(f"  ⚠️ Patient not found: {row.get('patient')}")
-
-                if not doctor_id and row.get('doctor'):
-                    missing_doctors += 1
-                    if Config.DEBUG_MODE and missing_doctors <= 3:
-                        print(f"  ⚠️ Doctor not found: {row.get('doctor')}")
-
-                # Parse dates and times
-                start_dt = pd.to_datetime(row.get('start_date'))
-                end_dt = pd.to_datetime(row.get('end_date'))
-
-                appointment_date = start_dt.date()
-                appointment_time = start_dt.time()
-                duration_minutes = calculate_duration_minutes(start_dt, end_dt)
-
-                # Map status
-                status = clean_string(row.get('status'), 50)
-                if not status:
-                    status = 'scheduled'
-
-                data = (
-                    clean_string(str(row.get('id')), 50),  # source_id
-                    patient_id,
-                    doctor_id,
-                    appointment_date,
-                    appointment_time,
-                    duration_minutes,
-                    clean_string(row.get('room'), 50),
-                    status,
-                    clean_string(row.get('created_by')),  # Store creator in notes
-                    parse_date(row.get('created_at')),
-                    datetime.now()
-                )
-
-                cursor.execute(insert_query, data)
-
-                if cursor.rowcount == 1:
-                    inserted += 1
-                elif cursor.rowcount == 2:
-                    updated += 1
-
-                if (idx + 1) % Config.BATCH_SIZE == 0:
-                    mysql_conn.commit()
-                    progress = (idx + 1) * 100 // total_records
-                    print(f"  Progress: {idx + 1}/{total_records} ({progress}%)")
-
-            except Exception as e:
-                error_msg = f"Appointment ID {row.get('id')}: {str(e)}"
-                errors.append(error_msg)
-                if Config.DEBUG_MODE and len(errors) <= 5:
-                    print(f"  ❌ {error_msg}")
-
-        mysql_conn.commit()
+        inserted, updated = write_rows(mysql_conn, insert_query, rows, 'Appointment', errors)
 
         print("\n" + "-" * 60)
         print(f"✅ APPOINTMENT MIGRATION COMPLETED")
         print(f"   Inserted: {inserted}")
         print(f"   Updated: {updated}")
         print(f"   Errors: {len(errors)}")
-        print(f"   Missing Patients: {missing_patients}")
-        print(f"   Missing Doctors: {missing_doctors}")
+        print(f"   Missing Patients: {missing['patients']}")
+        print(f"   Missing Doctors: {missing['doctors']}")
         print("-" * 60)
 
         if errors:
@@ -601,27 +1492,27 @@ def migrate_appointments(mysql_conn, excel_file):
                     f.write(f"{error}\n")
             print(f"   Error log: {log_path}")
 
-        cursor.close()
-
     except Exception as e:
         print(f"❌ Critical error in appointment migration: {e}")
         traceback.print_exc()
         mysql_conn.rollback()
+        raise
 
 
-def migrate_invoices(mysql_conn, excel_file):
+def migrate_invoices(mysql_conn, workbook, lookup_index):
     """Migrate invoices from Excel to MySQL"""
     print("\n" + "=" * 60)
     print("INVOICE MIGRATION STARTED")
     print("=" * 60)
 
     try:
-        # Create lookup maps
-        patient_map = create_patient_lookup_map(mysql_conn)
-        doctor_map = create_doctor_lookup_map(mysql_conn)
+        # Shared lookup maps, built once for all stages
+        patient_map = lookup_index.get('patients', mysql_conn)
+        doctor_map = lookup_index.get('doctors', mysql_conn)
+        patient_matcher = lookup_index.matcher('patients', mysql_conn)
 
         # Read Excel sheet
-        df = pd.read_excel(excel_file, sheet_name='Invoices')
+        df = workbook.sheet('Invoices')
 
         # Filter out expenses (is_expense = 1)
         df_invoices = df[df['is_expense'].isna() | (df['is_expense'] != 1.0)]
@@ -632,8 +1523,6 @@ def migrate_invoices(mysql_conn, excel_file):
         total_records = len(df_invoices)
         print(f"📊 Found {total_records} patient invoices in Excel (filtered {len(df) - total_records} expenses)")
 
-        cursor = mysql_conn.cursor()
-
         insert_query = """
         INSERT INTO invoices (
             source_id, patient_id, doctor_id, invoice_date, due_date,
@@ -656,85 +1545,28 @@ def migrate_invoices(mysql_conn, excel_file):
             updated_at = VALUES(updated_at)
         """
 
-        inserted, updated, errors = 0, 0, []
-        missing_patients = 0
-
-        for idx, row in df_invoices.iterrows():
-            try:
-                # Lookup patient and doctor IDs
-                patient_id = lookup_patient_id(row.get('patient'), patient_map)
-                doctor_id = lookup_doctor_id(row.get('doctor'), doctor_map)
-
-                if not patient_id and row.get('patient'):
-                    missing_patients += 1
-
-                # Parse amounts
-                total_amount = float(row.get('total_amount', 0)) if not pd.isna(row.get('total_amount')) else 0.0
-                amount_paid = float(row.get('total_payments', 0)) if not pd.isna(row.get('total_payments')) else 0.0
-                discount_value = float(row.get('discount_value', 0)) if not pd.isna(row.get('discount_value')) else 0.0
-
-                balance_due = total_amount - amount_paid
-
-                # Map status: "payed" -> "paid"
-                status = clean_string(row.get('status'), 50)
-                if status and status.lower() == 'payed':
-                    status = 'paid'
-
-                data = (
-                    clean_string(str(row.get('id')), 50),  # source_id
-                    patient_id,
-                    doctor_id,
-                    parse_date(row.get('invoice_date')),
-                    parse_date(row.get('due_date')),
-                    status,
-                    clean_string(row.get('currency'), 10) or 'USD',
-                    clean_string(row.get('discount_type'), 20),
-                    discount_value,
-                    total_amount,
-                    amount_paid,
-                    balance_due,
-                    clean_string(row.get('notes')),
-                    parse_date(row.get('created_at')),
-                    datetime.now()
-                )
-
-                cursor.execute(insert_query, data)
-
-                if cursor.rowcount == 1:
-                    inserted += 1
-                elif cursor.rowcount == 2:
-                    updated += 1
-
-                if (idx + 1) % Config.BATCH_SIZE == 0:
-                    mysql_conn.commit()
-                    progress = (idx + 1) * 100 // total_records
-                    print(f"  Progress: {idx + 1}/{total_records} ({progress}%)")
+        # Transform the whole sheet column-wise, then write the prepared rows
+        rows, errors, missing = build_invoice_rows(df_invoices, patient_map, doctor_map, patient_matcher)
+        report_transform_errors(errors)
 
-            except Exception as e:
-                error_msg = f"Invoice ID {row.get('id')}: {str(e)}"
-                errors.append(error_msg)
-                if Config.DEBUG_MODE and len(errors) <= 5:
-                    print(f"  ❌ {error_msg}")
-
-        mysql_conn.commit()
+        inserted, updated = write_rows(mysql_conn, insert_query, rows, 'Invoice', errors)
 
         print("\n" + "-" * 60)
         print(f"✅ INVOICE MIGRATION COMPLETED")
         print(f"   Inserted: {inserted}")
         print(f"   Updated: {updated}")
         print(f"   Errors: {len(errors)}")
-        print(f"   Missing Patients: {missing_patients}")
+        print(f"   Missing Patients: {missing['patients']}")
         print("-" * 60)
 
-        cursor.close()
-
     except Exception as e:
         print(f"❌ Critical error in invoice migration: {e}")
         traceback.print_exc()
         mysql_conn.rollback()
+        raise
 
 
-def migrate_invoice_items(mysql_conn, excel_file):
+def migrate_invoice_items(mysql_conn, workbook):
     """Migrate invoice line items from Excel to MySQL"""
     print("\n" + "=" * 60)
     print("INVOICE ITEMS MIGRATION STARTED")
@@ -742,7 +1574,7 @@ def migrate_invoice_items(mysql_conn, excel_file):
 
     try:
         # Read Excel sheet
-        df = pd.read_excel(excel_file, sheet_name='invoice_items')
+        df = workbook.sheet('invoice_items')
 
         if Config.TEST_MODE:
             df = df.head(50)
@@ -750,8 +1582,6 @@ def migrate_invoice_items(mysql_conn, excel_file):
         total_records = len(df)
         print(f"📊 Found {total_records} invoice items in Excel")
 
-        cursor = mysql_conn.cursor()
-
         insert_query = """
         INSERT INTO invoice_items (
             source_id, invoice_source_id, description,
@@ -767,44 +1597,11 @@ def migrate_invoice_items(mysql_conn, excel_file):
             updated_at = VALUES(updated_at)
         """
 
-        inserted, updated, errors = 0, 0, []
+        # Transform the whole sheet column-wise, then write the prepared rows
+        rows, errors, _ = build_invoice_item_rows(df)
+        report_transform_errors(errors)
 
-        for idx, row in df.iterrows():
-            try:
-                unit_price = float(row.get('unit_price', 0)) if not pd.isna(row.get('unit_price')) else 0.0
-                quantity = int(row.get('quantity', 1)) if not pd.isna(row.get('quantity')) else 1
-                total_amount = float(row.get('total_amount', 0)) if not pd.isna(row.get('total_amount')) else 0.0
-
-                data = (
-                    clean_string(str(row.get('id')), 50),  # source_id
-                    clean_string(str(row.get('invoice_id')), 50),  # invoice_source_id
-                    clean_string(row.get('description')),
-                    unit_price,
-                    quantity,
-                    total_amount,
-                    datetime.now(),
-                    datetime.now()
-                )
-
-                cursor.execute(insert_query, data)
-
-                if cursor.rowcount == 1:
-                    inserted += 1
-                elif cursor.rowcount == 2:
-                    updated += 1
-
-                if (idx + 1) % Config.BATCH_SIZE == 0:
-                    mysql_conn.commit()
-                    progress = (idx + 1) * 100 // total_records
-                    print(f"  Progress: {idx + 1}/{total_records} ({progress}%)")
-
-            except Exception as e:
-                error_msg = f"Item ID {row.get('id')}: {str(e)}"
-                errors.append(error_msg)
-                if Config.DEBUG_MODE and len(errors) <= 5:
-                    print(f"  ❌ {error_msg}")
-
-        mysql_conn.commit()
+        inserted, updated = write_rows(mysql_conn, insert_query, rows, 'Item', errors)
 
         print("\n" + "-" * 60)
         print(f"✅ INVOICE ITEMS MIGRATION COMPLETED")
@@ -813,26 +1610,26 @@ def migrate_invoice_items(mysql_conn, excel_file):
         print(f"   Errors: {len(errors)}")
         print("-" * 60)
 
-        cursor.close()
-
     except Exception as e:
         print(f"❌ Critical error in invoice items migration: {e}")
         traceback.print_exc()
         mysql_conn.rollback()
+        raise
 
 
-def migrate_payments(mysql_conn, excel_file):
+def migrate_payments(mysql_conn, workbook, lookup_index):
     """Migrate payments from Excel to MySQL"""
     print("\n" + "=" * 60)
     print("PAYMENTS MIGRATION STARTED")
     print("=" * 60)
 
     try:
-        # Create patient lookup map
-        patient_map = create_patient_lookup_map(mysql_conn)
+        # Shared patient lookup map, built once for all stages
+        patient_map = lookup_index.get('patients', mysql_conn)
+        patient_matcher = lookup_index.matcher('patients', mysql_conn)
 
         # Read Excel sheet
-        df = pd.read_excel(excel_file, sheet_name='Payments')
+        df = workbook.sheet('Payments')
 
         if Config.TEST_MODE:
             df = df.head(50)
@@ -840,8 +1637,6 @@ def migrate_payments(mysql_conn, excel_file):
         total_records = len(df)
         print(f"📊 Found {total_records} payments in Excel")
 
-        cursor = mysql_conn.cursor()
-
         insert_query = """
         INSERT INTO payments (
             source_id, invoice_source_id, patient_id, payment_method,
@@ -857,50 +1652,11 @@ def migrate_payments(mysql_conn, excel_file):
             updated_at = VALUES(updated_at)
         """
 
-        inserted, updated, errors = 0, 0, []
-
-        for idx, row in df.iterrows():
-            try:
-                # Lookup patient ID
-                patient_id = lookup_patient_id(row.get('patient'), patient_map)
-
-                amount = float(row.get('amount', 0)) if not pd.isna(row.get('amount')) else 0.0
-                original_amount = float(row.get('original_amount', 0)) if not pd.isna(row.get('original_amount')) else amount
-
-                data = (
-                    clean_string(str(row.get('id')), 50),  # source_id
-                    clean_string(str(row.get('invoice_id')), 50),  # invoice_source_id
-                    patient_id,
-                    clean_string(row.get('method'), 50),
-                    amount,
-                    original_amount,
-                    clean_string(row.get('currency'), 10) or 'USD',
-                    clean_string(row.get('reference_number'), 100),
-                    parse_date(row.get('payment_date')),
-                    parse_date(row.get('created_at')),
-                    datetime.now(),
-                    parse_date(row.get('deleted_at'))
-                )
-
-                cursor.execute(insert_query, data)
-
-                if cursor.rowcount == 1:
-                    inserted += 1
-                elif cursor.rowcount == 2:
-                    updated += 1
-
-                if (idx + 1) % Config.BATCH_SIZE == 0:
-                    mysql_conn.commit()
-                    progress = (idx + 1) * 100 // total_records
-                    print(f"  Progress: {idx + 1}/{total_records} ({progress}%)")
+        # Transform the whole sheet column-wise, then write the prepared rows
+        rows, errors, _ = build_payment_rows(df, patient_map, patient_matcher)
+        report_transform_errors(errors)
 
-            except Exception as e:
-                error_msg = f"Payment ID {row.get('id')}: {str(e)}"
-                errors.append(error_msg)
-                if Config.DEBUG_MODE and len(errors) <= 5:
-                    print(f"  ❌ {error_msg}")
-
-        mysql_conn.commit()
+        inserted, updated = write_rows(mysql_conn, insert_query, rows, 'Payment', errors)
 
         print("\n" + "-" * 60)
         print(f"✅ PAYMENTS MIGRATION COMPLETED")
@@ -909,27 +1665,27 @@ def migrate_payments(mysql_conn, excel_file):
         print(f"   Errors: {len(errors)}")
         print("-" * 60)
 
-        cursor.close()
-
     except Exception as e:
         print(f"❌ Critical error in payments migration: {e}")
         traceback.print_exc()
         mysql_conn.rollback()
+        raise
 
 
-def migrate_treatments(mysql_conn, excel_file):
+def migrate_treatments(mysql_conn, workbook, lookup_index):
     """Migrate treatments/operations from Excel to MySQL"""
     print("\n" + "=" * 60)
     print("TREATMENTS MIGRATION STARTED")
     print("=" * 60)
 
     try:
-        # Create lookup maps
-        patient_map = create_patient_lookup_map(mysql_conn)
-        doctor_map = create_doctor_lookup_map(mysql_conn)
+        # Shared lookup maps, built once for all stages
+        patient_map = lookup_index.get('patients', mysql_conn)
+        doctor_map = lookup_index.get('doctors', mysql_conn)
+        patient_matcher = lookup_index.matcher('patients', mysql_conn)
 
         # Read Excel sheet
-        df = pd.read_excel(excel_file, sheet_name='Operations')
+        df = workbook.sheet('Operations')
 
         if Config.TEST_MODE:
             df = df.head(50)
@@ -937,8 +1693,6 @@ def migrate_treatments(mysql_conn, excel_file):
         total_records = len(df)
         print(f"📊 Found {total_records} treatments in Excel")
 
-        cursor = mysql_conn.cursor()
-
         insert_query = """
         INSERT INTO treatments (
             source_id, patient_id, doctor_id, tooth_number, procedure_code,
@@ -956,83 +1710,29 @@ def migrate_treatments(mysql_conn, excel_file):
             updated_at = VALUES(updated_at)
         """
 
-        inserted, updated, errors = 0, 0, []
-        missing_patients = 0
-        missing_doctors = 0
-
-        for idx, row in df.iterrows():
-            try:
-                # Lookup patient ID
-                patient_id = lookup_patient_id(row.get('patient'), patient_map)
-
-                if not patient_id:
-                    missing_patients += 1
-
-                # Lookup doctor ID from created_by field with lowercase comparison
-                doctor_id = lookup_doctor_id(row.get('created_by'), doctor_map)
-
-                if not doctor_id:
-                    missing_doctors += 1
-
-                price = float(row.get('price', 0)) if not pd.isna(row.get('price')) else 0.0
+        # Transform the whole sheet column-wise, then write the prepared rows
+        rows, errors, missing = build_treatment_rows(df, patient_map, doctor_map, patient_matcher)
+        report_transform_errors(errors)
 
-                data = (
-                    clean_string(str(row.get('id')), 50),  # source_id
-                    patient_id,
-                    doctor_id,  # doctor_id from created_by field
-                    clean_string(row.get('tooth_nb'), 20),
-                    clean_string(row.get('code'), 50),
-                    clean_string(row.get('name'), 200),
-                    clean_string(row.get('group'), 100),
-                    clean_string(row.get('treatment_plan'), 100),
-                    clean_string(row.get('status'), 50),
-                    price,
-                    parse_date(row.get('planned_date')),
-                    parse_date(row.get('start_date')),
-                    parse_date(row.get('done_date')),
-                    clean_string(row.get('note')),
-                    datetime.now(),
-                    datetime.now()
-                )
-
-                cursor.execute(insert_query, data)
-
-                if cursor.rowcount == 1:
-                    inserted += 1
-                elif cursor.rowcount == 2:
-                    updated += 1
-
-                if (idx + 1) % Config.BATCH_SIZE == 0:
-                    mysql_conn.commit()
-                    progress = (idx + 1) * 100 // total_records
-                    print(f"  Progress: {idx + 1}/{total_records} ({progress}%)")
-
-            except Exception as e:
-                error_msg = f"Treatment ID {row.get('id')}: {str(e)}"
-                errors.append(error_msg)
-                if Config.DEBUG_MODE and len(errors) <= 5:
-                    print(f"  ❌ {error_msg}")
-
-        mysql_conn.commit()
+        inserted, updated = write_rows(mysql_conn, insert_query, rows, 'Treatment', errors)
 
         print("\n" + "-" * 60)
         print(f"✅ TREATMENTS MIGRATION COMPLETED")
         print(f"   Inserted: {inserted}")
         print(f"   Updated: {updated}")
         print(f"   Errors: {len(errors)}")
-        print(f"   Missing Patients: {missing_patients}")
-        print(f"   Missing Doctors: {missing_doctors}")
+        print(f"   Missing Patients: {missing['patients']}")
+        print(f"   Missing Doctors: {missing['doctors']}")
         print("-" * 60)
 
-        cursor.close()
-
     except Exception as e:
         print(f"❌ Critical error in treatments migration: {e}")
         traceback.print_exc()
         mysql_conn.rollback()
+        raise
 
 
-def migrate_inventory(mysql_conn, excel_file):
+def migrate_inventory(mysql_conn, workbook):
     """Migrate inventory/stock from Excel to MySQL"""
     print("\n" + "=" * 60)
     print("INVENTORY MIGRATION STARTED")
@@ -1040,13 +1740,11 @@ def migrate_inventory(mysql_conn, excel_file):
 
     try:
         # Read Excel sheet
-        df = pd.read_excel(excel_file, sheet_name='stock')
+        df = workbook.sheet('stock')
 
         total_records = len(df)
         print(f"📊 Found {total_records} inventory items in Excel")
 
-        cursor = mysql_conn.cursor()
-
         insert_query = """
         INSERT INTO inventory (
             source_id, category, name, sku, description,
@@ -1064,50 +1762,11 @@ def migrate_inventory(mysql_conn, excel_file):
             updated_at = VALUES(updated_at)
         """
 
-        inserted, updated, errors = 0, 0, []
+        # Transform the whole sheet column-wise, then write the prepared rows
+        rows, errors, _ = build_inventory_rows(df)
+        report_transform_errors(errors)
 
-        for idx, row in df.iterrows():
-            try:
-                avg_price = float(row.get('average_purchase_price', 0)) if not pd.isna(row.get('average_purchase_price')) else 0.0
-                selling_price = float(row.get('default_selling_price', 0)) if not pd.isna(row.get('default_selling_price')) else None
-                quantity = float(row.get('remaining_quantity', 0)) if not pd.isna(row.get('remaining_quantity')) else 0.0
-                size = float(row.get('size', 0)) if not pd.isna(row.get('size')) else None
-                unit_size = float(row.get('remaining_unit_size', 0)) if not pd.isna(row.get('remaining_unit_size')) else None
-
-                data = (
-                    clean_string(str(row.get('id')), 50),  # source_id
-                    clean_string(row.get('category'), 100),
-                    clean_string(row.get('name'), 200),
-                    clean_string(row.get('sku'), 100),
-                    clean_string(row.get('description')),
-                    clean_string(row.get('unit_of_measure'), 50),
-                    size,
-                    quantity,
-                    unit_size,
-                    avg_price,
-                    selling_price,
-                    int(row.get('minimum_quantity_warning', 0)) if not pd.isna(row.get('minimum_quantity_warning')) else None,
-                    int(row.get('minimum_quantity_critical_warning', 0)) if not pd.isna(row.get('minimum_quantity_critical_warning')) else None,
-                    clean_string(row.get('default_currency'), 10) or 'USD',
-                    parse_date(row.get('created_at')),
-                    datetime.now(),
-                    parse_date(row.get('deleted_at'))
-                )
-
-                cursor.execute(insert_query, data)
-
-                if cursor.rowcount == 1:
-                    inserted += 1
-                elif cursor.rowcount == 2:
-                    updated += 1
-
-            except Exception as e:
-                error_msg = f"Inventory ID {row.get('id')}: {str(e)}"
-                errors.append(error_msg)
-                if Config.DEBUG_MODE:
-                    print(f"  ❌ {error_msg}")
-
-        mysql_conn.commit()
+        inserted, updated = write_rows(mysql_conn, insert_query, rows, 'Inventory', errors)
 
         print("\n" + "-" * 60)
         print(f"✅ INVENTORY MIGRATION COMPLETED")
@@ -1116,12 +1775,172 @@ def migrate_inventory(mysql_conn, excel_file):
         print(f"   Errors: {len(errors)}")
         print("-" * 60)
 
-        cursor.close()
-
     except Exception as e:
         print(f"❌ Critical error in inventory migration: {e}")
         traceback.print_exc()
         mysql_conn.rollback()
+        raise
+
+
+# ================================================================
+# REFERENCE RESOLUTION
+# ================================================================
+# (table, integer key, source-id column, parent table) for keys written as source ids only
+SOURCE_REFERENCES = [
+    ('invoice_items', 'invoice_id', 'invoice_source_id', 'invoices'),
+    ('payments', 'invoice_id', 'invoice_source_id', 'invoices'),
+]
+
+
+def ensure_column_index(cursor, table, column, index_name):
+    """Add an index led by `column` unless one already exists, without locking the table"""
+    cursor.execute("""
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s AND SEQ_IN_INDEX = 1
+        LIMIT 1
+    """, (table, column))
+    if cursor.fetchone() is None:
+        print(f"   ↳ Adding index {index_name} on {table}.{column}")
+        cursor.execute(f"ALTER TABLE {table} ADD INDEX {index_name} ({column}), ALGORITHM=INPLACE, LOCK=NONE")
+
+
+def resolve_references(mysql_conn):
+    """
+    Fill integer keys from their source-id columns once everything is loaded.
+
+    Each reference is resolved set-based, one UPDATE ... JOIN per primary-key range
+    of REFERENCE_CHUNK_SIZE rows (short transactions, no long table locks). Rows
+    whose source id has no parent are reported as orphans in logs/<table>_orphans.log.
+    """
+    print("\n" + "=" * 60)
+    print("REFERENCE RESOLUTION STARTED")
+    print("=" * 60)
+
+    cursor = mysql_conn.cursor()
+    try:
+        for table, key, source_column, parent in SOURCE_REFERENCES:
+            ensure_column_index(cursor, parent, 'source_id', 'idx_source_id')
+            ensure_column_index(cursor, table, key, f'idx_{key}')
+
+            cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table}")
+            low, high = cursor.fetchone()
+            resolved = 0
+            if low is not None:
+                for start in range(low, high + 1, Config.REFERENCE_CHUNK_SIZE):
+                    cursor.execute(f"""
+                        UPDATE {table} c JOIN {parent} p ON p.source_id = c.{source_column}
+                        SET c.{key} = p.id
+                        WHERE c.id BETWEEN %s AND %s AND NOT (c.{key} <=> p.id)
+                    """, (start, start + Config.REFERENCE_CHUNK_SIZE - 1))
+                    resolved += cursor.rowcount
+                    mysql_conn.commit()
+
+            cursor.execute(f"""
+                SELECT {source_column}, COUNT(*) FROM {table}
+                WHERE {key} IS NULL AND {source_column} IS NOT NULL AND {source_column} <> ''
+                GROUP BY {source_column}
+            """)
+            orphans = cursor.fetchall()
+            orphan_rows = sum(count for _, count in orphans)
+            print(f"✅ {table}.{key}: {resolved} resolved from {source_column}, "
+                  f"{orphan_rows} orphans ({len(orphans)} unknown {parent})")
+
+            if orphans:
+                log_path = os.path.join(ensure_logs_folder(), f"{table}_orphans.log")
+                with open(log_path, "w", encoding="utf-8") as f:
+                    f.write(f"{table} rows whose {source_column} matches no {parent}.source_id - {datetime.now()}\n\n")
+                    for source_id, count in orphans:
+                        f.write(f"{source_id}: {count} rows\n")
+                print(f"   📄 Orphans logged to: {log_path}")
+    except Exception as e:
+        print(f"❌ Critical error in reference resolution: {e}")
+        traceback.print_exc()
+        mysql_conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# ================================================================
+# STAGE SCHEDULER
+# ================================================================
+class Stage:
+    """A migration stage and the names of the stages it has to wait for"""
+
+    def __init__(self, name, run, depends_on=()):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+
+
+def run_stages(stages, max_workers=None):
+    """
+    Run each stage as soon as its dependencies have finished.
+
+    Independent stages run at the same time on a thread pool. A stage whose
+    dependency raised is skipped. Returns the per-stage timeline as
+    (name, start_offset, end_offset, status) tuples, in seconds from the
+    scheduler start.
+    """
+    started_at = perf_counter()
+    pending = {stage.name: stage for stage in stages}
+    running, done, failed, timeline = {}, set(), set(), []
+
+    def timed(stage):
+        start = perf_counter() - started_at
+        try:
+            stage.run()
+            return start, perf_counter() - started_at, None
+        except Exception as e:
+            traceback.print_exc()
+            return start, perf_counter() - started_at, e
+
+    with ThreadPoolExecutor(max_workers=max_workers or Config.PARALLEL_STAGES) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if any(dep in failed for dep in stage.depends_on):
+                    del pending[name]
+                    failed.add(name)
+                    timeline.append((name, None, None, 'skipped'))
+                    print(f"⏭️ Skipping stage '{name}': a dependency failed")
+                elif all(dep in done for dep in stage.depends_on):
+                    del pending[name]
+                    running[pool.submit(timed, stage)] = name
+
+            if not running:
+                if pending:
+                    raise Exception(f"Unresolvable stage dependencies: {', '.join(pending)}")
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                start, end, error = future.result()
+                if error:
+                    failed.add(name)
+                    print(f"❌ Stage '{name}' failed: {error}")
+                else:
+                    done.add(name)
+                timeline.append((name, start, end, 'failed' if error else 'ok'))
+
+    return timeline
+
+
+def print_stage_timeline(timeline):
+    """Print a wall-clock bar per stage so overlap between stages is visible"""
+    total = max((end for _, _, end, _ in timeline if end is not None), default=0) or 1
+    width = 40
+
+    print("\n" + "=" * 60 + "\n⏱️ STAGE TIMELINE\n" + "=" * 60)
+    for name, start, end, status in sorted(timeline, key=lambda t: (t[1] is None, t[1] or 0)):
+        if start is None:
+            print(f"   {name.ljust(14)} {'':{width}}  skipped")
+            continue
+        offset = int(start / total * width)
+        length = max(1, int((end - start) / total * width))
+        bar = (" " * offset + "█" * length).ljust(width)
+        print(f"   {name.ljust(14)} {bar}  {start:7.1f}s → {end:7.1f}s ({end - start:.1f}s){'' if status == 'ok' else ' ' + status.upper()}")
+    print(f"   Total wall-clock: {total:.1f}s")
 
 
 # ================================================================
@@ -1233,38 +2052,59 @@ def main():
         print("\n❌ Aborted: Could not establish database connection.")
         return 1
 
+    workbook = None
     try:
-        # Clear existing data first
-        truncate_all_tables(mysql)
-
-        # Migration order is important!
-        # 1. Patients first (needed for lookups)
-        migrate_patients(mysql, Config.EXCEL_FILE)
-
-        # 2. Doctors second (needed for lookups)
-        migrate_doctors(mysql, Config.EXCEL_FILE)
-
-        # 3. Appointments (requires patients and doctors)
-        migrate_appointments(mysql, Config.EXCEL_FILE)
-
-        # 4. Invoices (requires patients and doctors)
-        migrate_invoices(mysql, Config.EXCEL_FILE)
-
-        # 5. Invoice items (requires invoices)
-        migrate_invoice_items(mysql, Config.EXCEL_FILE)
-
-        # 6. Payments (requires invoices)
-        migrate_payments(mysql, Config.EXCEL_FILE)
-
-        # 7. Treatments (requires patients)
-        migrate_treatments(mysql, Config.EXCEL_FILE)
-
-        # 8. Inventory (standalone)
-        migrate_inventory(mysql, Config.EXCEL_FILE)
+        # The stages write integer patient/doctor keys, so the schema must be current
+        # first (partitioning is a one-time migration the shadow tables then inherit)
+        ensure_schema(mysql, partition_by_year=Config.PARTITION_BY_YEAR)
+
+        # Start from empty tables: fresh shadow copies, or the live ones cleared
+        if Config.SHADOW_LOAD:
+            Config.LOAD_DATABASE = prepare_shadow_tables(mysql, Config.MYSQL_DATABASE)
+        else:
+            truncate_all_tables(mysql)
+
+        if Config.PARTITION_BY_YEAR:
+            with_connection(add_year_partitions, datetime.now().year + 1)()
+
+        # The workbook is opened once; each sheet is parsed on first use and shared by all stages
+        workbook = WorkbookStore(Config.EXCEL_FILE, SHEET_COLUMNS, Config.SHEET_CACHE_DIR)
+        # Name -> id maps, built once patients and doctors are written and shared by the rest
+        lookup_index = LookupIndex()
+
+        # Stages start as soon as the stages they depend on are done;
+        # independent ones (e.g. inventory) run alongside the rest
+        timeline = run_stages([
+            # Patients and doctors are needed for name lookups
+            Stage('patients', with_connection(migrate_patients, workbook, lookup_index)),
+            Stage('doctors', with_connection(migrate_doctors, workbook, lookup_index)),
+            Stage('lookups', with_connection(build_lookup_index, lookup_index), depends_on=['patients', 'doctors']),
+            Stage('appointments', with_connection(migrate_appointments, workbook, lookup_index), depends_on=['lookups']),
+            Stage('invoices', with_connection(migrate_invoices, workbook, lookup_index), depends_on=['lookups']),
+            Stage('invoice_items', with_connection(migrate_invoice_items, workbook), depends_on=['invoices']),
+            Stage('payments', with_connection(migrate_payments, workbook, lookup_index), depends_on=['lookups', 'invoices']),
+            Stage('treatments', with_connection(migrate_treatments, workbook, lookup_index), depends_on=['lookups']),
+            Stage('inventory', with_connection(migrate_inventory, workbook)),
+            Stage('references', with_connection(resolve_references), depends_on=['invoice_items', 'payments']),
+        ])
+        print_stage_timeline(timeline)
+
+        # Stages re-raise after rolling back, so a failed load shows up here
+        failed = [name for name, _, _, status in timeline if status != 'ok']
+        if failed and Config.SHADOW_LOAD:
+            print(f"\n❌ Stages did not complete: {', '.join(failed)}")
+            print(f"   Live tables left untouched, partial load kept in '{Config.LOAD_DATABASE}'")
+            return 1
+        if Config.SHADOW_LOAD:
+            swap_shadow_tables(mysql, Config.MYSQL_DATABASE)
 
         # Verify results
         verify_migration(mysql)
 
+        if failed:
+            print(f"\n❌ Stages did not complete: {', '.join(failed)}")
+            return 1
+
         print("\n" + "=" * 60)
         print("✅ MIGRATION COMPLETED SUCCESSFULLY")
         print("=" * 60)
@@ -1277,6 +2117,8 @@ def main():
         return 1
 
     finally:
+        if workbook:
+            workbook.close()
         if mysql and mysql.is_connected():
             mysql.close()
             print("\n🔒 MySQL connection closed")
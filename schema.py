@@ -0,0 +1,654 @@
+# ---------------------------------------------
+# ToothpickEVE - Schema Registry
+# Purpose: Single source of truth for the clinic database schema
+#
+# Features:
+#   - Numbered migrations, recorded in a `schema_version` table
+#   - One cheap version query at startup when the schema is current
+#   - Online index changes (ALGORITHM=INPLACE, LOCK=NONE)
+#   - Opt-in yearly RANGE partitions for appointments and treatments
+#   - Shadow-table reloads swapped in with one atomic RENAME TABLE
+#   - Shared by create_db.py, generate_dummy_data.py and the migrators
+# ---------------------------------------------
+
+from datetime import date
+
+from mysql.connector import Error, errorcode
+
+SCHEMA_LOCK = 'toothpick_eve_schema'
+
+
+# ================================================================
+# MIGRATION 1: CLINIC TABLES
+# ================================================================
+# The original layout; later migrations evolve it, so never edit it in place
+BASE_TABLES = {
+    'patients': """
+        CREATE TABLE IF NOT EXISTS patients (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            source_id VARCHAR(50) UNIQUE,
+            first_name VARCHAR(100),
+            father_name VARCHAR(100),
+            last_name VARCHAR(100),
+            mother_name VARCHAR(100),
+            id_nb VARCHAR(50),
+            date_of_birth DATE,
+            gender VARCHAR(20),
+            marital_status VARCHAR(20),
+            nationality VARCHAR(100),
+            phone VARCHAR(100),
+            phone_alt VARCHAR(100),
+            email VARCHAR(100),
+            address_line1 TEXT,
+            address_line2 TEXT,
+            city VARCHAR(50),
+            state VARCHAR(50),
+            zip_code VARCHAR(10),
+            country VARCHAR(100),
+            blood_group VARCHAR(5),
+            allergies TEXT,
+            medical_history TEXT,
+            created_at TIMESTAMP NULL DEFAULT NULL,
+            updated_at TIMESTAMP NULL DEFAULT NULL,
+            INDEX idx_source_id (source_id)
+        )
+    """,
+    'patient_relationships': """
+        CREATE TABLE IF NOT EXISTS patient_relationships (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            patient_id INT,
+            related_patient_id INT,
+            relationship_type VARCHAR(50),
+            created_at TIMESTAMP NULL DEFAULT NULL,
+            updated_at TIMESTAMP NULL DEFAULT NULL
+        )
+    """,
+    'doctors': """
+        CREATE TABLE IF NOT EXISTS doctors (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            source_id VARCHAR(50) UNIQUE,
+            title VARCHAR(50),
+            first_name VARCHAR(50),
+            father_name VARCHAR(100),
+            last_name VARCHAR(50),
+            specialization VARCHAR(255),
+            qualification VARCHAR(200),
+            license_number VARCHAR(50),
+            phone VARCHAR(100),
+            phone_alt VARCHAR(100),
+            email VARCHAR(100),
+            department VARCHAR(100),
+            consultation_fee DECIMAL(10, 2),
+            available_days VARCHAR(100),
+            available_hours VARCHAR(100),
+            created_at TIMESTAMP NULL DEFAULT NULL,
+            updated_at TIMESTAMP NULL DEFAULT NULL,
+            INDEX idx_source_id (source_id)
+        )
+    """,
+    'appointments': """
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            source_id VARCHAR(50) UNIQUE,
+            patient_id VARCHAR(50),
+            doctor_id VARCHAR(50),
+            appointment_date DATE,
+            appointment_time TIME,
+            duration VARCHAR(50),
+            duration_minutes INT,
+            revision_number INT,
+            room VARCHAR(50),
+            status VARCHAR(50),
+            missed BOOLEAN DEFAULT FALSE,
+            reason_for_visit TEXT,
+            diagnosis TEXT,
+            prescription TEXT,
+            notes TEXT,
+            created_at TIMESTAMP NULL DEFAULT NULL,
+            updated_at TIMESTAMP NULL DEFAULT NULL,
+            INDEX idx_patient_id (patient_id),
+            INDEX idx_doctor_id (doctor_id),
+            INDEX idx_appointment_date (appointment_date)
+        )
+    """,
+    'invoices': """
+        CREATE TABLE IF NOT EXISTS invoices (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            source_id VARCHAR(50) UNIQUE,
+            invoice_number VARCHAR(50),
+            patient_id VARCHAR(50),
+            doctor_id VARCHAR(50),
+            appointment_id VARCHAR(50),
+            invoice_date DATE,
+            due_date DATE,
+            status VARCHAR(50),
+            currency VARCHAR(10) DEFAULT 'USD',
+            subtotal DECIMAL(10, 2) DEFAULT 0.00,
+            discount_type VARCHAR(20),
+            discount_value DECIMAL(10, 2) DEFAULT 0.00,
+            tax DECIMAL(10, 2) DEFAULT 0.00,
+            total_amount DECIMAL(10, 2),
+            amount_paid DECIMAL(10, 2) DEFAULT 0.00,
+            balance_due DECIMAL(10, 2),
+            notes TEXT,
+            created_at TIMESTAMP NULL DEFAULT NULL,
+            updated_at TIMESTAMP NULL DEFAULT NULL,
+            INDEX idx_source_id (source_id),
+            INDEX idx_patient_id (patient_id)
+        )
+    """,
+    'invoice_items': """
+        CREATE TABLE IF NOT EXISTS invoice_items (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            source_id VARCHAR(50),
+            invoice_id INT,
+            invoice_source_id VARCHAR(50),
+            description TEXT,
+            unit_price DECIMAL(10, 2),
+            quantity INT DEFAULT 1,
+            total_amount DECIMAL(10, 2),
+            created_at TIMESTAMP NULL DEFAULT NULL,
+            updated_at TIMESTAMP NULL DEFAULT NULL,
+            INDEX idx_invoice_id (invoice_id)
+        )
+    """,
+    'payments': """
+        CREATE TABLE IF NOT EXISTS payments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            source_id VARCHAR(50) UNIQUE,
+            invoice_id INT,
+            invoice_source_id VARCHAR(50),
+            patient_id VARCHAR(50),
+            payment_method VARCHAR(50),
+            amount DECIMAL(10, 2),
+            original_amount DECIMAL(10, 2),
+            currency VARCHAR(10),
+            reference_number VARCHAR(100),
+            payment_date DATE,
+            notes TEXT,
+            created_at TIMESTAMP NULL DEFAULT NULL,
+            updated_at TIMESTAMP NULL DEFAULT NULL,
+            deleted_at TIMESTAMP NULL DEFAULT NULL,
+            INDEX idx_invoice_id (invoice_id),
+            INDEX idx_patient_id (patient_id)
+        )
+    """,
+    'treatments': """
+        CREATE TABLE IF NOT EXISTS treatments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            source_id VARCHAR(50) UNIQUE,
+            patient_id VARCHAR(50),
+            doctor_id VARCHAR(50),
+            tooth_number VARCHAR(20),
+            procedure_code VARCHAR(50),
+            procedure_name VARCHAR(200),
+            procedure_group VARCHAR(100),
+            treatment_plan VARCHAR(100),
+            status VARCHAR(50),
+            price DECIMAL(10, 2),
+            planned_date DATE,
+            start_date DATE,
+            completion_date DATE,
+            notes TEXT,
+            created_at TIMESTAMP NULL DEFAULT NULL,
+            updated_at TIMESTAMP NULL DEFAULT NULL,
+            INDEX idx_patient_id (patient_id),
+            INDEX idx_doctor_id (doctor_id)
+        )
+    """,
+    'inventory': """
+        CREATE TABLE IF NOT EXISTS inventory (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            source_id VARCHAR(50) UNIQUE,
+            category VARCHAR(100),
+            name VARCHAR(200),
+            sku VARCHAR(50),
+            description TEXT,
+            unit_of_measure VARCHAR(50),
+            size DECIMAL(10, 2),
+            quantity_in_stock DECIMAL(10, 2),
+            unit_size DECIMAL(10, 2),
+            average_purchase_price DECIMAL(10, 2),
+            selling_price DECIMAL(10, 2),
+            minimum_quantity_warning INT,
+            minimum_quantity_critical INT,
+            currency VARCHAR(10),
+            created_at TIMESTAMP NULL DEFAULT NULL,
+            updated_at TIMESTAMP NULL DEFAULT NULL,
+            deleted_at TIMESTAMP NULL DEFAULT NULL,
+            INDEX idx_source_id (source_id)
+        )
+    """
+}
+
+
+# ================================================================
+# MIGRATION 2: INTEGER KEYS AND DASHBOARD INDEXES
+# ================================================================
+# (table, column, parent table) for references that used to hold the parent's source_id
+INTEGER_KEYS = [
+    ('appointments', 'patient_id', 'patients'),
+    ('appointments', 'doctor_id', 'doctors'),
+    ('invoices', 'patient_id', 'patients'),
+    ('invoices', 'doctor_id', 'doctors'),
+    ('invoices', 'appointment_id', 'appointments'),
+    ('payments', 'patient_id', 'patients'),
+    ('treatments', 'patient_id', 'patients'),
+    ('treatments', 'doctor_id', 'doctors'),
+]
+
+# Indexes replaced by the composites below (idx_source_id duplicated the UNIQUE index)
+OBSOLETE_INDEXES = [
+    ('patients', 'idx_source_id'),
+    ('doctors', 'idx_source_id'),
+    ('inventory', 'idx_source_id'),
+    ('invoices', 'idx_source_id'),
+    ('invoices', 'idx_patient_id'),
+    ('appointments', 'idx_patient_id'),
+    ('appointments', 'idx_doctor_id'),
+    ('appointments', 'idx_appointment_date'),
+    ('payments', 'idx_patient_id'),
+    ('treatments', 'idx_patient_id'),
+    ('treatments', 'idx_doctor_id'),
+]
+
+# (table, index, columns) for the dashboard access patterns
+DASHBOARD_INDEXES = [
+    ('appointments', 'idx_patient_date', 'patient_id, appointment_date'),
+    ('appointments', 'idx_doctor_date', 'doctor_id, appointment_date'),
+    ('appointments', 'idx_date_status', 'appointment_date, status'),
+    ('invoices', 'idx_patient_date', 'patient_id, invoice_date'),
+    ('invoices', 'idx_doctor_date', 'doctor_id, invoice_date'),
+    ('invoices', 'idx_appointment_id', 'appointment_id'),
+    ('invoices', 'idx_date_status', 'invoice_date, status'),
+    ('payments', 'idx_patient_date', 'patient_id, payment_date'),
+    ('payments', 'idx_payment_date', 'payment_date'),
+    ('treatments', 'idx_patient_start', 'patient_id, start_date'),
+    ('treatments', 'idx_doctor_start', 'doctor_id, start_date'),
+    ('treatments', 'idx_procedure_start', 'procedure_code, start_date'),
+]
+
+# (table, constraint, column, parent table)
+FOREIGN_KEYS = [
+    ('appointments', 'fk_appointments_patient', 'patient_id', 'patients'),
+    ('appointments', 'fk_appointments_doctor', 'doctor_id', 'doctors'),
+    ('invoices', 'fk_invoices_patient', 'patient_id', 'patients'),
+    ('invoices', 'fk_invoices_doctor', 'doctor_id', 'doctors'),
+    ('invoices', 'fk_invoices_appointment', 'appointment_id', 'appointments'),
+    ('invoice_items', 'fk_invoice_items_invoice', 'invoice_id', 'invoices'),
+    ('payments', 'fk_payments_invoice', 'invoice_id', 'invoices'),
+    ('payments', 'fk_payments_patient', 'patient_id', 'patients'),
+    ('treatments', 'fk_treatments_patient', 'patient_id', 'patients'),
+    ('treatments', 'fk_treatments_doctor', 'doctor_id', 'doctors'),
+]
+
+
+def column_type(cursor, table, column):
+    cursor.execute("""
+        SELECT DATA_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    row = cursor.fetchone()
+    return row[0].lower() if row else None
+
+
+def has_index(cursor, table, index):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1
+    """, (table, index))
+    return cursor.fetchone() is not None
+
+
+def has_constraint(cursor, table, constraint):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.TABLE_CONSTRAINTS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = %s
+    """, (table, constraint))
+    return cursor.fetchone() is not None
+
+
+def integer_keys_and_indexes(cursor):
+    """Turn source-id references into integer keys, then swap in the dashboard indexes
+
+    Every step checks the current state first, so the migration is safe on databases
+    that already have some of it (e.g. a production schema with integer keys).
+    """
+    for table, column, parent in INTEGER_KEYS:
+        if column_type(cursor, table, column) in ('int', None):
+            continue
+        print(f"   ↳ {table}.{column}: source ids → {parent}.id")
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM {table} c LEFT JOIN {parent} p ON c.{column} = p.source_id
+            WHERE c.{column} IS NOT NULL AND p.id IS NULL
+        """)
+        orphans = cursor.fetchone()[0]
+        if orphans:
+            print(f"   ⚠️  {orphans} {table} rows reference no {parent}.source_id; their {column} is cleared")
+        # LEFT JOIN: every reference without a parent row becomes NULL. Left as is, a numeric
+        # one would survive the type change and point at an unrelated parent row
+        cursor.execute(f"UPDATE {table} c LEFT JOIN {parent} p ON c.{column} = p.source_id SET c.{column} = p.id")
+        # A type change always rebuilds the table (ALGORITHM=COPY); there is no in-place path
+        cursor.execute(f"ALTER TABLE {table} MODIFY {column} INT")
+
+    for table, index, columns in DASHBOARD_INDEXES:
+        if not has_index(cursor, table, index):
+            print(f"   ↳ {table}: adding {index} ({columns})")
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} ({columns}), ALGORITHM=INPLACE, LOCK=NONE")
+
+    # Dropped only once their replacements exist, so existing foreign keys always keep an index
+    for table, index in OBSOLETE_INDEXES:
+        if has_index(cursor, table, index):
+            cursor.execute(f"ALTER TABLE {table} DROP INDEX {index}, ALGORITHM=INPLACE, LOCK=NONE")
+
+    # With foreign_key_checks off InnoDB adds the constraints in place, without a table copy
+    cursor.execute("SET @previous_fk_checks = @@SESSION.foreign_key_checks")
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    try:
+        for table, constraint, column, parent in FOREIGN_KEYS:
+            if not has_constraint(cursor, table, constraint):
+                cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} FOREIGN KEY ({column}) "
+                               f"REFERENCES {parent} (id), ALGORITHM=INPLACE")
+    finally:
+        cursor.execute("SET SESSION foreign_key_checks = @previous_fk_checks")
+
+
+# ================================================================
+# MIGRATION 3: MIGRATION BOOKKEEPING TABLES
+# ================================================================
+MIGRATION_TABLES = {
+    'migration_log': """
+        CREATE TABLE IF NOT EXISTS migration_log (
+            id INT AUTO_INCREMENT PRIMARY KEY, table_name VARCHAR(50), source_id VARCHAR(50),
+            operation VARCHAR(20), status VARCHAR(20), error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, INDEX idx_status (status),
+            INDEX idx_table_source (table_name, source_id)
+        ) ENGINE=InnoDB
+    """,
+    'migration_checkpoint': """
+        CREATE TABLE IF NOT EXISTS migration_checkpoint (
+            stage VARCHAR(100) PRIMARY KEY, last_key VARCHAR(50), status VARCHAR(20),
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB
+    """,
+    'migration_sync_state': """
+        CREATE TABLE IF NOT EXISTS migration_sync_state (
+            table_name VARCHAR(50) PRIMARY KEY, watermark DATETIME, last_key VARCHAR(50),
+            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB
+    """,
+}
+
+
+# ================================================================
+# MIGRATION 4: YEARLY PARTITIONS (OPT-IN)
+# ================================================================
+# (table, date column) partitioned BY RANGE (YEAR(column)). Only applied when a
+# script asks for it (partition_by_year=True): MySQL partitioning rules make it a
+# trade-off, see partition_by_year().
+PARTITIONED_TABLES = [
+    ('appointments', 'appointment_date'),
+    ('treatments', 'start_date'),
+]
+
+PARTITION_FIRST_YEAR = 2010  # Earlier rows share the history partition
+HISTORY_PARTITION = 'p_history'  # Everything before PARTITION_FIRST_YEAR
+FUTURE_PARTITION = 'p_future'  # Catch-all above the last year, split off as years arrive
+
+
+def year_partitions(cursor, table):
+    """Years that have their own partition, sorted; None when the table isn't partitioned"""
+    cursor.execute("""
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+    """, (table,))
+    names = [name for (name,) in cursor.fetchall()]
+    if not names:
+        return None
+    return sorted(int(name[1:]) for name in names if name[1:].isdigit())
+
+
+def partition_clauses(years):
+    return ", ".join(f"PARTITION p{year} VALUES LESS THAN ({year + 1})" for year in years)
+
+
+def partition_by_year(cursor, table, column, first_year, last_year):
+    """Convert a table to yearly RANGE partitions (a full table rebuild)
+
+    Partitioned InnoDB tables can't take part in foreign keys, and every unique key
+    has to contain the partition column: the foreign keys touching the table are
+    dropped, the primary key becomes (id, column) and source_id is unique per date.
+    """
+    cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {column} IS NULL")
+    undated = cursor.fetchone()[0]
+    if undated:
+        raise Exception(f"{table}: {undated} rows without {column}; date or delete them before partitioning")
+
+    for child, constraint, _, parent in FOREIGN_KEYS:
+        if table in (child, parent) and has_constraint(cursor, child, constraint):
+            cursor.execute(f"ALTER TABLE {child} DROP FOREIGN KEY {constraint}")
+
+    cursor.execute(f"""
+        ALTER TABLE {table}
+            MODIFY {column} DATE NOT NULL,
+            DROP PRIMARY KEY, ADD PRIMARY KEY (id, {column}),
+            DROP INDEX source_id, ADD UNIQUE INDEX uq_source_date (source_id, {column})
+    """)
+    cursor.execute(f"""
+        ALTER TABLE {table} PARTITION BY RANGE (YEAR({column})) (
+            PARTITION {HISTORY_PARTITION} VALUES LESS THAN ({first_year}),
+            {partition_clauses(range(first_year, last_year + 1))},
+            PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE
+        )
+    """)
+
+
+def yearly_partitions(cursor):
+    """Partition PARTITIONED_TABLES by year, up to next year
+
+    Tables that are already partitioned (e.g. by an earlier version of the
+    scripts) are left as they are.
+    """
+    last_year = date.today().year + 1
+    for table, column in PARTITIONED_TABLES:
+        if year_partitions(cursor, table) is None:
+            print(f"   ↳ {table}: partitioning by YEAR({column}), {PARTITION_FIRST_YEAR}-{last_year}")
+            partition_by_year(cursor, table, column, PARTITION_FIRST_YEAR, last_year)
+
+
+def add_year_partitions(connection, last_year):
+    """Split the partitions up to last_year off the catch-all of every partitioned table
+
+    Only p_future is rewritten, and it only holds rows dated after the last year
+    partition, so this is cheap enough to call on every run. Tables that aren't
+    partitioned are left alone: converting them is migration 4's job.
+    """
+    cursor = connection.cursor()
+    try:
+        for table, _ in PARTITIONED_TABLES:
+            years = year_partitions(cursor, table)
+            if not years:
+                continue
+            missing = range(years[-1] + 1, last_year + 1)
+            if missing:
+                cursor.execute(f"""
+                    ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO (
+                        {partition_clauses(missing)},
+                        PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE
+                    )
+                """)
+                print(f"🧱 {table}: added partitions {missing[0]}-{missing[-1]}")
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def purge_partitions_before(connection, year):
+    """Empty every partition dated before `year`; a metadata operation, not a row-by-row DELETE
+
+    The partitions are truncated rather than dropped so that late rows for those
+    years still land in their own partition instead of the next year's.
+    """
+    cursor = connection.cursor()
+    try:
+        for table, _ in PARTITIONED_TABLES:
+            years = year_partitions(cursor, table)
+            if years is None:
+                print(f"⚠️  {table} is not partitioned by year; nothing purged")
+                continue
+            expired = [f"p{y}" for y in years if y < year]
+            # p_history only holds years before the first year partition
+            if years and year >= years[0]:
+                expired.insert(0, HISTORY_PARTITION)
+            if not expired:
+                print(f"✅ {table}: no partition lies entirely before {year}")
+                continue
+            cursor.execute(f"ALTER TABLE {table} TRUNCATE PARTITION {', '.join(expired)}")
+            print(f"🗑️  {table}: emptied {', '.join(expired)}")
+    finally:
+        cursor.close()
+
+
+# ================================================================
+# REGISTRY
+# ================================================================
+# (version, description, steps); a step is a SQL statement or a function taking a cursor.
+# Never edit an applied migration: append a new one.
+MIGRATIONS = [
+    (1, 'Clinic tables', list(BASE_TABLES.values())),
+    (2, 'Integer keys and dashboard indexes', [integer_keys_and_indexes]),
+    (3, 'Migration bookkeeping tables', list(MIGRATION_TABLES.values())),
+    (4, 'Yearly partitions for appointments and treatments', [yearly_partitions]),
+]
+
+# Applied only when ensure_schema() is asked for them
+OPT_IN_MIGRATIONS = {4}
+
+
+def applied_versions(cursor):
+    """Set of applied migrations, empty when the database has never been migrated"""
+    try:
+        cursor.execute("SELECT version FROM schema_version")
+        return {version for (version,) in cursor.fetchall()}
+    except Error as e:
+        if e.errno == errorcode.ER_NO_SUCH_TABLE:
+            return set()
+        raise
+
+
+def ensure_schema(connection, partition_by_year=False):
+    """Apply every pending migration; a single query when there is none
+
+    Opt-in migrations are skipped unless asked for (partition_by_year), so a later
+    migration can be applied past them: the registry checks the set of applied
+    versions, not the highest one. Pending migrations run under a named lock, so
+    two scripts starting together don't apply the same migration twice.
+    """
+    wanted = [(number, description, steps) for number, description, steps in MIGRATIONS
+              if number not in OPT_IN_MIGRATIONS or partition_by_year]
+    cursor = connection.cursor()
+    try:
+        applied = applied_versions(cursor)
+        if all(number in applied for number, _, _ in wanted):
+            print(f"✅ Schema is up to date (version {max(applied)})")
+            return max(applied)
+
+        cursor.execute("SELECT GET_LOCK(%s, 600)", (SCHEMA_LOCK,))
+        cursor.fetchone()
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(200),
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            applied = applied_versions(cursor)  # another script may have migrated while we waited
+
+            for number, description, steps in wanted:
+                if number in applied:
+                    continue
+                print(f"🧱 Applying schema migration {number}: {description}")
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                cursor.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                               (number, description))
+                connection.commit()
+                applied.add(number)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (SCHEMA_LOCK,))
+            cursor.fetchone()
+
+        print(f"✅ Schema migrated to version {max(applied)}\n")
+        return max(applied)
+    finally:
+        cursor.close()
+
+
+# ================================================================
+# SHADOW LOAD
+# ================================================================
+# A full reload fills copies of the clinic tables in `<database>_staging` (same table
+# names, so the loaders only switch databases) and swaps them in with one RENAME TABLE:
+# readers see the old data until the swap, then all of the new data, never a mix.
+CLINIC_TABLES = list(BASE_TABLES)
+PREVIOUS_SUFFIX = '_previous'
+
+
+def shadow_database(database):
+    return f"{database}_staging"
+
+
+def prepare_shadow_tables(connection, database, tables=CLINIC_TABLES):
+    """Create empty staging copies of `tables`; returns the staging database name
+
+    CREATE TABLE ... LIKE copies columns, indexes and partitions but no foreign
+    keys, so the load runs without constraint checks.
+    """
+    staging = shadow_database(database)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {staging}")
+        for table in tables:
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}.{table}, {staging}.{table}{PREVIOUS_SUFFIX}")
+            cursor.execute(f"CREATE TABLE {staging}.{table} LIKE {database}.{table}")
+        connection.commit()
+        print(f"🪞 Loading into shadow tables in '{staging}'")
+        return staging
+    finally:
+        cursor.close()
+
+
+def swap_shadow_tables(connection, database, tables=CLINIC_TABLES):
+    """Atomically replace the live tables with their staging copies, then restore the foreign keys
+
+    `connection` must be using `database`.
+    """
+    staging = shadow_database(database)
+    cursor = connection.cursor()
+    try:
+        cursor.execute("RENAME TABLE " + ", ".join(
+            f"{database}.{table} TO {staging}.{table}{PREVIOUS_SUFFIX}, {staging}.{table} TO {database}.{table}"
+            for table in tables
+        ))
+        print(f"🔀 Swapped in {len(tables)} freshly loaded tables")
+
+        cursor.execute("SET @previous_fk_checks = @@SESSION.foreign_key_checks")
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        try:
+            cursor.execute("DROP TABLE " + ", ".join(f"{staging}.{table}{PREVIOUS_SUFFIX}" for table in tables))
+
+            # Partitioned tables can't take part in foreign keys
+            partitioned = {table for table, _ in PARTITIONED_TABLES if year_partitions(cursor, table) is not None}
+            for table, constraint, column, parent in FOREIGN_KEYS:
+                if {table, parent} <= set(tables) and not {table, parent} & partitioned:
+                    cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} FOREIGN KEY ({column}) "
+                                   f"REFERENCES {parent} (id), ALGORITHM=INPLACE")
+        finally:
+            cursor.execute("SET SESSION foreign_key_checks = @previous_fk_checks")
+        connection.commit()
+    finally:
+        cursor.close()
@@ -0,0 +1,44 @@
+"""Resumed appointment runs must still cover every id of the source span"""
+
+import pytest
+
+pytest.importorskip('pyodbc')
+import migrate_bizri_db as bizri  # noqa: E402
+
+
+class SpanCursor:
+    def __init__(self, span):
+        self.span = span
+
+    def execute(self, sql, *params):
+        pass
+
+    def fetchone(self):
+        return self.span
+
+    def close(self):
+        pass
+
+
+class SpanConnection:
+    def __init__(self, low, high):
+        self.span = (low, high)
+
+    def cursor(self):
+        return SpanCursor(self.span)
+
+
+def test_fresh_plan_covers_the_span():
+    ranges = bizri.partition_key_ranges(SpanConnection(1, 500), 'FROM schedule', 4)
+    assert ranges[0][0] == 1 and ranges[-1][1] == 500
+    assert all(start == end + 1 for (_, end), (start, _) in zip(ranges, ranges[1:]))
+
+
+def test_resumed_plan_fills_ranges_whose_checkpoint_was_lost():
+    checkpoints = {
+        'appointments': ('7', 'running'),
+        'appointments:100-199': ('150', 'running'),
+        'appointments:300-399': (None, 'done'),
+    }
+    ranges = bizri.partition_key_ranges(SpanConnection(1, 500), 'FROM schedule', 4, checkpoints)
+    assert ranges == [(1, 99), (100, 199), (200, 299), (300, 399), (400, 500)]
@@ -0,0 +1,35 @@
+"""Second-tier name matching must not attach rows to the wrong patient"""
+
+import pytest
+
+import migrate_hammoud_excel as hammoud
+
+KNOWN = {
+    'albert haddad': 'P1',
+    'elissa nasr': 'P2',
+    'rami khoury': 'P3',
+    'alexander saad': 'P4',
+}
+
+
+@pytest.fixture
+def matcher():
+    return hammoud.FuzzyNameMatcher(KNOWN, 0.8)
+
+
+@pytest.mark.parametrize('name', ['Bert Haddad', 'Issa Nasr', 'Exander Saad'])
+def test_first_names_starting_with_a_particle_stay_whole(matcher, name):
+    assert matcher.match(name) == (None, 0.0, None)
+
+
+@pytest.mark.parametrize('name', ['Rami Elkhoury', 'Rami El-Khoury', "Rami Al'Khoury", 'Ramy Khouri'])
+def test_particles_and_spelling_variants_still_match(matcher, name):
+    assert matcher.match(name)[0] == 'P3'
+
+
+def test_trigram_candidates_keep_every_name_the_scorer_accepts():
+    # Known name longer than the target: the bound must use the longer of the two lengths
+    matcher = hammoud.FuzzyNameMatcher({'hassan nasrallah': 'P1'}, 0.8)
+    target = ' '.join(hammoud.fuzzy_name_tokens('Hassn Nsralhah'))
+    assert matcher.best_match(target, range(len(matcher.entries)))
+    assert matcher.trigram_candidates(target) == [0]
@@ -0,0 +1,83 @@
+"""The vectorized sheet transforms must return what the scalar helpers return for every cell"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import migrate_hammoud_excel as hammoud
+
+
+def cell_by_cell(helper, series, *args):
+    return [helper(value, *args) for value in series]
+
+
+def as_list(series):
+    """Column values with every kind of empty (NaN, NaT, <NA>) as None"""
+    return [None if pd.isna(value) else value for value in series]
+
+
+STRING_COLUMNS = [
+    pd.Series(['  Rami   Khoury ', '', '   ', None, np.nan, 'A' * 80]),
+    pd.Series([12, 0, 7, 3]),
+    pd.Series([1.5, np.nan, 0.0]),
+    pd.Series([pd.Timestamp('2024-03-01'), pd.NaT, pd.Timestamp('2024-03-01 10:30')]),
+]
+
+PHONE_COLUMNS = [
+    pd.Series(['03 123 456', '+961 70 123456', '', None, 0]),
+    pd.Series([96170123456, 0, 9613123456]),
+    pd.Series([96170123456.0, np.nan, 0.0]),
+    pd.Series([False, True, '71 000 000']),
+]
+
+GENDER_COLUMNS = [
+    pd.Series([' Male', 'F', 'woman', 'other', None, '']),
+    pd.Series([1, 2, 3, 0]),
+]
+
+DATE_COLUMNS = [
+    pd.Series(['2024-01-31', '31/01/2024', '01/31/2024', '2024/01/31', ' 2024-02-01 ', '', 'not a date', None]),
+    pd.Series([pd.Timestamp('2024-01-31'), pd.NaT]),
+    pd.Series([None, None, np.nan], dtype=object),
+    pd.Series([pd.Timestamp('2024-01-31'), datetime(2023, 5, 4), None], dtype=object),
+    pd.Series(['2024-01-31', pd.Timestamp('2023-05-04'), 45000], dtype=object),
+]
+
+
+@pytest.mark.parametrize('series', STRING_COLUMNS)
+@pytest.mark.parametrize('max_length', [None, 50])
+def test_clean_string_column_matches_scalar(series, max_length):
+    assert as_list(hammoud.clean_string_column(series, max_length)) == cell_by_cell(hammoud.clean_string, series, max_length)
+
+
+@pytest.mark.parametrize('series', PHONE_COLUMNS)
+def test_clean_phone_column_matches_scalar(series):
+    assert as_list(hammoud.clean_phone_column(series)) == cell_by_cell(hammoud.clean_phone, series)
+
+
+def test_clean_phone_column_keeps_integer_numbers_integral():
+    assert as_list(hammoud.clean_phone_column(pd.Series([96170123456, 0]))) == ['+96170123456', None]
+
+
+@pytest.mark.parametrize('series', GENDER_COLUMNS)
+def test_normalize_gender_column_matches_scalar(series):
+    assert as_list(hammoud.normalize_gender_column(series)) == cell_by_cell(hammoud.normalize_gender, series)
+
+
+@pytest.mark.parametrize('series', DATE_COLUMNS)
+def test_parse_date_column_matches_scalar(series):
+    assert as_list(hammoud.parse_date_column(series)) == cell_by_cell(hammoud.parse_date, series)
+
+
+def test_lookup_id_column_matches_scalar():
+    lookup = {'rami khoury': 7, 'lina haddad': 9}
+    series = pd.Series(['  Rami   KHOURY', 'Lina Haddad', 'Nobody', None, 0, ''])
+    assert as_list(hammoud.lookup_id_column(series, lookup)) == cell_by_cell(hammoud.lookup_patient_id, series, lookup)
+
+
+def test_lookup_id_column_keeps_ids_integral():
+    ids = hammoud.lookup_id_column(pd.Series(['Rami Khoury', 'Nobody']), {'rami khoury': 7})
+    assert hammoud.to_param_rows([ids], pd.Series([True, True])) == [(7,), (None,)]
+    assert type(hammoud.to_param_rows([ids], pd.Series([True, False]))[0][0]) is int
@@ -0,0 +1,210 @@
+"""Dry run of the schema migrations and both migrators against an empty MySQL database
+
+Needs a disposable MySQL server: set TOOTHPICK_TEST_MYSQL_HOST (plus _USER and
+_PASSWORD when they aren't root/empty). Every test gets a freshly created
+database that is dropped afterwards. SQL Server is replaced by a fake source
+that serves one row per table, so the Bizri stages run without it.
+"""
+
+import os
+from collections import namedtuple
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import schema
+
+mysql_connector = pytest.importorskip('mysql.connector')
+
+SERVER = {
+    'host': os.environ.get('TOOTHPICK_TEST_MYSQL_HOST'),
+    'user': os.environ.get('TOOTHPICK_TEST_MYSQL_USER', 'root'),
+    'password': os.environ.get('TOOTHPICK_TEST_MYSQL_PASSWORD', ''),
+}
+DATABASE = 'toothpick_eve_dry_run'
+
+pytestmark = pytest.mark.skipif(not SERVER['host'], reason='TOOTHPICK_TEST_MYSQL_HOST is not set')
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Connection to a new, empty database; the migrators' log files go to tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    server = mysql_connector.connect(**SERVER, autocommit=True)
+    admin = server.cursor()
+    admin.execute(f"DROP DATABASE IF EXISTS {DATABASE}")
+    admin.execute(f"CREATE DATABASE {DATABASE}")
+    connection = mysql_connector.connect(**SERVER, database=DATABASE, autocommit=False, allow_local_infile=True)
+    try:
+        yield connection
+    finally:
+        connection.close()
+        admin.execute(f"DROP DATABASE {DATABASE}")
+        server.close()
+
+
+def query(connection, sql):
+    cursor = connection.cursor()
+    cursor.execute(sql)
+    rows = cursor.fetchall()
+    cursor.close()
+    connection.commit()
+    return rows
+
+
+def test_migrations_apply_in_order(database):
+    assert schema.ensure_schema(database) == 3
+    assert query(database, "SELECT version FROM schema_version ORDER BY applied_at, version") == [(1,), (2,), (3,)]
+    for table, column, _ in schema.INTEGER_KEYS:
+        assert schema.column_type(database.cursor(), table, column) == 'int'
+
+    # Current: a single query, nothing applied again
+    assert schema.ensure_schema(database) == 3
+
+    assert schema.ensure_schema(database, partition_by_year=True) == 4
+    for table, _ in schema.PARTITIONED_TABLES:
+        assert schema.year_partitions(database.cursor(), table)[0] == schema.PARTITION_FIRST_YEAR
+
+
+def test_integer_keys_clear_references_without_a_parent(database):
+    cursor = database.cursor()
+    for statement in schema.BASE_TABLES.values():
+        cursor.execute(statement)
+    cursor.execute("INSERT INTO patients (id, source_id) VALUES (1, '1042'), (2, '5')")
+    # '5' is a patients.id but no patient's source_id: it must not survive as a key
+    cursor.execute("INSERT INTO appointments (source_id, patient_id) VALUES ('a', '1042'), ('b', '5'), ('c', 'x')")
+    database.commit()
+
+    schema.ensure_schema(database)
+    assert query(database, "SELECT source_id, patient_id FROM appointments ORDER BY source_id") == [
+        ('a', 1), ('b', None), ('c', None)
+    ]
+
+
+# ================================================================
+# BIZRI
+# ================================================================
+PatientRow = namedtuple('PatientRow', [
+    'ID', 'COMPANY', 'FIRST_NM', 'LAST_NM', 'FATHER_NM', 'MOTHER', 'ID_NO', 'BDATE', 'GENDER',
+    'MARITALSTATUS', 'NATIONALITY', 'PHONE', 'MOBILE', 'EMAIL', 'ADDR1', 'ADDR2', 'CITY', 'STATE',
+    'ZIP', 'Bloodgroup', 'allergies', 'DATEADDED', 'Lastupdate',
+])
+DoctorRow = namedtuple('DoctorRow', ['VENDSRH', 'COMPANY', 'PHONE', 'CONTACT'])
+ScheduleRow = namedtuple('ScheduleRow', [
+    'id', 'pat_id', 'doc_id', 'date', 'time', 'period', 'room', 'status', 'missed', 'comment', 'pat_name',
+])
+
+SOURCE_ROWS = {
+    'FROM CUST': [PatientRow(
+        1042, None, 'Lina', 'Haddad', 'Georges', 'Maha', None, datetime(1990, 4, 12), 'F', None, None,
+        '01123456', None, None, None, None, 'Beirut', None, None, None, None,
+        datetime(2020, 1, 5), datetime(2024, 3, 1),
+    )],
+    'FROM Vend': [DoctorRow(15, 'Dr Rami Khoury', '03123456', None)],
+    'FROM schedule': [ScheduleRow(7001, 1042, 15, datetime(2024, 5, 2), '09:30', 30, '2', 1, 0, 'Cleaning', None)],
+}
+
+
+class SourceCursor:
+    """Serves SOURCE_ROWS for whichever SQL Server table a query reads"""
+
+    def __init__(self):
+        self.rows = []
+        self.arraysize = 1
+
+    def execute(self, sql, *params):
+        rows = next((rows for table, rows in SOURCE_ROWS.items() if table in sql), [])
+        self.rows = [(len(rows),)] if 'COUNT(*)' in sql else list(rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class SourceConnection:
+    def cursor(self):
+        return SourceCursor()
+
+
+def test_bizri_loads_one_row_through_each_stage(database, monkeypatch):
+    pytest.importorskip('pyodbc')
+    import migrate_bizri_db as bizri
+    monkeypatch.setattr(bizri.Config, 'APPOINTMENT_PARTITIONS', 1)
+
+    bizri.setup_database_tables(database)
+    source = SourceConnection()
+    bizri.migrate_patients(source, database, {})
+    bizri.migrate_doctors(source, database)
+    bizri.migrate_appointments(source, database)
+
+    # The appointment's source ids come out as the integer keys of the rows loaded above
+    assert query(database, """
+        SELECT p.source_id, d.source_id FROM appointments a
+        JOIN patients p ON p.id = a.patient_id JOIN doctors d ON d.id = a.doctor_id
+        WHERE a.source_id = '7001'
+    """) == [('1042', '15')]
+
+
+# ================================================================
+# HAMMOUD
+# ================================================================
+WORKBOOK = {
+    'Patients': {'id': [1], 'first_name': ['Lina'], 'last_name': ['Haddad'], 'gender': ['female'],
+                 'phone_number': ['01123456'], 'dob': ['1990-04-12'], 'created_at': ['2020-01-05']},
+    'Appointments': {'id': [11], 'patient': ['Lina Haddad'], 'doctor': ['Rami Khoury'],
+                     'start_date': ['2024-05-02 09:30'], 'end_date': ['2024-05-02 10:00'],
+                     'room': ['2'], 'status': ['done'], 'created_at': ['2024-04-20']},
+    'Invoices': {'id': [21], 'patient': ['Lina Haddad'], 'doctor': ['Rami Khoury'], 'is_expense': [0],
+                 'invoice_date': ['2024-05-02'], 'status': ['paid'], 'currency': ['USD'],
+                 'total_amount': [80], 'total_payments': [80], 'created_at': ['2024-05-02']},
+    'invoice_items': {'id': [31], 'invoice_id': [21], 'description': ['Cleaning'], 'unit_price': [80],
+                      'quantity': [1], 'total_amount': [80]},
+    'Payments': {'id': [41], 'invoice_id': [21], 'patient': ['Lina Haddad'], 'method': ['cash'],
+                 'amount': [80], 'currency': ['USD'], 'payment_date': ['2024-05-02'],
+                 'created_at': ['2024-05-02']},
+    'Operations': {'id': [51], 'patient': ['Lina Haddad'], 'created_by': ['Rami Khoury'], 'code': ['D1110'],
+                   'name': ['Cleaning'], 'status': ['done'], 'price': [80], 'start_date': ['2024-05-02']},
+    'stock': {'id': [61], 'category': ['Hygiene'], 'name': ['Prophy paste'], 'remaining_quantity': [12],
+              'created_at': ['2024-01-10']},
+}
+
+
+def test_hammoud_loads_one_row_through_each_stage(database, tmp_path, monkeypatch):
+    import migrate_hammoud_excel as hammoud
+
+    excel_file = tmp_path / 'hammoud.xlsx'
+    with pd.ExcelWriter(excel_file) as writer:
+        for sheet, columns in WORKBOOK.items():
+            pd.DataFrame(columns).to_excel(writer, sheet_name=sheet, index=False)
+
+    monkeypatch.setattr(hammoud.Config, 'EXCEL_FILE', str(excel_file))
+    monkeypatch.setattr(hammoud.Config, 'MYSQL_HOST', SERVER['host'])
+    monkeypatch.setattr(hammoud.Config, 'MYSQL_USER', SERVER['user'])
+    monkeypatch.setattr(hammoud.Config, 'MYSQL_PASSWORD', SERVER['password'])
+    monkeypatch.setattr(hammoud.Config, 'MYSQL_DATABASE', DATABASE)
+
+    # main() brings the empty database's schema up to date itself
+    assert hammoud.main() == 0
+
+    for table in ('appointments', 'invoices', 'treatments'):
+        assert query(database, f"""
+            SELECT p.first_name, d.last_name FROM {table} t
+            JOIN patients p ON p.id = t.patient_id JOIN doctors d ON d.id = t.doctor_id
+        """) == [('Lina', 'Khoury')]
+    assert query(database, """
+        SELECT p.last_name, i.source_id FROM payments pay
+        JOIN patients p ON p.id = pay.patient_id JOIN invoices i ON i.id = pay.invoice_id
+    """) == [('Haddad', '21')]
+    assert query(database, "SELECT i.source_id FROM invoice_items ii JOIN invoices i ON i.id = ii.invoice_id") == [('21',)]
+    assert query(database, "SELECT COUNT(*) FROM inventory") == [(1,)]
@@ -0,0 +1,80 @@
+"""Schema registry bookkeeping and partition maintenance, against a recording fake connection"""
+
+import pytest
+
+import schema
+
+
+class RecordingCursor:
+    """Answers the catalog queries schema.py makes from a dict of state, recording every statement"""
+
+    def __init__(self, state):
+        self.state = state
+        self.rows = []
+
+    def execute(self, query, params=()):
+        self.state['statements'].append(' '.join(query.split()))
+        if 'FROM schema_version' in query:
+            self.rows = [(version,) for version in sorted(self.state['applied'])]
+        elif 'information_schema.PARTITIONS' in query:
+            self.rows = [(name,) for name in self.state['partitions'].get(params[0], [])]
+        elif query.lstrip().startswith('INSERT INTO schema_version'):
+            self.state['applied'].add(params[0])
+        else:
+            self.rows = [(0,)]
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self, applied=(), partitions=None):
+        self.state = {'applied': set(applied), 'partitions': partitions or {}, 'statements': []}
+
+    def cursor(self):
+        return RecordingCursor(self.state)
+
+    def commit(self):
+        pass
+
+    @property
+    def statements(self):
+        return self.state['statements']
+
+
+PARTITIONED = {'appointments': ['p_history', 'p2010', 'p2011', 'p2012', 'p_future']}
+
+
+@pytest.mark.parametrize('year, expected', [
+    (2005, None),
+    (2010, 'ALTER TABLE appointments TRUNCATE PARTITION p_history'),
+    (2012, 'ALTER TABLE appointments TRUNCATE PARTITION p_history, p2010, p2011'),
+])
+def test_purge_only_empties_partitions_entirely_before_the_cutoff(year, expected):
+    connection = RecordingConnection(partitions=PARTITIONED)
+    schema.purge_partitions_before(connection, year)
+    truncates = [statement for statement in connection.statements if 'TRUNCATE' in statement]
+    assert truncates == ([expected] if expected else [])
+
+
+def test_partition_migration_is_opt_in():
+    connection = RecordingConnection(applied={1, 2, 3})
+    assert schema.ensure_schema(connection) == 3
+    assert len(connection.statements) == 1
+
+    assert schema.ensure_schema(connection, partition_by_year=True) == 4
+    assert any('PARTITION BY RANGE (YEAR(appointment_date))' in s for s in connection.statements)
+
+
+def test_later_migrations_apply_past_a_skipped_opt_in_one(monkeypatch):
+    applied_steps = []
+    monkeypatch.setattr(schema, 'MIGRATIONS', schema.MIGRATIONS + [(5, 'Later', [applied_steps.append])])
+    connection = RecordingConnection(applied={1, 2, 3})
+    assert schema.ensure_schema(connection) == 5
+    assert len(applied_steps) == 1 and connection.state['applied'] == {1, 2, 3, 5}